@@ -0,0 +1,129 @@
+"""
+Priority admission to the data layer under overload
+
+Every database call from a request takes one of DB_CONCURRENCY slots and
+runs in a worker thread. When all slots are taken, callers queue by
+priority: student answers and joins (WRITE) are always handed the next free
+slot before any poll (READ). Reads are the ones that give way: the API
+answers a poll from its last cached body while the gate is busy, and a read
+that would queue behind READ_QUEUE_MAX others, or wait longer than
+READ_QUEUE_TIMEOUT, is refused with `Overloaded` instead of piling up.
+Writes are never refused here; the rate limiter bounds them.
+"""
+
+from contextvars import copy_context
+import asyncio
+import functools
+import heapq
+import itertools
+import os
+
+# Database calls allowed to run at once; keep below the database's connection limit
+DB_CONCURRENCY = int(os.getenv("DB_CONCURRENCY", 8))
+# Reads waiting beyond this many are refused at once
+READ_QUEUE_MAX = int(os.getenv("READ_QUEUE_MAX", 32))
+# Seconds a read may wait for a slot before it is refused
+READ_QUEUE_TIMEOUT = float(os.getenv("READ_QUEUE_TIMEOUT", 2.0))
+
+WRITE = 0
+READ = 1
+PRIORITY_NAMES = {WRITE: "write", READ: "read"}
+
+
+class Overloaded(Exception):
+    """A read was refused because the database is saturated"""
+
+    def __init__(self, retry_after):
+        super().__init__("Database is saturated")
+        self.retry_after = retry_after
+
+
+class PriorityGate:
+    """Counting semaphore whose waiters are served highest priority first
+
+    Only touched from the event loop, so no lock is needed.
+
+    Args:
+        slots: Calls allowed to run at once
+        read_queue_max: Reads allowed to wait; more are refused
+        read_timeout: Seconds a read may wait before it is refused
+        on_admit: Optional `on_admit(priority, seconds_waited)`
+    """
+
+    def __init__(self, slots=DB_CONCURRENCY, read_queue_max=READ_QUEUE_MAX,
+                 read_timeout=READ_QUEUE_TIMEOUT, on_admit=None):
+        self.slots = slots
+        self.read_queue_max = read_queue_max
+        self.read_timeout = read_timeout
+        self.on_admit = on_admit
+        self.in_use = 0
+        self._waiters = []    # heap of (priority, arrival, future)
+        self._arrivals = itertools.count()
+
+    def busy(self):
+        """True when a new call would have to wait for a slot"""
+        return self.in_use >= self.slots or self.queued() > 0
+
+    def queued(self, priority=None):
+        """Callers still waiting, of one priority or all"""
+        return sum(1 for p, _, future in self._waiters
+                   if not future.done() and (priority is None or p == priority))
+
+    async def acquire(self, priority):
+        loop = asyncio.get_running_loop()
+        if self.in_use < self.slots and not self.queued():
+            self.in_use += 1
+            self._admitted(priority, 0.0)
+            return
+        if priority != WRITE and self.queued(READ) >= self.read_queue_max:
+            raise Overloaded(self.read_timeout)
+
+        started = loop.time()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), future))
+        try:
+            if priority == WRITE:
+                await future
+            else:
+                await asyncio.wait_for(future, self.read_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                raise Overloaded(self.read_timeout) from None
+            raise
+        self._admitted(priority, loop.time() - started)
+
+    def release(self):
+        """Hand the slot to the most urgent waiter, else free it"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_use -= 1
+
+    async def run(self, priority, fn, *args):
+        """Run blocking `fn(*args)` in a worker thread once a slot is free
+
+        The slot is held until the thread finishes, even if the caller stops
+        waiting, so the gate never admits more calls than it has slots.
+        """
+        await self.acquire(priority)
+        loop = asyncio.get_running_loop()
+        try:
+            # Per-request query stats live in context variables
+            call = functools.partial(copy_context().run, fn, *args)
+            future = loop.run_in_executor(None, call)
+        except BaseException:
+            self.release()
+            raise
+        future.add_done_callback(lambda _: self.release())
+        return await asyncio.shield(future)
+
+    def _admitted(self, priority, waited):
+        if self.on_admit is not None:
+            self.on_admit(priority, waited)
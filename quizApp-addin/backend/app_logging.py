@@ -0,0 +1,198 @@
+"""
+Structured, non-blocking logging for the backend
+
+Records are pushed onto an in-memory queue by the request path and written
+as JSON lines to stdout by a background listener thread, so a slow terminal
+never adds latency to a request. High-volume events can be sampled and every
+record carries the request/session id of the request that produced it.
+
+Usage:
+    logger = logging.getLogger("classpoint.api")
+    logger.info("Answer submitted", extra={"event": "answer_submitted"})
+"""
+
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from urllib.parse import parse_qs
+import atexit
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+
+import orjson
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# e.g. "answer_submitted=0.1,client_connected=0.25"
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES",
+                             "answer_submitted=0.1,client_connected=0.25,"
+                             "client_disconnected=0.25,student_joined=0.25")
+
+request_id_var: ContextVar = ContextVar("request_id", default=None)
+session_id_var: ContextVar = ContextVar("session_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+_SESSION_IN_PATH = re.compile(r"/session/(\d+)")
+
+
+def parse_sample_rates(spec):
+    """Parse "event=rate,event=rate" into a dict of floats"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        event, _, rate = item.partition("=")
+        try:
+            rates[event.strip()] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class ContextFilter(logging.Filter):
+    """Attach the current request and session ids to every record"""
+
+    def filter(self, record):
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        if getattr(record, "session_id", None) is None:
+            record.session_id = session_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records for configured high-volume events
+
+    Warnings and errors are never sampled away.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None or rate >= 1.0 or random.random() < rate:
+            if rate is not None:
+                record.sample_rate = rate
+            return True
+        self.dropped += 1
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    """Render records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks and leaves formatting to the listener"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge args now (they may be mutated later) but defer traceback
+        # formatting and JSON encoding to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_queue_handler = None
+
+
+def setup_logging(level=LOG_LEVEL, sample_rates=None):
+    """Route the `classpoint` loggers through a background JSON writer (idempotent)"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _queue_handler
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(ContextFilter())
+    _queue_handler.addFilter(SamplingFilter(
+        sample_rates if sample_rates is not None else parse_sample_rates(LOG_SAMPLE_RATES)))
+
+    root = logging.getLogger("classpoint")
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+    root.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _queue_handler
+
+
+class RequestContextMiddleware:
+    """ASGI middleware binding a request id (and session id if present) to the context"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex[:12]
+
+        session_id = None
+        match = _SESSION_IN_PATH.search(scope.get("path", ""))
+        if match:
+            session_id = int(match.group(1))
+        elif scope.get("query_string"):
+            values = parse_qs(scope["query_string"].decode("latin-1")).get("session_id")
+            if values and values[0].isdigit():
+                session_id = int(values[0])
+
+        request_token = request_id_var.set(request_id)
+        session_token = session_id_var.set(session_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(request_token)
+            session_id_var.reset(session_token)
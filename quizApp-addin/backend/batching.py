@@ -0,0 +1,98 @@
+"""
+Micro-batching of writes that arrive in storms
+
+At the start of a lecture hundreds of students join within seconds. Instead
+of one INSERT and commit per student, requests wait a few milliseconds for
+company and the whole group is written by one blocking `flush(items)` call
+in a worker thread; each caller gets back its own result.
+"""
+
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger("classpoint.batching")
+
+# How long the first request of a batch waits for others (0 flushes every tick)
+JOIN_BATCH_WINDOW_MS = float(os.getenv("JOIN_BATCH_WINDOW_MS", "5"))
+# A batch this large is flushed at once; keeps statements under SQLite's parameter limit
+JOIN_BATCH_MAX = int(os.getenv("JOIN_BATCH_MAX", "200"))
+
+
+class MicroBatcher:
+    """Groups concurrent `submit(item)` calls into one `flush(items)` call
+
+    Args:
+        flush: Blocking `flush(items) -> results`, one result per item in
+            order, run in a worker thread
+        window: Seconds the first item of a batch waits for more
+        max_batch: Flush as soon as this many items are waiting
+        on_flush: Optional `on_flush(size, seconds)` called after each batch
+        run: Optional coroutine `run(flush, items)` used instead of a plain
+            worker thread, e.g. to take a slot from the admission gate
+    """
+
+    def __init__(self, flush, window=JOIN_BATCH_WINDOW_MS / 1000,
+                 max_batch=JOIN_BATCH_MAX, on_flush=None, run=None):
+        self.flush = flush
+        self.window = window
+        self.max_batch = max_batch
+        self.on_flush = on_flush
+        self.run = run
+        self._pending = []
+        self._timer = None
+        self._flushing = set()   # batches being written, referenced until done
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        """Queue one item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._start_flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._start_flush, loop)
+        return await future
+
+    def _start_flush(self, loop):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # Batches may overlap: the next one fills while this one is written
+            task = loop.create_task(self._flush(loop, batch))
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+
+    async def drain(self):
+        """Flush what is waiting and wait for every batch being written"""
+        self._start_flush(asyncio.get_running_loop())
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    async def _flush(self, loop, batch):
+        started = loop.time()
+        try:
+            items = [item for item, _ in batch]
+            if self.run is not None:
+                results = await self.run(self.flush, items)
+            else:
+                results = await loop.run_in_executor(None, self.flush, items)
+        except Exception as e:
+            logger.exception("Batch flush failed", extra={"batch_size": len(batch)})
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future), result in zip(batch, results):
+            # A caller that gave up (disconnect, timeout) just misses its result
+            if not future.done():
+                future.set_result(result)
+        if self.on_flush is not None:
+            self.on_flush(len(batch), loop.time() - started)
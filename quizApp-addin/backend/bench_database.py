@@ -0,0 +1,268 @@
+"""
+Microbenchmarks for the database.py data-access layer
+
+Seeds throwaway datasets of increasing size into the configured database
+(.env), times each helper against them and writes machine-readable results
+so releases can be compared:
+
+    python bench_database.py                         # 10 / 1k / 100k students
+    python bench_database.py --sizes 10 1000 --quizzes 2000 --repeat 50
+    python bench_database.py --output bench_database.json
+
+Every dataset belongs to a dedicated "bench_*" teacher that is deleted
+(cascading to all seeded rows) when the run finishes, unless --keep is given.
+Run it against a development database, never production.
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import string
+import subprocess
+import time
+
+import database
+from database import (
+    get_db_connection,
+    submit_answer,
+    get_session_results,
+    get_student_responses,
+    get_quiz_details,
+    get_teacher_quizzes,
+    get_session_by_code,
+)
+
+
+# Names and class codes must differ between runs even with a fixed --seed
+_unique = random.SystemRandom()
+
+
+def _code(prefix):
+    return prefix + "".join(_unique.choices(string.ascii_uppercase + string.digits, k=10 - len(prefix)))
+
+
+def _execute(sql, params=(), fetch=False):
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit("Database connection failed - check .env")
+    try:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall() if fetch else None
+        conn.commit()
+        cur.close()
+        return rows
+    finally:
+        conn.close()
+
+
+def seed_teacher():
+    suffix = "".join(_unique.choices(string.ascii_lowercase + string.digits, k=10))
+    rows = _execute("""
+        INSERT INTO teachers (username, email, password)
+        VALUES (%s, %s, 'bench')
+        RETURNING teacher_id
+    """, (f"bench_{suffix}", f"bench_{suffix}@example.com"), fetch=True)
+    return rows[0]['teacher_id']
+
+
+def seed_session(teacher_id, students):
+    """One quiz with four choices and a session with `students` answers in it"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO quizzes (teacher_id, title, num_choices, has_correct)
+        VALUES (%s, %s, 4, true) RETURNING quiz_id
+    """, (teacher_id, f"bench {students} students"))
+    quiz_id = cur.fetchone()['quiz_id']
+    cur.execute("""
+        INSERT INTO questions (quiz_id, question_text) VALUES (%s, 'Benchmark question')
+        RETURNING question_id
+    """, (quiz_id,))
+    question_id = cur.fetchone()['question_id']
+    cur.execute("""
+        INSERT INTO answers (question_id, answer_text, answer_order, is_correct)
+        SELECT %s, 'Choice ' || g, g, g = 0 FROM generate_series(0, 3) g
+        RETURNING answer_id
+    """, (question_id,))
+    answer_ids = [r['answer_id'] for r in cur.fetchall()]
+    class_code = _code("B")
+    cur.execute("""
+        INSERT INTO quiz_sessions (quiz_id, class_code, status, started_at)
+        VALUES (%s, %s, 'active', NOW() AT TIME ZONE 'UTC') RETURNING session_id
+    """, (quiz_id, class_code))
+    session_id = cur.fetchone()['session_id']
+    conn.commit()
+
+    # The participant-count trigger recounts the session on every row, which
+    # is quadratic for a bulk insert; skip it when we own the table
+    trigger_disabled = False
+    try:
+        cur.execute("ALTER TABLE students DISABLE TRIGGER USER")
+        trigger_disabled = True
+    except Exception:
+        conn.rollback()
+
+    cur.execute("""
+        INSERT INTO students (session_id, name)
+        SELECT %s, 'Student ' || g FROM generate_series(1, %s) g
+    """, (session_id, students))
+    if trigger_disabled:
+        cur.execute("ALTER TABLE students ENABLE TRIGGER USER")
+        cur.execute("""
+            UPDATE quiz_sessions SET total_participants = %s WHERE session_id = %s
+        """, (students, session_id))
+
+    # Every student answers once, spread over the four choices
+    cur.execute("""
+        INSERT INTO student_answers
+            (student_id, session_id, question_id, answer_id, is_correct, time_taken_seconds)
+        SELECT s.student_id, s.session_id, %s,
+               (ARRAY[%s, %s, %s, %s])[(s.student_id %% 4) + 1],
+               (s.student_id %% 4) = 0,
+               (s.student_id %% 60)
+        FROM students s WHERE s.session_id = %s
+    """, (question_id, *answer_ids, session_id))
+    cur.execute("SELECT MIN(student_id) AS first FROM students WHERE session_id = %s",
+                (session_id,))
+    first_student = cur.fetchone()['first']
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    return {
+        "quiz_id": quiz_id,
+        "question_id": question_id,
+        "answer_ids": answer_ids,
+        "session_id": session_id,
+        "class_code": class_code,
+        "first_student": first_student,
+    }
+
+
+def seed_quizzes(teacher_id, count):
+    """`count` quizzes for one teacher, each with one closed session"""
+    _execute("""
+        WITH q AS (
+            INSERT INTO quizzes (teacher_id, title, num_choices, created_at)
+            SELECT %s, 'Bench quiz ' || g, 4, NOW() - (g || ' minutes')::interval
+            FROM generate_series(1, %s) g
+            RETURNING quiz_id
+        )
+        INSERT INTO quiz_sessions (quiz_id, class_code, status)
+        SELECT quiz_id, 'Q' || substr(md5(random()::text || quiz_id), 1, 9), 'closed'
+        FROM q
+    """, (teacher_id, count))
+
+
+def time_call(func, args_for_iteration, repeat, warmup=1):
+    for i in range(warmup):
+        func(*args_for_iteration(i))
+    samples = []
+    for i in range(repeat):
+        args = args_for_iteration(warmup + i)
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    ordered = sorted(samples)
+    return {
+        "repeat": repeat,
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * (len(ordered) - 1) + 0.5))], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000],
+                        help="students per session")
+    parser.add_argument("--quizzes", type=int, default=10000, help="quizzes for one teacher")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default="bench_database.json")
+    parser.add_argument("--keep", action="store_true", help="keep seeded data")
+    args = parser.parse_args()
+
+    if database.STORAGE_BACKEND != "postgres":
+        raise SystemExit("bench_database.py seeds with Postgres SQL; set STORAGE_BACKEND=postgres")
+
+    print("=" * 70)
+    print(f"database.py benchmarks against {database.DB_CONFIG['host']}/"
+          f"{database.DB_CONFIG['database']}")
+    print("=" * 70)
+
+    teacher_id = seed_teacher()
+    results = []
+    try:
+        for size in args.sizes:
+            print(f"\nSeeding session with {size} students...")
+            started = time.perf_counter()
+            data = seed_session(teacher_id, size)
+            print(f"  seeded in {time.perf_counter() - started:.1f}s")
+            # Fewer repeats for the functions that return every student row
+            heavy_repeat = max(3, args.repeat // 4) if size >= 100000 else args.repeat
+
+            cases = {
+                "submit_answer": (submit_answer, lambda i, d=data, n=size: (
+                    d["first_student"] + (i % n), d["session_id"], d["question_id"],
+                    d["answer_ids"][i % 4], 5), args.repeat),
+                "get_session_results": (get_session_results,
+                                        lambda i, d=data: (d["session_id"],), args.repeat),
+                "get_student_responses": (get_student_responses,
+                                          lambda i, d=data: (d["session_id"],), heavy_repeat),
+                "get_quiz_details": (get_quiz_details,
+                                     lambda i, d=data: (d["quiz_id"],), args.repeat),
+                "get_session_by_code": (get_session_by_code,
+                                        lambda i, d=data: (d["class_code"],), args.repeat),
+            }
+            for name, (func, arg_fn, repeat) in cases.items():
+                stats = time_call(func, arg_fn, repeat)
+                results.append({"function": name, "dataset": "students_per_session",
+                                "size": size, **stats})
+                print(f"  {name:<24} median {stats['median_ms']:>9} ms   "
+                      f"p95 {stats['p95_ms']:>9} ms")
+
+        print(f"\nSeeding {args.quizzes} quizzes for one teacher...")
+        quiz_teacher = seed_teacher()
+        try:
+            seed_quizzes(quiz_teacher, args.quizzes)
+            stats = time_call(get_teacher_quizzes, lambda i: (quiz_teacher,), args.repeat)
+            results.append({"function": "get_teacher_quizzes", "dataset": "quizzes_per_teacher",
+                            "size": args.quizzes, **stats})
+            print(f"  {'get_teacher_quizzes':<24} median {stats['median_ms']:>9} ms   "
+                  f"p95 {stats['p95_ms']:>9} ms")
+        finally:
+            if not args.keep:
+                _execute("DELETE FROM teachers WHERE teacher_id = %s", (quiz_teacher,))
+    finally:
+        if not args.keep:
+            _execute("DELETE FROM teachers WHERE teacher_id = %s", (teacher_id,))
+
+    report = {
+        "suite": "database",
+        "timestamp": time.time(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "db_host": database.DB_CONFIG["host"],
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
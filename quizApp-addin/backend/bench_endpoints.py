@@ -0,0 +1,108 @@
+"""
+Throughput benchmark for the hot polling endpoints
+Measures requests/sec and latency for /results and /api/session/code/{code}
+
+Usage (backend must be running):
+    python bench_endpoints.py --session-id 12 --class-code ABC123 --label after
+    RESPONSE_CACHE_ENABLED=0 python main.py   # then rerun with --label before
+
+Each run appends a JSON line to --output so before/after runs can be compared.
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+
+import requests
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def hammer(url, duration, concurrency):
+    """Hit one URL from `concurrency` keep-alive clients for `duration` seconds"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        local_latencies = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = session.get(url, timeout=10)
+                if response.status_code != 200:
+                    local_errors += 1
+            except requests.RequestException:
+                local_errors += 1
+            local_latencies.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--session-id", type=int, required=True)
+    parser.add_argument("--class-code", required=True)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--label", default="run", help="e.g. before / after")
+    parser.add_argument("--output", default="bench_endpoints.jsonl")
+    args = parser.parse_args()
+
+    endpoints = {
+        "results": f"{args.base_url}/api/session/{args.session_id}/results",
+        "session_code": f"{args.base_url}/api/session/code/{args.class_code}",
+    }
+
+    print("=" * 60)
+    print(f"Endpoint benchmark [{args.label}] - {args.concurrency} clients, {args.duration}s each")
+    print("=" * 60)
+
+    report = {"label": args.label, "timestamp": time.time(),
+              "concurrency": args.concurrency, "endpoints": {}}
+    for name, url in endpoints.items():
+        stats = hammer(url, args.duration, args.concurrency)
+        report["endpoints"][name] = stats
+        print(f"{name:>14}: {stats['requests_per_sec']:>8} req/s  "
+              f"p50 {stats['p50_ms']}ms  p95 {stats['p95_ms']}ms  "
+              f"p99 {stats['p99_ms']}ms  errors {stats['errors']}")
+
+    with open(args.output, "a") as f:
+        f.write(json.dumps(report) + "\n")
+    print(f"\nResults appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
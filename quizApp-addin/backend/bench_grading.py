@@ -0,0 +1,143 @@
+"""
+Grading benchmark: one session's worth of submissions graded at close
+
+Generates --submissions stored answers (rows as get_session_answers()
+returns them) for --students students over --questions questions, about
+half of them multi-select, and grades them with the vectorized
+grade_session() and with a per-student loop over score_question():
+
+    python bench_grading.py
+    python bench_grading.py --submissions 100000 --students 5000 --label after
+
+The database read is not included; both sides get the same rows.
+"rows_to_columns" is the part of the vectorized time spent copying the
+row dicts into arrays. Each run appends a JSON line to --output.
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+
+from grading import answer_columns, grade_session
+from scoring import difficulty_multiplier, score_question
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def make_session(submissions, students, questions, seed):
+    rng = random.Random(seed)
+    question_set = []
+    for q in range(1, questions + 1):
+        multi = q % 2 == 0
+        flags = [i == 0 or (multi and rng.random() < 0.5) for i in range(5)]
+        question_set.append({'question_id': q, 'answers': [
+            {'answer_id': q * 10 + i, 'is_correct': flag} for i, flag in enumerate(flags)]})
+
+    rows = []
+    while len(rows) < submissions:
+        student_id = rng.randint(1, students)
+        q = rng.choice(question_set)
+        answer = rng.choice(q['answers'])
+        rows.append({'student_id': student_id, 'student_name': f"Student {student_id}",
+                     'question_id': q['question_id'], 'answer_id': answer['answer_id'],
+                     'time_taken_seconds': rng.randint(1, 40)})
+    rows.sort(key=lambda r: r['student_id'])
+    return question_set, rows
+
+
+def grade_in_python(questions, rows, quiz_mode):
+    """The same grades one student and question at a time"""
+    multiplier = difficulty_multiplier(quiz_mode)
+    correct = {q['question_id']: frozenset(a['answer_id'] for a in q['answers'] if a['is_correct'])
+               for q in questions}
+    chosen = {}
+    for row in rows:
+        chosen.setdefault(row['student_id'], {}).setdefault(
+            row['question_id'], {})[row['answer_id']] = row['time_taken_seconds'] or 0
+    standings = []
+    for student_id, answers in chosen.items():
+        score = seconds = 0
+        for question_id, picks in answers.items():
+            points, _, taken = score_question(correct.get(question_id), picks, multiplier)
+            if points:
+                score, seconds = score + points, seconds + taken
+        standings.append((-score, seconds, student_id))
+    return sorted(standings)
+
+
+def time_runs(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"p50_ms": round(percentile(samples, 50), 2),
+            "min_ms": round(min(samples), 2),
+            "max_ms": round(max(samples), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=100000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--quiz-mode", default="hard", choices=["easy", "medium", "hard"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--label", default="run", help="e.g. before / after")
+    parser.add_argument("--output", default="bench_grading.jsonl")
+    args = parser.parse_args()
+
+    questions, rows = make_session(args.submissions, args.students, args.questions, args.seed)
+    print("=" * 60)
+    print(f"Grading [{args.label}] - {len(rows)} submissions, {args.students} students, "
+          f"{args.questions} questions")
+    print("=" * 60)
+
+    grades = grade_session(questions, rows, args.quiz_mode)
+    expected = grade_in_python(questions, rows, args.quiz_mode)
+    if [s['student_id'] for s in grades['students']] != [s[2] for s in expected]:
+        raise SystemExit("Vectorized and per-student grades disagree")
+
+    results = {
+        "vectorized": time_runs(lambda: grade_session(questions, rows, args.quiz_mode),
+                                args.repeat),
+        "rows_to_columns": time_runs(lambda: answer_columns(rows), args.repeat),
+        "per_student_loop": time_runs(lambda: grade_in_python(questions, rows, args.quiz_mode),
+                                      args.repeat),
+    }
+    for stats in results.values():
+        stats["submissions_per_sec"] = round(len(rows) / (stats["p50_ms"] / 1000))
+    for name, stats in results.items():
+        print(f"{name:>18}: p50 {stats['p50_ms']}ms  "
+              f"({stats['submissions_per_sec']} submissions/s)")
+
+    report = {"label": args.label, "timestamp": time.time(), "commit": git_commit(),
+              "python": platform.python_version(), "submissions": len(rows),
+              "students": args.students, "questions": args.questions,
+              "quiz_mode": args.quiz_mode, "results": results}
+    with open(args.output, "a") as f:
+        f.write(json.dumps(report) + "\n")
+    print(f"\nResults appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Join-storm benchmark: joins/sec and join latency when a whole lecture joins at once
+
+Fires --students simultaneous class-code joins at the storage backend, first
+one transaction per student (what /api/student/join-by-code did before
+batching), then through the MicroBatcher the API uses now:
+
+    python bench_joins.py                                   # SQLite in a temp dir
+    python bench_joins.py --students 1000 --window-ms 5 --label after
+    STORAGE_BACKEND=postgres python bench_joins.py --backend postgres
+
+Latency is measured from the moment all joins are released to the moment
+each one has its student_id, so it includes time spent queued. Each run
+appends a JSON line to --output.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import uuid
+
+from batching import MicroBatcher
+from storage import create_storage
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def open_store(kind, path):
+    if kind == "postgres":
+        from database import DB_CONFIG
+        return create_storage("postgres", config=DB_CONFIG)
+    return create_storage(kind, path=path)
+
+
+def seed_session(store):
+    name = f"bench_{uuid.uuid4().hex[:8]}"
+    teacher_id, error = store.create_teacher(name, f"{name}@example.com", "bench")
+    if error:
+        raise SystemExit(f"Seeding failed: {error}")
+    quiz_id, _ = store.create_quiz(teacher_id, "Join storm", 4, False, True,
+                                   False, False, False, None, 'easy')
+    question_id, _ = store.add_question(quiz_id, "Ready?")
+    store.add_answers(question_id, [{'text': f"Choice {i}", 'order': i, 'is_correct': i == 0}
+                                    for i in range(4)])
+    class_code = uuid.uuid4().hex[:6].upper()
+    store.create_quiz_session(quiz_id, class_code, None)
+    return class_code
+
+
+async def storm(join, students, class_code):
+    """Release every join at once; returns (wall seconds, per-join latencies, errors)"""
+    released = asyncio.Event()
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        await released.wait()
+        started = time.perf_counter()
+        payload, error = await join((class_code, f"Student {i}"))
+        latencies.append(time.perf_counter() - started)
+        if error or not payload:
+            errors += 1
+
+    tasks = [asyncio.create_task(one(i)) for i in range(students)]
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    released.set()
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - started, latencies, errors
+
+
+def summarize(wall, latencies, errors):
+    samples = [s * 1000 for s in latencies]
+    return {
+        "joins_per_sec": round(len(samples) / wall, 1),
+        "wall_s": round(wall, 3),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "max_ms": round(max(samples), 2),
+        "errors": errors,
+    }
+
+
+async def run(store, students, window_ms, max_batch):
+    loop = asyncio.get_running_loop()
+    results = {}
+
+    async def single(join):
+        return await loop.run_in_executor(None, store.join_session_by_code, *join)
+
+    results["one_transaction_per_join"] = summarize(
+        *await storm(single, students, seed_session(store)))
+
+    batcher = MicroBatcher(store.join_sessions_by_code, window=window_ms / 1000,
+                           max_batch=max_batch)
+    results["micro_batched"] = summarize(
+        *await storm(batcher.submit, students, seed_session(store)))
+    results["micro_batched"]["batches"] = batcher.batches
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default=os.getenv("STORAGE_BACKEND", "sqlite"),
+                        choices=["sqlite", "postgres", "memory"])
+    parser.add_argument("--students", type=int, default=1000, help="simultaneous joins")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=200)
+    parser.add_argument("--label", default="run", help="e.g. before / after")
+    parser.add_argument("--output", default="bench_joins.jsonl")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = open_store(args.backend, os.path.join(tmp, "bench.sqlite3"))
+        print("=" * 60)
+        print(f"Join storm [{args.label}] - {args.students} simultaneous joins on {args.backend}")
+        print("=" * 60)
+        results = asyncio.run(run(store, args.students, args.window_ms, args.max_batch))
+
+    for name, stats in results.items():
+        print(f"{name:>26}: {stats['joins_per_sec']:>8} joins/s  "
+              f"p50 {stats['p50_ms']}ms  p99 {stats['p99_ms']}ms  errors {stats['errors']}")
+
+    report = {"label": args.label, "timestamp": time.time(), "commit": git_commit(),
+              "python": platform.python_version(), "backend": args.backend,
+              "students": args.students, "window_ms": args.window_ms,
+              "max_batch": args.max_batch, "results": results}
+    with open(args.output, "a") as f:
+        f.write(json.dumps(report) + "\n")
+    print(f"\nResults appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
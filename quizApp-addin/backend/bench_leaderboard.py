@@ -0,0 +1,143 @@
+"""
+Leaderboard benchmark: cost of keeping a competition session ranked live
+
+Builds a session of --students students answering --questions questions,
+then replays the answers one at a time, as /api/student/answer does. Each
+answer re-ranks its student and reads the top K (what a push sends). The
+skip-list Leaderboard the API uses is compared with re-sorting every
+student per answer:
+
+    python bench_leaderboard.py
+    python bench_leaderboard.py --students 5000 --questions 10 --label after
+
+Each run appends a JSON line to --output.
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+
+from leaderboard import Leaderboard, LEADERBOARD_TOP_K
+from scoring import score_question
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def make_session(students, questions, seed):
+    """(correct answer sets, answers in arrival order as (student, question, answer, seconds))"""
+    rng = random.Random(seed)
+    correct = {q: frozenset({q * 10}) for q in range(questions)}
+    answers = []
+    for q in range(questions):
+        for student_id in rng.sample(range(students), students):
+            choice = q * 10 + (0 if rng.random() < 0.6 else rng.randint(1, 3))
+            answers.append((student_id, q, choice, rng.randint(1, 40)))
+    return correct, answers
+
+
+class SortedBoard:
+    """The obvious version: scores in a dict, sorted whenever it is read"""
+
+    def __init__(self, correct):
+        self.correct = correct
+        self.answers = {}
+        self.scores = {}
+
+    def record(self, student_id, question_id, answer_id, seconds):
+        answers = self.answers.setdefault(student_id, {})
+        answers.setdefault(question_id, {})[answer_id] = seconds
+        score = taken = 0
+        for qid, chosen in answers.items():
+            points, _, spent = score_question(self.correct.get(qid), chosen)
+            score, taken = score + points, taken + (spent if points else 0)
+        self.scores[student_id] = (-score, taken, student_id)
+
+    def top(self, count):
+        return sorted(self.scores.values())[:count]
+
+
+def replay(board, answers, top_k, limit):
+    """Per-answer update and top-K read times in ms"""
+    updates, reads = [], []
+    for student_id, question_id, answer_id, seconds in answers[:limit]:
+        started = time.perf_counter()
+        board.record(student_id, question_id, answer_id, seconds)
+        updated = time.perf_counter()
+        board.top(top_k)
+        updates.append((updated - started) * 1000)
+        reads.append((time.perf_counter() - updated) * 1000)
+    return updates, reads
+
+
+def summarize(updates, reads):
+    return {
+        "answers": len(updates),
+        "update_p50_ms": round(percentile(updates, 50), 4),
+        "update_p99_ms": round(percentile(updates, 99), 4),
+        "top_k_p50_ms": round(percentile(reads, 50), 4),
+        "top_k_p99_ms": round(percentile(reads, 99), 4),
+        "answers_per_sec": round(len(updates) / ((sum(updates) + sum(reads)) / 1000), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--top-k", type=int, default=LEADERBOARD_TOP_K)
+    parser.add_argument("--sorted-answers", type=int, default=2000,
+                        help="answers replayed on the re-sorting board (it is slow)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--label", default="run", help="e.g. before / after")
+    parser.add_argument("--output", default="bench_leaderboard.jsonl")
+    args = parser.parse_args()
+
+    correct, answers = make_session(args.students, args.questions, args.seed)
+    print("=" * 60)
+    print(f"Leaderboard [{args.label}] - {args.students} students, {len(answers)} answers")
+    print("=" * 60)
+
+    board = Leaderboard(correct, rng=random.Random(args.seed))
+    for student_id in range(args.students):
+        board.add_student(student_id, f"Student {student_id}")
+    results = {"skip_list": summarize(*replay(board, answers, args.top_k, len(answers)))}
+
+    naive = SortedBoard(correct)
+    for student_id in range(args.students):
+        naive.scores[student_id] = (0, 0, student_id)
+    results["sort_per_read"] = summarize(
+        *replay(naive, answers, args.top_k, args.sorted_answers))
+
+    for name, stats in results.items():
+        print(f"{name:>14}: {stats['answers_per_sec']:>10} answers/s  "
+              f"update p50 {stats['update_p50_ms']}ms p99 {stats['update_p99_ms']}ms  "
+              f"top {args.top_k} p50 {stats['top_k_p50_ms']}ms p99 {stats['top_k_p99_ms']}ms")
+
+    report = {"label": args.label, "timestamp": time.time(), "commit": git_commit(),
+              "python": platform.python_version(), "students": args.students,
+              "questions": args.questions, "top_k": args.top_k, "results": results}
+    with open(args.output, "a") as f:
+        f.write(json.dumps(report) + "\n")
+    print(f"\nResults appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Single-flight coalescing of identical reads
+
+A teacher with the add-in dialog, the live page and a projector open asks
+for the same session's results several times a second. Calls with the same
+key that overlap share one execution, and its result is kept for
+READ_CACHE_TTL_MS so calls arriving just after it finished reuse it too.
+Keys should carry whatever makes a result obsolete (the API uses the time
+of the session's last write seen by this process), so a read never
+reuses a result from before a write it follows.
+"""
+
+from collections import OrderedDict
+import asyncio
+import os
+import time
+
+# How long a finished read's result is served to identical calls
+READ_CACHE_TTL_MS = float(os.getenv("READ_CACHE_TTL_MS", 500))
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", 4096))
+
+
+class SingleFlight:
+    """Concurrent `do(key, fn)` calls with one key share one `await fn()`
+
+    Only touched from the event loop, so no lock is needed.
+
+    Args:
+        ttl: Seconds a successful result is reused; 0 disables the cache
+        max_entries: Results kept at most, oldest dropped first
+        on_saved: Optional `on_saved(key, reason)` for every call that did
+            not execute, reason "inflight" or "ttl"
+    """
+
+    def __init__(self, ttl=READ_CACHE_TTL_MS / 1000, max_entries=READ_CACHE_MAX_ENTRIES,
+                 on_saved=None, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.on_saved = on_saved
+        self.clock = clock
+        self._inflight = {}
+        self._results = OrderedDict()    # key -> (expires, result)
+        self.executed = 0
+        self.saved = 0
+
+    async def do(self, key, fn):
+        """The result of `await fn()`, shared with identical overlapping calls"""
+        entry = self._results.get(key)
+        if entry is not None:
+            if entry[0] > self.clock():
+                self._saved(key, "ttl")
+                return entry[1]
+            del self._results[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.executed += 1
+            task = self._inflight[key] = asyncio.ensure_future(self._execute(key, fn))
+            task.add_done_callback(_retrieve)
+        else:
+            self._saved(key, "inflight")
+        # One caller giving up (disconnect, timeout) does not cancel the others
+        return await asyncio.shield(task)
+
+    async def _execute(self, key, fn):
+        try:
+            result = await fn()
+        finally:
+            self._inflight.pop(key, None)
+        if self.ttl > 0:
+            self._results[key] = (self.clock() + self.ttl, result)
+            self._results.move_to_end(key)
+            self._prune()
+        return result
+
+    def _prune(self):
+        now = self.clock()
+        while self._results:
+            expires, _ = next(iter(self._results.values()))
+            if expires > now and len(self._results) <= self.max_entries:
+                break
+            self._results.popitem(last=False)
+
+    def _saved(self, key, reason):
+        self.saved += 1
+        if self.on_saved is not None:
+            self.on_saved(key, reason)
+
+
+def _retrieve(task):
+    # Errors reach every waiter; this only stops asyncio logging them again
+    # when every waiter has already gone
+    if not task.cancelled():
+        task.exception()
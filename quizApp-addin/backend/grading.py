@@ -0,0 +1,126 @@
+"""
+Whole-session grading in one vectorized pass
+
+Every stored answer of a session becomes one entry of a few NumPy arrays
+(student index, question index, answer correctness, seconds). Right and
+wrong picks, and the time of each answer set, are then accumulated per
+(student, question) cell in one scatter each, so grading costs a handful
+of array operations no matter how many students answered. The rules are
+those of scoring.py; the points match score_question() exactly.
+"""
+
+from operator import itemgetter
+
+import numpy as np
+
+from scoring import difficulty_multiplier, SCORE_POINTS, SCORE_SPEED_BONUS, SCORE_SPEED_WINDOW_S
+
+
+_ANSWER_COLUMNS = itemgetter('student_id', 'answer_id', 'time_taken_seconds')
+
+
+def answer_columns(rows):
+    """(student ids, answer ids, seconds) arrays of get_session_answers() rows,
+    -1 for a NULL answer and 0 for a NULL time"""
+    if not rows:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+    students, answers, seconds = zip(*map(_ANSWER_COLUMNS, rows))
+    # None becomes NaN in a float array, one pass instead of a Python test per row
+    answers = np.nan_to_num(np.array(answers, dtype=np.float64), nan=-1).astype(np.int64)
+    seconds = np.nan_to_num(np.array(seconds, dtype=np.float64), nan=0.0)
+    return np.array(students, dtype=np.int64), answers, seconds
+
+
+def grade_session(questions, rows, quiz_mode="easy"):
+    """Grade every student of a session
+
+    Args:
+        questions: The quiz's question set, each with its `answers`
+        rows: get_session_answers() rows; students without answers come with
+            NULL answer columns
+        quiz_mode: The quiz's difficulty, picking the points multiplier
+
+    Returns:
+        {'quiz_mode', 'multiplier', 'question_count', 'students', 'questions'}.
+        Students are best first, each with rank, student_id, student_name,
+        score, correct (full credit), partial, answered and seconds.
+        Questions carry their answered count, full-credit count and average
+        credit over the session's students.
+    """
+    multiplier = difficulty_multiplier(quiz_mode)
+
+    # One entry per answer option, sorted by answer id for lookups
+    options = sorted((a['answer_id'], i, bool(a['is_correct']))
+                     for i, q in enumerate(questions) for a in q['answers'])
+    option_ids = np.array([o[0] for o in options], dtype=np.int64)
+    option_question = np.array([o[1] for o in options], dtype=np.int64)
+    option_correct = np.array([o[2] for o in options], dtype=bool)
+    correct_count = np.bincount(option_question[option_correct], minlength=len(questions))
+
+    row_student, row_answer, row_seconds = answer_columns(rows)
+    count = len(row_student)
+    student_ids, first, row_student = np.unique(row_student, return_index=True,
+                                                return_inverse=True)
+    names = {student_id: rows[i]['student_name']
+             for student_id, i in zip(student_ids.tolist(), first.tolist())}
+
+    option = np.minimum(np.searchsorted(option_ids, row_answer), max(len(option_ids) - 1, 0))
+    known = (option_ids[option] == row_answer) if len(option_ids) else np.zeros(count, bool)
+    # An answer stored twice counts once, with its last row's time
+    cell = row_student[known] * len(option_ids) + option[known]
+    _, from_end = np.unique(cell[::-1], return_index=True)
+    picked = np.flatnonzero(known)[len(cell) - 1 - from_end]
+    option = option[picked]
+
+    shape = (len(student_ids), len(questions))
+    flat = row_student[picked] * len(questions) + option_question[option]
+    size = shape[0] * shape[1]
+    hits = np.bincount(flat, weights=option_correct[option], minlength=size).reshape(shape)
+    wrong = np.bincount(flat, weights=~option_correct[option], minlength=size).reshape(shape)
+    seconds = np.zeros(size)
+    np.maximum.at(seconds, flat, row_seconds[picked])
+    seconds = seconds.reshape(shape)
+    answered = np.bincount(flat, minlength=size).reshape(shape) > 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        credit = np.where(correct_count > 0, (hits - wrong) / correct_count, 0.0)
+    credit = np.clip(credit, 0.0, 1.0)
+    if SCORE_SPEED_WINDOW_S > 0:
+        speed = np.clip(1.0 - seconds / SCORE_SPEED_WINDOW_S, 0.0, 1.0)
+    else:
+        speed = np.zeros(shape)
+    points = np.rint(multiplier * credit * (SCORE_POINTS + SCORE_SPEED_BONUS * speed))
+    points = points.astype(np.int64)
+
+    earned = points > 0
+    score = points.sum(axis=1)
+    full = (credit == 1.0).sum(axis=1)
+    partial = (earned & (credit < 1.0)).sum(axis=1)
+    time_spent = np.where(earned, seconds, 0.0).sum(axis=1)
+    # Best score first, then least time, then student id, as on the leaderboard
+    ranking = np.lexsort((student_ids, time_spent, -score))
+
+    columns = zip(student_ids[ranking].tolist(), score[ranking].tolist(),
+                  full[ranking].tolist(), partial[ranking].tolist(),
+                  answered.sum(axis=1)[ranking].tolist(), time_spent[ranking].tolist())
+    students = [{"rank": rank, "student_id": student_id, "student_name": names[student_id],
+                 "score": points, "correct": correct, "partial": part,
+                 "answered": questions_answered, "seconds": int(spent)}
+                for rank, (student_id, points, correct, part, questions_answered, spent)
+                in enumerate(columns, 1)]
+
+    student_count = max(len(student_ids), 1)
+    question_stats = [{
+        "question_id": q['question_id'],
+        "answered": int(answered[:, i].sum()),
+        "correct": int((credit[:, i] == 1.0).sum()),
+        "average_credit": round(float(credit[:, i].sum()) / student_count, 3),
+    } for i, q in enumerate(questions)]
+
+    return {
+        "quiz_mode": quiz_mode or "easy",
+        "multiplier": multiplier,
+        "question_count": len(questions),
+        "students": students,
+        "questions": question_stats,
+    }
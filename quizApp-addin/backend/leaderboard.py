@@ -0,0 +1,255 @@
+"""
+Live leaderboards for competition-mode sessions
+
+Each session's students are kept in an indexable skip list ordered by
+score (then total answer time, then student id), so one submission moves
+its student in O(log n), a student's rank is O(log n) and the top K is a
+walk of K nodes. Boards are updated in process on every join and answer and
+rebuilt from the database when a process first needs one, like the
+deadlines the scheduler keeps.
+
+Points follow scoring.py, the rules session grades use too.
+"""
+
+from collections import OrderedDict
+import os
+import random
+
+from scoring import score_question
+
+# Entries in a pushed leaderboard event and the REST default
+LEADERBOARD_TOP_K = int(os.getenv("LEADERBOARD_TOP_K", 10))
+# Pushes of one session's top K are at most this often
+LEADERBOARD_PUSH_MS = float(os.getenv("LEADERBOARD_PUSH_MS", 1000))
+# Boards kept per process, least recently used dropped first
+LEADERBOARD_MAX_SESSIONS = int(os.getenv("LEADERBOARD_MAX_SESSIONS", 256))
+
+_MAX_LEVEL = 24
+_P = 0.25
+
+
+class _Node:
+    __slots__ = ("key", "value", "next", "span")
+
+    def __init__(self, key, value, level):
+        self.key = key
+        self.value = value
+        self.next = [None] * level
+        # Level-0 steps from this node to next[i]
+        self.span = [0] * level
+
+
+class SkipList:
+    """Unique sorted keys with values; ranks are 1-based"""
+
+    def __init__(self, rng=None):
+        self._head = _Node(None, None, _MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+        self._random = (rng or random.Random()).random
+
+    def __len__(self):
+        return self._size
+
+    def _random_level(self):
+        level = 1
+        while level < _MAX_LEVEL and self._random() < _P:
+            level += 1
+        return level
+
+    def insert(self, key, value=None):
+        update = [None] * _MAX_LEVEL
+        rank = [0] * _MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while node.next[i] is not None and node.next[i].key < key:
+                rank[i] += node.span[i]
+                node = node.next[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._size
+            self._level = level
+
+        new = _Node(key, value, level)
+        for i in range(level):
+            new.next[i] = update[i].next[i]
+            update[i].next[i] = new
+            new.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        self._size += 1
+
+    def remove(self, key):
+        """Remove key; False when it was not there"""
+        update = [None] * _MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            update[i] = node
+
+        target = node.next[0]
+        if target is None or target.key != key:
+            return False
+        for i in range(self._level):
+            if update[i].next[i] is target:
+                update[i].span[i] += target.span[i] - 1
+                update[i].next[i] = target.next[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+        return True
+
+    def rank(self, key):
+        """1-based position of key, or None"""
+        rank = 0
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key <= key:
+                rank += node.span[i]
+                node = node.next[i]
+            if node is not self._head and node.key == key:
+                return rank
+        return None
+
+    def first(self, count):
+        """Up to `count` (key, value) pairs from the front"""
+        items = []
+        node = self._head.next[0]
+        while node is not None and len(items) < count:
+            items.append((node.key, node.value))
+            node = node.next[0]
+        return items
+
+
+class _Standing:
+    __slots__ = ("name", "answers", "score", "correct", "seconds", "key")
+
+    def __init__(self, name):
+        self.name = name
+        self.answers = {}    # question_id -> {answer_id: seconds}
+        self.score = 0
+        self.correct = 0
+        self.seconds = 0
+        self.key = None
+
+
+class Leaderboard:
+    """Ranking of one session's students, updated one answer at a time
+
+    Answers are merged by answer id, so replaying rows already applied (a
+    rebuild racing live submissions) changes nothing. Only touched from the
+    event loop, so no lock is needed.
+    """
+
+    def __init__(self, correct_answers=None, multiplier=1.0, rng=None):
+        # question_id -> frozenset of correct answer ids
+        self.correct = dict(correct_answers or {})
+        # Difficulty multiplier of the quiz's mode
+        self.multiplier = multiplier
+        self._ranking = SkipList(rng)
+        self._students = {}
+
+    def __len__(self):
+        return len(self._students)
+
+    def add_student(self, student_id, name=None):
+        standing = self._students.get(student_id)
+        if standing is None:
+            standing = self._students[student_id] = _Standing(name)
+            self._place(student_id, standing)
+        elif name is not None:
+            standing.name = name
+        return standing
+
+    def record(self, student_id, question_id, answer_id, seconds):
+        """Apply one stored answer; returns (old_rank, new_rank)"""
+        seconds = seconds or 0
+        standing = self.add_student(student_id)
+        old_rank = self._ranking.rank(standing.key)
+        chosen = standing.answers.setdefault(question_id, {})
+        if chosen.get(answer_id) == seconds:
+            return old_rank, old_rank
+        chosen[answer_id] = seconds
+        self._rescore(student_id, standing)
+        return old_rank, self._ranking.rank(standing.key)
+
+    def load(self, correct_answers, rows):
+        """Take the quiz's correct sets and merge stored rows with student_id,
+        student_name and (question_id, answer_id, time_taken_seconds) or NULLs"""
+        self.correct.update(correct_answers)
+        for row in rows:
+            standing = self.add_student(row['student_id'], row['student_name'])
+            if row['question_id'] is not None:
+                standing.answers.setdefault(row['question_id'], {})[row['answer_id']] = \
+                    row['time_taken_seconds'] or 0
+        for student_id, standing in self._students.items():
+            self._rescore(student_id, standing)
+
+    def top(self, count=LEADERBOARD_TOP_K):
+        """The first `count` students, best first"""
+        return [self._entry(rank, student_id)
+                for rank, (_, student_id) in enumerate(self._ranking.first(count), 1)]
+
+    def standing(self, student_id):
+        """One student's entry with their rank, or None"""
+        standing = self._students.get(student_id)
+        if standing is None:
+            return None
+        return self._entry(self._ranking.rank(standing.key), student_id)
+
+    def _rescore(self, student_id, standing):
+        score = correct = seconds = 0
+        for question_id, chosen in standing.answers.items():
+            points, credit, taken = score_question(self.correct.get(question_id), chosen,
+                                                   self.multiplier)
+            if points:
+                score += points
+                correct += credit == 1
+                seconds += taken
+        standing.score, standing.correct, standing.seconds = score, correct, seconds
+        self._place(student_id, standing)
+
+    def _place(self, student_id, standing):
+        if standing.key is not None:
+            self._ranking.remove(standing.key)
+        standing.key = (-standing.score, standing.seconds, student_id)
+        self._ranking.insert(standing.key, student_id)
+
+    def _entry(self, rank, student_id):
+        standing = self._students[student_id]
+        return {"rank": rank, "student_id": student_id, "student_name": standing.name,
+                "score": standing.score, "correct": standing.correct,
+                "seconds": standing.seconds}
+
+
+class LeaderboardRegistry:
+    """The boards this process keeps, by session id"""
+
+    def __init__(self, max_sessions=LEADERBOARD_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._boards = OrderedDict()
+
+    def get(self, session_id):
+        board = self._boards.get(session_id)
+        if board is not None:
+            self._boards.move_to_end(session_id)
+        return board
+
+    def create(self, session_id, correct_answers=None, multiplier=1.0):
+        board = self._boards[session_id] = Leaderboard(correct_answers, multiplier)
+        while len(self._boards) > self.max_sessions:
+            self._boards.popitem(last=False)
+        return board
+
+    def discard(self, session_id):
+        self._boards.pop(session_id, None)
@@ -0,0 +1,298 @@
+"""
+Classroom load test for the ClassPoint Quiz backend
+
+Simulates one real class against a running backend (python main.py on a
+local Postgres):
+
+1. A teacher registers, creates a quiz (single- and/or multi-select) and
+   starts a session for it
+2. N students join within a ramp window, poll their status like the student
+   app does (every 5s), think, then submit their answer(s)
+3. Meanwhile the PowerPoint add-in polls /results every 2s and the teacher
+   live page polls /info, /results, /stats and /student-responses every 3s
+
+With --follow-hints every poller waits for the server's X-Next-Poll-Ms hint
+instead of its fixed interval, as the Python clients do.
+
+At the end it prints throughput and p50/p95/p99 per endpoint and can write
+the same numbers as JSON for comparing runs.
+
+Usage:
+    pip install httpx
+    python loadtest.py --students 300 --ramp 20 --question-type both
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import string
+import time
+from collections import defaultdict
+
+import httpx
+
+ADDIN_POLL_SECONDS = 2.0
+TEACHER_POLL_SECONDS = 3.0
+STUDENT_POLL_SECONDS = 5.0
+
+
+class Recorder:
+    """Latency samples and errors per endpoint template"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started = time.perf_counter()
+
+    async def call(self, client, method, endpoint, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.latencies[endpoint].append((time.perf_counter() - start) * 1000)
+        if not ok:
+            self.errors[endpoint] += 1
+        return response if ok else None
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        rows = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+
+            def pct(p):
+                return round(ordered[min(len(ordered) - 1, int(p / 100 * (len(ordered) - 1) + 0.5))], 2)
+
+            rows[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors[endpoint],
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_ms": pct(50),
+                "p95_ms": pct(95),
+                "p99_ms": pct(99),
+            }
+        return {"elapsed_seconds": round(elapsed, 2), "endpoints": rows}
+
+
+def think_time(median, sigma=0.6):
+    """Lognormal think time: most students answer near the median, a few much later"""
+    return random.lognormvariate(math.log(median), sigma)
+
+
+async def setup_class(client, rec, question_type, num_choices):
+    """Register a throwaway teacher, create quizzes and start one session per quiz"""
+    suffix = "".join(random.choices(string.ascii_lowercase + string.digits, k=8))
+    response = await rec.call(client, "POST", "POST /api/auth/register", "/api/auth/register",
+                              json={"username": f"load_{suffix}",
+                                    "email": f"load_{suffix}@example.com",
+                                    "password": "loadtest"})
+    if response is None:
+        raise SystemExit("Could not register the load-test teacher")
+    teacher_id = response.json()["teacher_id"]
+
+    kinds = ["single", "multi"] if question_type == "both" else [question_type]
+    sessions = []
+    for kind in kinds:
+        correct = {0} if kind == "single" else {0, 2}
+        answers = [{"text": f"Choice {chr(65 + i)}", "order": i, "is_correct": i in correct}
+                   for i in range(num_choices)]
+        response = await rec.call(
+            client, "POST", "POST /api/quiz/create", "/api/quiz/create",
+            params={"teacher_id": teacher_id, "title": f"Load test ({kind})",
+                    "question_text": f"Load test {kind}-select question",
+                    "num_choices": num_choices, "allow_multiple": kind == "multi",
+                    "has_correct": True, "quiz_mode": "easy", "auto_close_minutes": 30},
+            json={"answers": answers})
+        if response is None:
+            raise SystemExit("Could not create the load-test quiz")
+        quiz_id = response.json()["quiz_id"]
+
+        details = (await rec.call(client, "GET", "GET /api/quiz/{quiz_id}",
+                                  f"/api/quiz/{quiz_id}")).json()
+        response = await rec.call(client, "POST", "POST /api/session/start", "/api/session/start",
+                                  json={"quiz_id": quiz_id})
+        if response is None:
+            raise SystemExit("Could not start the load-test session")
+        session = response.json()
+        sessions.append({
+            "kind": kind,
+            "quiz_id": quiz_id,
+            "session_id": session["session_id"],
+            "class_code": session["class_code"],
+            "question_id": details["question"]["question_id"],
+            "answers": details["answers"],
+        })
+    return sessions
+
+
+def poll_hint(responses):
+    """Longest X-Next-Poll-Ms hint among responses, in seconds, or None"""
+    hints = []
+    for response in responses:
+        try:
+            hints.append(int(response.headers["X-Next-Poll-Ms"]) / 1000)
+        except (AttributeError, KeyError, ValueError):
+            continue
+    return max(hints) if hints else None
+
+
+async def poll(client, rec, interval, calls, stop, follow_hints=False):
+    """Issue a fixed set of GETs every `interval` seconds (or as the server
+    hints) until stopped"""
+    await asyncio.sleep(random.uniform(0, interval))
+    while not stop.is_set():
+        responses = await asyncio.gather(*(rec.call(client, "GET", endpoint, url)
+                                           for endpoint, url in calls))
+        wait = (poll_hint(responses) if follow_hints else None) or interval
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def student(client, rec, session, index, args, stop, answered):
+    await asyncio.sleep(random.uniform(0, args.ramp))
+    session_id = session["session_id"]
+    code_url = f"/api/session/code/{session['class_code']}"
+
+    await rec.call(client, "GET", "GET /api/session/code/{class_code}", code_url)
+    response = await rec.call(client, "POST", "POST /api/student/join", "/api/student/join",
+                              params={"session_id": session_id,
+                                      "student_name": f"Student {index}"})
+    if response is None:
+        return
+    student_id = response.json()["student_id"]
+    joined_at = time.perf_counter()
+
+    # Status polling continues in the background while the student thinks
+    status_poller = asyncio.create_task(poll(
+        client, rec, STUDENT_POLL_SECONDS,
+        [("GET /api/session/code/{class_code}", code_url)], stop, args.follow_hints))
+
+    await asyncio.sleep(think_time(args.think_median))
+
+    answers = session["answers"]
+    correct = [a["answer_id"] for a in answers if a["is_correct"]]
+    wrong = [a["answer_id"] for a in answers if not a["is_correct"]]
+    if random.random() < args.correct_ratio:
+        chosen = correct
+    else:
+        chosen = random.sample(wrong + correct, len(correct))
+
+    time_taken = int(time.perf_counter() - joined_at)
+    # The student app submits one request per selected answer
+    for answer_id in chosen:
+        await rec.call(client, "POST", "POST /api/student/answer", "/api/student/answer",
+                       params={"student_id": student_id, "session_id": session_id,
+                               "question_id": session["question_id"],
+                               "answer_id": answer_id, "time_taken": time_taken})
+    answered.append(index)
+    await status_poller
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.max_connections,
+                          max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits,
+                                 timeout=args.timeout) as client:
+        rec = Recorder()
+        sessions = await setup_class(client, rec, args.question_type, args.num_choices)
+        for s in sessions:
+            print(f"  Session {s['session_id']} ({s['kind']}-select) class code {s['class_code']}")
+
+        stop = asyncio.Event()
+        answered = []
+        tasks = []
+        for s in sessions:
+            sid = s["session_id"]
+            for _ in range(args.addin_pollers):
+                tasks.append(asyncio.create_task(poll(
+                    client, rec, ADDIN_POLL_SECONDS,
+                    [("GET /api/session/{session_id}/results", f"/api/session/{sid}/results")],
+                    stop, args.follow_hints)))
+            for _ in range(args.teacher_pollers):
+                tasks.append(asyncio.create_task(poll(
+                    client, rec, TEACHER_POLL_SECONDS,
+                    [("GET /api/session/{session_id}/info", f"/api/session/{sid}/info"),
+                     ("GET /api/session/{session_id}/results", f"/api/session/{sid}/results"),
+                     ("GET /api/session/{session_id}/stats", f"/api/session/{sid}/stats"),
+                     ("GET /api/session/{session_id}/student-responses",
+                      f"/api/session/{sid}/student-responses")],
+                    stop, args.follow_hints)))
+
+        students = [asyncio.create_task(student(client, rec, sessions[i % len(sessions)],
+                                                i, args, stop, answered))
+                    for i in range(args.students)]
+
+        deadline = time.perf_counter() + args.duration
+        while time.perf_counter() < deadline and len(answered) < args.students:
+            await asyncio.sleep(0.5)
+        # Keep the pollers running a little after the last answer, as in class
+        await asyncio.sleep(args.tail)
+        stop.set()
+        await asyncio.gather(*tasks, *students, return_exceptions=True)
+
+        for s in sessions:
+            await rec.call(client, "POST", "POST /api/session/{session_id}/close",
+                           f"/api/session/{s['session_id']}/close")
+
+    report = rec.report()
+    report["config"] = vars(args)
+    report["students_answered"] = len(answered)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--ramp", type=float, default=15.0, help="seconds over which students join")
+    parser.add_argument("--think-median", type=float, default=12.0,
+                        help="median seconds between joining and answering")
+    parser.add_argument("--correct-ratio", type=float, default=0.6)
+    parser.add_argument("--question-type", choices=["single", "multi", "both"], default="single")
+    parser.add_argument("--num-choices", type=int, default=4)
+    parser.add_argument("--addin-pollers", type=int, default=1, help="add-in dialogs per session")
+    parser.add_argument("--teacher-pollers", type=int, default=1,
+                        help="teacher live pages per session")
+    parser.add_argument("--duration", type=float, default=180.0, help="max seconds to run")
+    parser.add_argument("--tail", type=float, default=5.0,
+                        help="seconds to keep polling after the last answer")
+    parser.add_argument("--follow-hints", action="store_true",
+                        help="poll when the server's X-Next-Poll-Ms says, not at fixed intervals")
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None, help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    print("=" * 78)
+    print(f"Classroom load test: {args.students} students, {args.ramp}s ramp, "
+          f"{args.question_type}-select")
+    print("=" * 78)
+
+    report = asyncio.run(run(args))
+
+    print(f"\n{'endpoint':<52}{'reqs':>7}{'err':>5}{'rps':>8}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for endpoint, row in report["endpoints"].items():
+        print(f"{endpoint:<52}{row['requests']:>7}{row['errors']:>5}{row['throughput_rps']:>8}"
+              f"{row['p50_ms']:>8}{row['p95_ms']:>8}{row['p99_ms']:>8}")
+    print(f"\n{report['students_answered']}/{args.students} students answered "
+          f"in {report['elapsed_seconds']}s (latencies in ms)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
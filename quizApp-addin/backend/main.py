@@ -3,10 +3,15 @@ FastAPI Backend for ClassPoint Quiz Application
 Matches the C# ApiClient.cs interface
 """
 
-from fastapi import FastAPI, HTTPException, Query, Body
+from fastapi import FastAPI, HTTPException, Query, Body, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
+import functools
+import logging
+import math
 import random
 import string
 import uvicorn
@@ -14,6 +19,22 @@ import uvicorn
 
 # Import database functions
 from database import *
+from response_cache import response_cache, dumps, json_response, make_etag, not_modified
+from app_logging import setup_logging, RequestContextMiddleware
+from websocket_manager import manager
+from scheduler import DeadlineScheduler, session_deadline, utcnow
+from batching import MicroBatcher
+from rate_limit import RateLimitMiddleware
+from admission import PriorityGate, Overloaded, READ, WRITE, PRIORITY_NAMES
+from polling import PollAdvisor, NEXT_POLL_HEADER, POLL_STATUS_MIN_MS
+from coalesce import SingleFlight
+from leaderboard import LeaderboardRegistry, LEADERBOARD_TOP_K, LEADERBOARD_PUSH_MS
+from scoring import difficulty_multiplier
+from grading import grade_session
+import metrics
+
+setup_logging()
+logger = logging.getLogger("classpoint.api")
 
 app = FastAPI(title="ClassPoint Quiz API")
 
@@ -26,6 +47,192 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Binds request/session ids to every log record
+app.add_middleware(RequestContextMiddleware)
+# Database round trips and time per request
+app.add_middleware(metrics.QueryStatsMiddleware, begin=begin_request_stats)
+# 429 + Retry-After per (endpoint class, session, client) token bucket
+app.add_middleware(RateLimitMiddleware, on_reject=metrics.RATE_LIMITED.inc)
+# Per-route counts, latency and in-flight requests for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Counted off the event loop on a timer (refresh_active_sessions); a scrape only reads it
+ACTIVE_SESSIONS_REFRESH_SECONDS = 15
+_active_sessions = {"count": 0}
+metrics.registry.gauge("classpoint_active_sessions", "Sessions currently accepting answers",
+                       callback=lambda: _active_sessions["count"])
+metrics.registry.add_collector(metrics.query_stats_collector(get_query_stats))
+metrics.registry.gauge("classpoint_websocket_connections", "Connected WebSocket clients",
+                       callback=lambda: sum(len(c) for c in manager.active_connections.values()))
+
+# Fire-and-forget tasks, referenced here until they finish so they are not collected
+_background_tasks = set()
+
+def spawn(coro):
+    """Run `coro` in the background, keeping a reference until it is done"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+async def broadcast_session_closed(session_id, closed_at, reason="deadline"):
+    """Tell connected clients a session stopped accepting answers"""
+    if reason == "deadline":
+        metrics.SESSIONS_AUTO_CLOSED.inc()
+    poll_advisor.touch(session_id)
+    poll_advisor.observe(session_id, 'closed')
+    spawn(grade_closed_session(session_id))
+    await manager.broadcast_to_session(session_id, {
+        "type": "session_closed",
+        "session_id": session_id,
+        "reason": reason,
+        "closed_at": closed_at.isoformat()
+    })
+
+def record_join_batch(kind):
+    def record(size, seconds):
+        metrics.JOIN_BATCH_SIZE.observe(size, kind)
+        metrics.JOIN_BATCH_SECONDS.observe(seconds, kind)
+    return record
+
+def record_admission(priority, seconds):
+    metrics.DB_ADMISSION_WAIT.observe(seconds, PRIORITY_NAMES[priority])
+
+# Answers and joins are handed database slots before any poll
+db_gate = PriorityGate(on_admit=record_admission)
+metrics.registry.add_collector(metrics.admission_collector(db_gate, PRIORITY_NAMES))
+write_through_gate = functools.partial(db_gate.run, WRITE)
+
+# Closes sessions at started_at + auto_close_minutes; a burst of deadlines
+# queues for write slots like any other write
+scheduler = DeadlineScheduler(close_session, on_close=broadcast_session_closed,
+                              run=write_through_gate)
+metrics.registry.gauge("classpoint_sessions_awaiting_auto_close",
+                       "Sessions the server will close at their deadline",
+                       callback=scheduler.pending)
+
+# Joins arriving within a few milliseconds share one INSERT and commit
+code_join_batcher = MicroBatcher(join_sessions_by_code, on_flush=record_join_batch("code"),
+                                 run=write_through_gate)
+session_join_batcher = MicroBatcher(add_students, on_flush=record_join_batch("session"),
+                                    run=write_through_gate)
+
+async def read_from_db(name, fn, *args):
+    """Run a blocking read at poll priority; 503 + Retry-After when it is shed"""
+    try:
+        return await db_gate.run(READ, fn, *args)
+    except Overloaded as e:
+        metrics.READS_SHED.inc(name)
+        raise HTTPException(status_code=503, detail="Server busy, try again shortly",
+                            headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+# Activity per session, turned into X-Next-Poll-Ms hints
+poll_advisor = PollAdvisor()
+
+def record_saved_read(key, reason):
+    metrics.READS_SAVED.inc(key[0], reason)
+
+# Identical reads share one query while in flight and for READ_CACHE_TTL_MS after
+reads = SingleFlight(on_saved=record_saved_read)
+
+async def read_once(name, key, session_id, fn, *args):
+    """read_from_db shared by identical calls; the session's last write seen
+    here is part of the key, so no result from before it is reused"""
+    async def execute():
+        metrics.READS_EXECUTED.inc(name)
+        return await read_from_db(name, fn, *args)
+    return await reads.do((name, key, poll_advisor.activity(session_id)), execute)
+
+def next_poll_ms(session_id, floor_ms=0, status=None):
+    """When a client should poll this session again, from its activity and the load
+
+    `status` is the one just read from the session's row; without it the
+    status last read for the session is used, then the scheduler's deadlines.
+    """
+    if status is not None:
+        poll_advisor.observe(session_id, status)
+    closed = poll_advisor.is_closed(session_id) or scheduler.is_late(session_id)
+    return poll_advisor.next_poll_ms(session_id, closed=closed,
+                                     load=db_gate.queued() / db_gate.slots, floor_ms=floor_ms)
+
+def cached_reply(request, name, key, version, body, headers=None, poll_ms=None):
+    """304 when the client holds this version, else the encoded body"""
+    etag = make_etag(name, key, version)
+    reply = not_modified(request, etag) or json_response(body, headers=headers, etag=etag)
+    if poll_ms is not None:
+        reply.headers[NEXT_POLL_HEADER] = str(poll_ms)
+    return reply
+
+# (name, key) -> background refresh of a body served stale
+_revalidating = {}
+
+async def _revalidate(name, key, load):
+    try:
+        await db_gate.run(READ, load)
+    except Exception:
+        pass    # The next poll tries again
+    finally:
+        _revalidating.pop((name, key), None)
+
+async def poll_read(name, key, request, load, session_id=None, floor_ms=0):
+    """Answer a poll whose blocking `load()` returns (version, encoded body)
+    and keeps response_cache up to date
+
+    While the database gate is busy, the body last cached for (name, key) is
+    served as-is, stale or not, and one refresh is queued behind the writes.
+    Identical polls share one read (see read_once).
+    """
+    if db_gate.busy():
+        entry = response_cache.peek(name, key)
+        if entry is not None:
+            metrics.READS_DEGRADED.inc(name)
+            if (name, key) not in _revalidating:
+                _revalidating[(name, key)] = asyncio.create_task(_revalidate(name, key, load))
+            version, body = entry
+            return cached_reply(request, name, key, version, body, {"X-Cache": "stale"},
+                                poll_ms=next_poll_ms(session_id, floor_ms))
+    version, body = await read_once(name, key, session_id, load)
+    return cached_reply(request, name, key, version, body,
+                        poll_ms=next_poll_ms(session_id, floor_ms))
+
+@app.on_event("startup")
+async def apply_schema_updates():
+    """Bring the database up to date with tables added after the original dump"""
+    if not ensure_schema():
+        logger.warning("Schema updates could not be applied")
+
+@app.on_event("startup")
+async def start_scheduler():
+    """Load the deadlines of sessions still open and start closing them on time"""
+    await scheduler.start(get_auto_close_sessions())
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    await scheduler.stop()
+
+async def refresh_active_sessions():
+    """Recount active sessions at poll priority every ACTIVE_SESSIONS_REFRESH_SECONDS"""
+    while True:
+        try:
+            count = await db_gate.run(READ, count_active_sessions)
+            if count is not None:
+                _active_sessions["count"] = count
+        except Exception:
+            pass    # Shed or failed: keep the last count, try again next round
+        await asyncio.sleep(ACTIVE_SESSIONS_REFRESH_SECONDS)
+
+@app.on_event("startup")
+async def start_active_sessions_refresh():
+    spawn(refresh_active_sessions())
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    # Joins already accepted are written before the process goes away
+    await code_join_batcher.drain()
+    await session_join_batcher.drain()
+    for task in list(_background_tasks):
+        task.cancel()
+
 # ============================================
 # REQUEST MODELS clearcl(Match C# classes)
 # ============================================
@@ -74,6 +281,7 @@ class SessionResponse(BaseModel):
     session_id: int
     class_code: str
     status: str
+    deadline: Optional[str] = None
 
 class ResultItem(BaseModel):
     answer_text: str
@@ -106,11 +314,8 @@ class StudentDetailsResponse(BaseModel):
 async def register_endpoint(request: RegisterRequest):
     """Register new teacher"""
     try:
-        teacher_id, error = create_teacher(
-            username=request.username,
-            email=request.email,
-            password=request.password
-        )
+        teacher_id, error = await db_gate.run(
+            WRITE, create_teacher, request.username, request.email, request.password)
         
         if not teacher_id:
             raise HTTPException(status_code=400, detail=error or "Registration failed")
@@ -131,7 +336,8 @@ async def register_endpoint(request: RegisterRequest):
 async def login_endpoint(request: LoginRequest):
     """Teacher login"""
     try:
-        teacher = authenticate_teacher(request.email, request.password)
+        teacher = await read_from_db("login", authenticate_teacher,
+                                     request.email, request.password)
         
         if not teacher:
             raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -168,24 +374,22 @@ async def create_quiz_endpoint(
 ):
     """
     Create a quiz with question and answers
-    Accepts EITHER query params OR body, or BOTH
+    Accepts EITHER query params OR body, or BOTH; body `questions` adds
+    further [{question_text, answers}] after the first
     """
     try:
         # Get answers from body
         answers_list = []
         if body and 'answers' in body:
-            print(f"📋 Got {len(body['answers'])} answers from body")
             answers_list = body['answers']
         
-        print(f"\n📝 Creating quiz:")
-        print(f"  Teacher ID: {teacher_id}")
-        print(f"  Title: {title}")
-        print(f"  Question: {question_text}")
-        print(f"  Num choices: {num_choices}")
-        print(f"  Answers: {len(answers_list)}")
+        logger.debug("Creating quiz", extra={
+            "event": "quiz_create_requested", "teacher_id": teacher_id,
+            "num_choices": num_choices, "answer_count": len(answers_list)})
         
         # Create quiz
-        quiz_id, error = create_quiz(
+        quiz_id, error = await db_gate.run(WRITE, functools.partial(
+            create_quiz,
             teacher_id=teacher_id,
             title=title or "Untitled Quiz",
             num_choices=num_choices or 4,
@@ -197,25 +401,22 @@ async def create_quiz_endpoint(
             close_after=auto_close_minutes,
             quiz_mode=quiz_mode  # ✅ ADD THIS: Pass quiz_mode to database
 
-        )
+        ))
         
         if not quiz_id:
-            print(f"❌ Failed to create quiz: {error}")
+            logger.warning("Failed to create quiz: %s", error, extra={"event": "quiz_create_failed"})
             raise HTTPException(status_code=400, detail=error or "Failed to create quiz")
         
-        print(f"✅ Quiz created with ID: {quiz_id}")
-        
         # Add question
-        question_id, error = add_question(quiz_id, question_text or "Untitled Question")
+        question_id, error = await db_gate.run(
+            WRITE, add_question, quiz_id, question_text or "Untitled Question")
         if not question_id:
-            print(f"❌ Failed to add question: {error}")
+            logger.warning("Failed to add question: %s", error,
+                           extra={"event": "quiz_create_failed", "quiz_id": quiz_id})
             raise HTTPException(status_code=400, detail=error or "Failed to add question")
         
-        print(f"✅ Question created with ID: {question_id}")
-        
         # Add answers
         if answers_list:
-            print(f"📋 Adding {len(answers_list)} answers...")
             formatted_answers = [
                 {
                     'text': ans.get('text', f"Answer {i+1}"),
@@ -225,16 +426,35 @@ async def create_quiz_endpoint(
                 for i, ans in enumerate(answers_list)
             ]
             
-            success, error = add_answers(question_id, formatted_answers)
+            success, error = await db_gate.run(WRITE, add_answers, question_id, formatted_answers)
             if not success:
-                print(f"❌ Failed to add answers: {error}")
+                logger.warning("Failed to add answers: %s", error,
+                               extra={"event": "quiz_create_failed", "quiz_id": quiz_id})
                 raise HTTPException(status_code=400, detail=error or "Failed to add answers")
-            
-            print(f"✅ Answers added successfully!")
         else:
-            print("⚠️ No answers provided")
+            logger.warning("Quiz created without answers",
+                           extra={"event": "quiz_without_answers", "quiz_id": quiz_id})
+        
+        # Further questions, asked in this order after the first
+        for extra in (body or {}).get('questions', []):
+            extra_id, error = await db_gate.run(
+                WRITE, add_question, quiz_id, extra.get('question_text') or "Untitled Question")
+            if not extra_id:
+                raise HTTPException(status_code=400, detail=error or "Failed to add question")
+            success, error = await db_gate.run(WRITE, add_answers, extra_id, [
+                {
+                    'text': ans.get('text', f"Answer {i+1}"),
+                    'order': ans.get('order', i),
+                    'is_correct': ans.get('is_correct', False)
+                }
+                for i, ans in enumerate(extra.get('answers', []))
+            ])
+            if not success:
+                raise HTTPException(status_code=400, detail=error or "Failed to add answers")
         
-        print(f"✅ Quiz creation complete!\n")
+        logger.info("Quiz created", extra={
+            "event": "quiz_created", "quiz_id": quiz_id, "question_id": question_id,
+            "teacher_id": teacher_id, "answer_count": len(answers_list)})
         return QuizResponse(
             quiz_id=quiz_id,
             question_id=question_id,
@@ -244,94 +464,435 @@ async def create_quiz_endpoint(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Exception: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Quiz creation failed", extra={"event": "quiz_create_failed"})
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/quiz/{quiz_id}")
 async def get_quiz_endpoint(quiz_id: int):
     """Get quiz details"""
-    quiz = get_quiz_details(quiz_id)
+    quiz = await read_from_db("quiz", get_quiz_details, quiz_id)
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
-    return quiz
+    return json_response(dumps(quiz))
+
+
+@app.get("/api/quiz/{quiz_id}/sessions")
+async def get_quiz_sessions_endpoint(quiz_id: int):
+    """Get all sessions of a quiz, newest first"""
+    return json_response(dumps(await read_from_db("quiz_sessions", get_quiz_sessions, quiz_id)))
 
 
 @app.get("/api/teacher/{teacher_id}/quizzes")
 async def get_teacher_quizzes_endpoint(teacher_id: int):
     """Get all quizzes for a teacher"""
     try:
-        quizzes = get_teacher_quizzes(teacher_id)
+        quizzes = await read_from_db("teacher_quizzes", get_teacher_quizzes, teacher_id)
         return quizzes
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/teacher/{teacher_id}/summary")
+async def get_teacher_summary_endpoint(teacher_id: int, recent: int = Query(5, ge=0, le=50)):
+    """Get dashboard counters and the most recent quizzes for a teacher"""
+    summary = await read_from_db("teacher_summary", get_teacher_summary, teacher_id, recent)
+    if summary is None:
+        raise HTTPException(status_code=500, detail="Failed to load teacher summary")
+    return summary
+
+
 # ============================================
 # SESSION ENDPOINTS
 # ============================================
+def get_quiz_definition(quiz_id):
+    """(quiz, questions with their answers), loaded once and kept: quizzes are
+    not edited after creation; (None, []) for an unknown quiz"""
+    definition = response_cache.get("quiz_definition", quiz_id, 0)
+    if definition is None:
+        details = get_quiz_details(quiz_id)
+        if not details:
+            return None, []
+        definition = (details['quiz'], details['questions'])
+        response_cache.put("quiz_definition", quiz_id, 0, definition)
+    return definition
+
+def get_question_set(quiz_id):
+    """A quiz's questions with their answers"""
+    return get_quiz_definition(quiz_id)[1]
+
+def correct_answer_sets(questions):
+    """question_id -> frozenset of its correct answer ids"""
+    return {q['question_id']: frozenset(a['answer_id'] for a in q['answers'] if a['is_correct'])
+            for q in questions}
+
+# Live rankings of competition-mode sessions, kept per process
+leaderboards = LeaderboardRegistry()
+# session_id -> push waiting out LEADERBOARD_PUSH_MS
+_leaderboard_pushes = {}
+
+async def leaderboard_for(session_id):
+    """The session's board, rebuilt from the database when this process has
+    none; None when the session is not in competition mode"""
+    board = leaderboards.get(session_id)
+    if board is not None:
+        return board
+    session = await read_once("leaderboard", session_id, session_id,
+                              get_session_info, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    poll_advisor.observe(session_id, session['status'])
+    quiz, questions = get_quiz_definition(session['quiz_id'])
+    if not quiz or not quiz.get('competition_mode'):
+        return None
+    return await reads.do(("leaderboard_load", session_id),
+                          functools.partial(rebuild_leaderboard, session_id, quiz, questions))
+
+async def rebuild_leaderboard(session_id, quiz, questions):
+    # Registered before the read: answers stored meanwhile are recorded live,
+    # and the read's copies of them merge as no-ops
+    board = leaderboards.create(session_id, correct_answer_sets(questions),
+                                difficulty_multiplier(quiz.get('quiz_mode')))
+    rows = await read_from_db("leaderboard", get_session_answers, session_id)
+    if rows is None:
+        leaderboards.discard(session_id)
+        raise HTTPException(status_code=500, detail="Failed to load leaderboard")
+    board.load({}, rows)
+    return board
+
+def leaderboard_payload(session_id, board, limit=LEADERBOARD_TOP_K):
+    return {"session_id": session_id, "entries": board.top(limit),
+            "total_students": len(board)}
+
+def schedule_leaderboard_push(session_id):
+    """Push the session's top K once the current LEADERBOARD_PUSH_MS window ends;
+    changes within one window share a push"""
+    if session_id not in _leaderboard_pushes:
+        _leaderboard_pushes[session_id] = asyncio.create_task(push_leaderboard(session_id))
+
+async def push_leaderboard(session_id):
+    try:
+        await asyncio.sleep(LEADERBOARD_PUSH_MS / 1000)
+    finally:
+        _leaderboard_pushes.pop(session_id, None)
+    board = leaderboards.get(session_id)
+    if board is not None:
+        await manager.broadcast_to_session(
+            session_id, {"type": "leaderboard", **leaderboard_payload(session_id, board)})
+
 @app.post("/api/session/start", response_model=SessionResponse)
 async def start_session_endpoint(request: SessionStartRequest):
     try:
         class_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        session_id, error = create_quiz_session(
-            quiz_id=request.quiz_id,
-            class_code=class_code,
-            auto_close_minutes=request.override_auto_close_minutes
-        )
+        # The follow-up reads belong to this write and share its priority,
+        # so a busy server never sheds them after the session exists
+        session_id, error = await db_gate.run(
+            WRITE, create_quiz_session, request.quiz_id, class_code,
+            request.override_auto_close_minutes)
         if not session_id:
             raise HTTPException(status_code=400, detail=error or "Failed to create session")
-        return SessionResponse(session_id=session_id, class_code=class_code, status="active")
+        
+        # Deadline from the stored start time and the session's (or quiz's) minutes
+        deadline = None
+        for row in await db_gate.run(WRITE, get_auto_close_sessions, session_id):
+            deadline = session_deadline(row['started_at'], row['auto_close_minutes'])
+            scheduler.schedule(session_id, deadline)
+        # Loaded now so advancing questions never reads the quiz again
+        quiz, questions = await db_gate.run(WRITE, get_quiz_definition, request.quiz_id)
+        if quiz and quiz.get('competition_mode'):
+            leaderboards.create(session_id, correct_answer_sets(questions),
+                                difficulty_multiplier(quiz.get('quiz_mode')))
+        poll_advisor.link(class_code, session_id)
+        poll_advisor.touch(session_id)
+        return SessionResponse(session_id=session_id, class_code=class_code, status="active",
+                               deadline=deadline.isoformat() if deadline else None)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def build_results_payload(results_data):
+    """Shape raw session results into the ResultsResponse layout as plain dicts"""
+    total_responses = sum(r['count'] for r in results_data['results'])
+    
+    formatted_results = []
+    for r in results_data['results']:
+        percentage = (r['count'] / total_responses * 100) if total_responses > 0 else 0
+        formatted_results.append({
+            "answer_text": r['answer_text'],
+            "answer_order": r['answer_order'],
+            "is_correct": r['is_correct'],
+            "count": r['count'],
+            "percentage": round(percentage, 1)
+        })
+    
+    return {
+        "results": formatted_results,
+        "participant_count": results_data['participant_count'],
+        "total_responses": total_responses
+    }
+
+
 @app.get("/api/session/{session_id}/results", response_model=ResultsResponse)
-async def get_results_endpoint(session_id: int):
-    """Get live results for a session"""
-    try:
-        results_data = get_session_results(session_id)
+async def get_results_endpoint(session_id: int, request: Request,
+                               question_id: Optional[int] = None):
+    """Get live results for the open question of a session, or `question_id`"""
+    key = session_id if question_id is None else f"{session_id}:{question_id}"
+    
+    def load():
+        # Serve the encoded payload while nothing has changed in the session
+        version = get_session_version(session_id)
+        cached = response_cache.get("results", key, version)
+        if cached is not None:
+            return version, cached
+        
+        results_data = get_session_results(session_id, question_id)
         
         if not results_data:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        # Calculate percentages
-        total_responses = sum(r['count'] for r in results_data['results'])
-        
-        formatted_results = []
-        for r in results_data['results']:
-            percentage = (r['count'] / total_responses * 100) if total_responses > 0 else 0
-            formatted_results.append(ResultItem(
-                answer_text=r['answer_text'],
-                answer_order=r['answer_order'],
-                is_correct=r['is_correct'],
-                count=r['count'],
-                percentage=round(percentage, 1)
-            ))
-        
-        return ResultsResponse(
-            results=formatted_results,
-            participant_count=results_data['participant_count'],
-            total_responses=total_responses
-        )
+        body = dumps(build_results_payload(results_data))
+        response_cache.put("results", key, version, body)
+        return version, body
     
+    try:
+        return await poll_read("results", key, request, load, session_id)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Sessions one /api/sessions/results call may ask for
+SESSIONS_RESULTS_MAX = 100
+
+@app.get("/api/sessions/results")
+async def get_sessions_results_endpoint(
+    ids: str = Query(..., description="Comma-separated session ids, each optionally "
+                                      "as id:results_version already held")
+):
+    """Live results of several sessions (one deck, several quizzes) in one read;
+    sessions still at the version the caller holds are only listed as unchanged"""
+    session_ids, known_versions = [], {}
+    try:
+        for item in filter(None, (part.strip() for part in ids.split(","))):
+            session_id, _, version = item.partition(":")
+            session_ids.append(int(session_id))
+            if version:
+                known_versions[int(session_id)] = int(version)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must look like 1,2:17,3")
+    session_ids = list(dict.fromkeys(session_ids))
+    if not session_ids or len(session_ids) > SESSIONS_RESULTS_MAX:
+        raise HTTPException(status_code=400,
+                            detail=f"Ask for between 1 and {SESSIONS_RESULTS_MAX} sessions")
+    
+    sessions = await read_from_db("sessions_results", get_sessions_results,
+                                  session_ids, known_versions)
+    if sessions is None:
+        raise HTTPException(status_code=500, detail="Failed to fetch results")
+    
+    payload = {"sessions": {}, "unchanged": [], "missing": []}
+    for session_id in session_ids:
+        session = sessions.get(session_id)
+        if session is None:
+            payload["missing"].append(session_id)
+            continue
+        poll_advisor.observe(session_id, session['status'])
+        if session['results'] is None:
+            payload["unchanged"].append(session_id)
+        else:
+            payload["sessions"][session_id] = dict(
+                build_results_payload(session),
+                results_version=session['results_version'],
+                current_question_id=session['current_question_id'])
+    # The busiest session sets the pace
+    poll_ms = min(next_poll_ms(session_id) for session_id in session_ids)
+    return json_response(dumps(payload), headers={NEXT_POLL_HEADER: str(poll_ms)})
+
+
+@app.get("/api/session/{session_id}/stats")
+async def get_session_stats_endpoint(session_id: int, response: Response):
+    """Get responded/correct counts, response rate, accuracy and elapsed time"""
+    stats = await read_once("stats", session_id, session_id, get_session_statistics, session_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Session not found")
+    response.headers[NEXT_POLL_HEADER] = str(next_poll_ms(session_id, status=stats['status']))
+    return stats
+
+
+@app.get("/api/session/{session_id}/snapshot")
+async def get_session_snapshot_endpoint(
+    session_id: int,
+    request: Request,
+    sections: Optional[str] = Query(None, description="Comma-separated subset of results,stats,students")
+):
+    """Status, deadline, results, stats and per-student answers in one consistent read"""
+    if sections is None:
+        wanted = SNAPSHOT_SECTIONS
+    else:
+        requested = {s.strip() for s in sections.split(",") if s.strip()}
+        unknown = requested.difference(SNAPSHOT_SECTIONS)
+        if unknown:
+            raise HTTPException(status_code=400,
+                                detail=f"Unknown sections: {', '.join(sorted(unknown))}")
+        wanted = tuple(s for s in SNAPSHOT_SECTIONS if s in requested)
+    key = f"{session_id}:{','.join(wanted)}"
+    return await poll_read("snapshot", key, request,
+                           functools.partial(load_snapshot, session_id, wanted, key),
+                           session_id)
+
+
+def load_snapshot(session_id, wanted, key):
+    """(version, encoded body) of a session snapshot, from the cache when current"""
+    version = get_session_version(session_id)
+    cached = response_cache.get("snapshot", key, version)
+    if cached is not None:
+        return version, cached
+    
+    snapshot = get_session_snapshot(session_id, wanted)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    session = snapshot['session']
+    poll_advisor.observe(session_id, session['status'])
+    deadline = scheduler.deadline(session_id) or session_deadline(
+        session['started_at'], session['auto_close_minutes'])
+    payload = {"session": {
+        "session_id": session['session_id'],
+        "class_code": session['class_code'],
+        "status": session['status'],
+        "started_at": session['started_at'],
+        "closed_at": session['closed_at'],
+        "deadline": deadline.isoformat() if deadline else None,
+        "results_version": session['results_version'],
+        "current_question_id": session['current_question_id']
+    }}
+    if 'results' in snapshot:
+        payload['results'] = build_results_payload(snapshot['results'])
+    if 'stats' in snapshot:
+        # Cached until the version moves: clients derive elapsed time from started_at
+        payload['stats'] = {k: v for k, v in snapshot['stats'].items() if k != 'elapsed_seconds'}
+    if 'students' in snapshot:
+        payload['students'] = StudentDetailsResponse(**snapshot['students']).model_dump()
+    
+    # Tag with the version actually read, which may be newer than the one checked
+    version = session['results_version']
+    body = dumps(payload)
+    response_cache.put("snapshot", key, version, body)
+    return version, body
+
+
+@app.get("/api/session/{session_id}/leaderboard")
+async def get_leaderboard_endpoint(
+    session_id: int,
+    response: Response,
+    limit: int = Query(LEADERBOARD_TOP_K, ge=1, le=100),
+    student_id: Optional[int] = Query(None, description="Also return this student's own rank")
+):
+    """Top students of a competition-mode session by score, then answer time"""
+    board = await leaderboard_for(session_id)
+    if board is None:
+        raise HTTPException(status_code=409, detail="Session is not in competition mode")
+    payload = leaderboard_payload(session_id, board, limit)
+    if student_id is not None:
+        payload['student'] = board.standing(student_id)
+    response.headers[NEXT_POLL_HEADER] = str(next_poll_ms(session_id))
+    return payload
+
+
+@app.get("/api/session/{session_id}/grades")
+async def get_session_grades_endpoint(session_id: int, request: Request):
+    """Every student's score over the whole quiz, with difficulty, speed and
+    partial credit, best first"""
+    return await poll_read("grades", session_id, request,
+                           functools.partial(load_grades, session_id), session_id)
+
+
+def load_grades(session_id):
+    """(version, encoded body) of a session's grades, graded in one pass over
+    all its answers whenever the version has moved"""
+    version = get_session_version(session_id)
+    cached = response_cache.get("grades", session_id, version)
+    if cached is not None:
+        return version, cached
+    
+    session = get_session_info(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    poll_advisor.observe(session_id, session['status'])
+    quiz, questions = get_quiz_definition(session['quiz_id'])
+    rows = get_session_answers(session_id)
+    if quiz is None or rows is None:
+        raise HTTPException(status_code=500, detail="Failed to grade session")
+    
+    grades = grade_session(questions, rows, quiz.get('quiz_mode'))
+    body = dumps({"session_id": session_id, "status": session['status'], **grades})
+    response_cache.put("grades", session_id, version, body)
+    return version, body
+
+
+async def grade_closed_session(session_id):
+    """Grade a session as it closes, so its final grades are served from the cache"""
+    try:
+        await db_gate.run(READ, load_grades, session_id)
+    except Exception:
+        logger.warning("Grading a closed session failed", exc_info=True,
+                       extra={"event": "grading_failed", "session_id": session_id})
+
+
+@app.post("/api/session/{session_id}/advance")
+async def advance_question_endpoint(session_id: int, question_id: Optional[int] = None):
+    """Open the next question (or `question_id`) and push it to connected students"""
+    current_id, error = await db_gate.run(WRITE, advance_question, session_id, question_id)
+    if error == SESSION_NOT_FOUND:
+        raise HTTPException(status_code=404, detail=error)
+    if error == SESSION_NOT_ACTIVE:
+        raise HTTPException(status_code=409, detail="Session is closed")
+    if not current_id:
+        raise HTTPException(status_code=400, detail=error or "Failed to advance question")
+    
+    session = await db_gate.run(WRITE, get_session_info, session_id)
+    questions = await db_gate.run(WRITE, get_question_set, session['quiz_id']) if session else []
+    index = next((i for i, q in enumerate(questions) if q['question_id'] == current_id), None)
+    event = {
+        "type": "question_changed",
+        "session_id": session_id,
+        "question_index": index,
+        "question_count": len(questions),
+        "question": questions[index] if index is not None else None
+    }
+    # Students get the question itself; nobody re-fetches the quiz
+    poll_advisor.touch(session_id)
+    await manager.broadcast_to_session(session_id, event)
+    logger.info("Question advanced", extra={
+        "event": "question_advanced", "session_id": session_id, "question_id": current_id})
+    return event
+
+@app.websocket("/ws/session/{session_id}")
+async def session_events(websocket: WebSocket, session_id: int):
+    """Push channel for a session: question_changed, leaderboard and session_closed events"""
+    await manager.connect(websocket, session_id)
+    try:
+        while True:
+            # Nothing is expected from clients; this just notices disconnects
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        manager.disconnect(websocket, session_id)
+
 @app.post("/api/session/{session_id}/close")
 async def close_session_endpoint(session_id: int):
     """Close a session"""
     try:
-        success = close_session(session_id)
+        success = await db_gate.run(WRITE, close_session, session_id)
         if not success:
             raise HTTPException(status_code=400, detail="Failed to close session")
         
+        closed_at = utcnow()
+        scheduler.closed(session_id, closed_at)
+        await broadcast_session_closed(session_id, closed_at, reason="teacher")
         return {"success": True, "message": "Session closed successfully"}
     
     except HTTPException:
@@ -340,10 +901,10 @@ async def close_session_endpoint(session_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/session/{session_id}/info")
-async def get_session_info_endpoint(session_id: int):
+async def get_session_info_endpoint(session_id: int, response: Response):
     """Get session info including start time"""
     try:
-        session = get_session_info(session_id)
+        session = await read_once("info", session_id, session_id, get_session_info, session_id)
         
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -356,48 +917,87 @@ async def get_session_info_endpoint(session_id: int):
             if started_at.tzinfo is None:
                 started_at = started_at.replace(tzinfo=datetime.timezone.utc)
         
+        # Clients count down from deadline - server_time, immune to their clock
+        deadline = scheduler.deadline(session_id) or session_deadline(
+            started_at, session['auto_close_minutes'])
+        response.headers[NEXT_POLL_HEADER] = str(next_poll_ms(session_id,
+                                                              status=session['status']))
+        
         return {
             "session_id": session['session_id'],
             "started_at": started_at.isoformat() if started_at else None,
             "status": session['status'],
-            "auto_close_minutes": session['auto_close_minutes']
+            "auto_close_minutes": session['auto_close_minutes'],
+            "deadline": deadline.isoformat() if deadline else None,
+            "server_time": utcnow().isoformat()
         }
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in get_session_info_endpoint: {e}")
+        logger.exception("Error in get_session_info_endpoint")
         raise HTTPException(status_code=500, detail=str(e))
 # ============================================
 # STUDENT ENDPOINTS (for web interface)
 # ============================================
 
 @app.get("/api/session/code/{class_code}")
-async def get_session_by_code_endpoint(class_code: str):
+async def get_session_by_code_endpoint(class_code: str, request: Request):
     """Get session by class code (for students joining)"""
+    return await poll_read("session_code", class_code, request,
+                           functools.partial(load_session_by_code, class_code),
+                           poll_advisor.session_for_code(class_code),
+                           floor_ms=POLL_STATUS_MIN_MS)
+
+
+def load_session_by_code(class_code):
+    """(version, encoded body) of a session looked up by code, from the cache when current"""
     session = get_session_by_code(class_code)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found or expired")
+    poll_advisor.link(class_code, session['session_id'])
+    poll_advisor.observe(session['session_id'], session['status'])
     
-    # Get quiz details
-    quiz = get_quiz_details(session['quiz_id'])
+    version = session.get('results_version')
+    cached = response_cache.get("session_code", class_code, version)
+    if cached is not None:
+        return version, cached
     
-    return {
+    # Questions come from the per-quiz set, not a fresh quiz read
+    questions = get_question_set(session['quiz_id'])
+    
+    body = dumps({
         "session_id": session['session_id'],
         "quiz_id": session['quiz_id'],
+        "class_code": session['class_code'],
         "quiz_title": session['title'],
+        "title": session['title'],
         "status": session['status'],
-        "questions": quiz.get('questions', []) if quiz else []
-    }
+        "started_at": session['started_at'],
+        "closed_at": session['closed_at'],
+        "auto_close_minutes": session['auto_close_minutes'],
+        "total_participants": session['total_participants'],
+        "results_version": version,
+        "current_question_id": session['current_question_id'],
+        "questions": questions
+    })
+    response_cache.put("session_code", class_code, version, body)
+    return version, body
 
 
 @app.post("/api/student/join")
 async def student_join(session_id: int, student_name: str):
     """Student joins a session"""
     try:
-        student_id, error = add_student_to_session(session_id, student_name)
+        student_id, error = await session_join_batcher.submit((session_id, student_name))
         if not student_id:
             raise HTTPException(status_code=400, detail=error or "Failed to join session")
         
+        metrics.STUDENTS_JOINED.inc()
+        poll_advisor.touch(session_id)
+        board = leaderboards.get(session_id)
+        if board is not None:
+            board.add_student(student_id, student_name)
+        logger.info("Student joined", extra={"event": "student_joined", "student_id": student_id})
         return {"student_id": student_id, "message": "Joined successfully"}
     
     except HTTPException:
@@ -406,6 +1006,42 @@ async def student_join(session_id: int, student_name: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/student/join-by-code")
+async def student_join_by_code(class_code: str, student_name: str):
+    """Student joins by class code: one round trip and one transaction for the
+    session lookup, registration and quiz payload"""
+    try:
+        joined, error = await code_join_batcher.submit((class_code, student_name))
+        if error == SESSION_NOT_FOUND:
+            raise HTTPException(status_code=404, detail="Session not found or expired")
+        if error == SESSION_NOT_ACTIVE:
+            raise HTTPException(status_code=409, detail="Session is closed")
+        if not joined:
+            raise HTTPException(status_code=400, detail=error or "Failed to join session")
+        
+        # Students of one batch share the session dict
+        session = joined['session'] = dict(joined['session'])
+        deadline = scheduler.deadline(session['session_id']) or session_deadline(
+            session['started_at'], session['auto_close_minutes'])
+        session['deadline'] = deadline.isoformat() if deadline else None
+        joined['server_time'] = utcnow().isoformat()
+        
+        metrics.STUDENTS_JOINED.inc()
+        poll_advisor.link(class_code, session['session_id'])
+        poll_advisor.touch(session['session_id'])
+        board = leaderboards.get(session['session_id'])
+        if board is not None:
+            board.add_student(joined['student_id'], student_name)
+        logger.info("Student joined", extra={
+            "event": "student_joined", "student_id": joined['student_id']})
+        return json_response(dumps(joined))
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/student/answer")
 async def submit_student_answer(
     student_id: int,
@@ -415,18 +1051,34 @@ async def submit_student_answer(
     time_taken: int = 0
 ):
     """Submit student answer"""
+    # Deadlines are in memory: late answers are turned away without a query
+    if scheduler.is_late(session_id):
+        metrics.LATE_ANSWERS_REJECTED.inc()
+        raise HTTPException(status_code=409, detail="Submissions are closed for this session")
+    
     try:
-        success, error = submit_answer(
-            student_id=student_id,
-            session_id=session_id,
-            question_id=question_id,
-            answer_id=answer_id,
-            time_taken=time_taken
-        )
+        # First in line for a database slot, ahead of every poll
+        success, error = await db_gate.run(
+            WRITE, submit_answer, student_id, session_id, question_id, answer_id, time_taken)
         
+        if error == SESSION_NOT_ACTIVE:
+            metrics.LATE_ANSWERS_REJECTED.inc()
+            raise HTTPException(status_code=409, detail="Submissions are closed for this session")
+        if error == QUESTION_NOT_OPEN:
+            raise HTTPException(status_code=409, detail="This question is not open")
         if not success:
             raise HTTPException(status_code=400, detail=error or "Failed to submit answer")
         
+        metrics.record_answer()
+        poll_advisor.touch(session_id)
+        board = leaderboards.get(session_id)
+        if board is not None:
+            ranks = board.record(student_id, question_id, answer_id, time_taken)
+            # Only moves into, out of or within the top K change what is pushed
+            if any(rank is not None and rank <= LEADERBOARD_TOP_K for rank in ranks):
+                schedule_leaderboard_push(session_id)
+        logger.info("Answer submitted", extra={
+            "event": "answer_submitted", "student_id": student_id, "answer_id": answer_id})
         return {"success": True, "message": "Answer submitted"}
     
     except HTTPException:
@@ -435,15 +1087,25 @@ async def submit_student_answer(
         raise HTTPException(status_code=500, detail=str(e))
     
 @app.get("/api/session/{session_id}/student-responses")
-async def get_student_responses_endpoint(session_id: int):
-    student_responses = get_student_responses(session_id)
-    if student_responses is None:
-        raise HTTPException(status_code=404, detail="Session not found")
-    return StudentDetailsResponse(
-        students=student_responses['students'],
-        total_students=student_responses['total_students'],
-        total_responses=student_responses['total_responses']
-    )
+async def get_student_responses_endpoint(session_id: int, request: Request):
+    def load():
+        version = get_session_version(session_id)
+        cached = response_cache.get("student_responses", session_id, version)
+        if cached is not None:
+            return version, cached
+        
+        student_responses = get_student_responses(session_id)
+        if student_responses is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        body = dumps(StudentDetailsResponse(
+            students=student_responses['students'],
+            total_students=student_responses['total_students'],
+            total_responses=student_responses['total_responses']
+        ).model_dump())
+        response_cache.put("student_responses", session_id, version, body)
+        return version, body
+    
+    return await poll_read("student_responses", session_id, request, load, session_id)
 
 
 # ============================================
@@ -465,16 +1127,21 @@ async def health_check():
     """Health check endpoint - used by C# client"""
     try:
         # Test database connection
-        conn = get_db_connection()
-        if conn:
-            conn.close()
-            return {"status": "healthy", "database": "connected"}
+        if check_database():
+            return {"status": "healthy", "database": "connected", "storage": STORAGE_BACKEND}
         else:
-            return {"status": "degraded", "database": "disconnected"}
+            return {"status": "degraded", "database": "disconnected", "storage": STORAGE_BACKEND}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Request and domain metrics in Prometheus text format"""
+    return PlainTextResponse(metrics.registry.render(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # ============================================
 # STARTUP MESSAGE
 # ============================================
@@ -486,14 +1153,22 @@ def print_startup_message():
     print("\n📡 Server: http://localhost:8000")
     print("📊 API Docs: http://localhost:8000/docs")
     print("🔍 Health Check: http://localhost:8000/health")
+    print("📈 Metrics: http://localhost:8000/metrics")
     print("\n💡 Keep this window open while using the add-in!")
     print("\n🔗 Endpoints:")
     print("   POST /api/auth/register")
     print("   POST /api/auth/login")
     print("   POST /api/quiz/create")
+    print("   GET  /api/quiz/{id}/sessions")
+    print("   GET  /api/teacher/{id}/summary")
     print("   POST /api/session/start")
     print("   GET  /api/session/{id}/results")
+    print("   GET  /api/session/{id}/stats")
+    print("   GET  /api/session/{id}/snapshot")
+    print("   POST /api/session/{id}/advance")
     print("   POST /api/session/{id}/close")
+    print("   WS   /ws/session/{id}")
+    print("   POST /api/student/join-by-code")
     print("="*60 + "\n")
 
 
@@ -0,0 +1,406 @@
+"""
+In-process request and domain metrics, exposed in Prometheus text format
+
+Recording a request costs a few dict lookups and a deque append; quantiles
+and domain gauges that need the database are only computed when /metrics
+is scraped.
+"""
+
+from bisect import bisect_left
+from collections import deque
+from threading import Lock
+import time
+
+# Seconds; tuned for an API whose requests are mostly single-digit milliseconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUANTILES = (0.5, 0.95, 0.99)
+RECENT_SAMPLES = 1024
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.extend(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def total(self):
+        return sum(self._values.values())
+
+    def samples(self):
+        if not self.labelnames and not self._values:
+            yield self.name, "", 0
+        for labels, value in list(self._values.items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    """Value that can go up and down, or be read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def samples(self):
+        if self.callback is not None:
+            value = self.callback()
+            if value is not None:
+                yield self.name, "", value
+            return
+        yield from super().samples()
+
+
+class Histogram:
+    """Cumulative buckets plus a window of recent samples for exact quantiles"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {
+                    "counts": [0] * (len(self.buckets) + 1),
+                    "sum": 0.0,
+                    "recent": deque(maxlen=RECENT_SAMPLES),
+                }
+            series["counts"][bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["recent"].append(value)
+
+    def quantiles(self, *labels):
+        """Quantiles over the most recent RECENT_SAMPLES observations"""
+        series = self._series.get(labels)
+        if not series or not series["recent"]:
+            return {}
+        ordered = sorted(series["recent"])
+        last = len(ordered) - 1
+        return {q: ordered[min(last, int(q * last + 0.5))] for q in QUANTILES}
+
+    def samples(self):
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield (f"{self.name}_bucket",
+                       _format_labels(self.labelnames, labels, [("le", le)]), cumulative)
+            yield f"{self.name}_sum", _format_labels(self.labelnames, labels), series["sum"]
+            yield f"{self.name}_count", _format_labels(self.labelnames, labels), cumulative
+
+    def quantile_samples(self):
+        for labels in list(self._series):
+            for q, value in self.quantiles(*labels).items():
+                yield (f"{self.name}_quantile",
+                       _format_labels(self.labelnames, labels, [("quantile", q)]), value)
+
+
+class RateMeter:
+    """Events per second over a sliding window of one-second slots"""
+
+    def __init__(self, window_seconds=60):
+        self.window = window_seconds
+        self._slots = [0] * window_seconds
+        self._stamps = [0] * window_seconds
+        self._lock = Lock()
+
+    def mark(self, amount=1):
+        now = int(time.time())
+        index = now % self.window
+        with self._lock:
+            if self._stamps[index] != now:
+                self._stamps[index] = now
+                self._slots[index] = 0
+            self._slots[index] += amount
+
+    def rate(self):
+        now = int(time.time())
+        total = sum(count for count, stamp in zip(self._slots, self._stamps)
+                    if now - stamp < self.window)
+        return total / self.window
+
+
+class MetricsRegistry:
+    """Holds metrics and extra collectors and renders them for Prometheus"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """Register a callable yielding (name, kind, help, [(labels_dict, value)])"""
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                for name, labels, value in metric.samples():
+                    lines.append(f"{name}{labels} {_format_value(value)}")
+            except Exception:
+                continue
+            if isinstance(metric, Histogram):
+                lines.append(f"# HELP {metric.name}_quantile Recent-window quantiles of {metric.name}")
+                lines.append(f"# TYPE {metric.name}_quantile gauge")
+                for name, labels, value in metric.quantile_samples():
+                    lines.append(f"{name}{labels} {_format_value(value)}")
+
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = _format_labels(tuple(labels), tuple(labels.values()))
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter(
+    "classpoint_http_requests_total", "HTTP requests by route, method and status",
+    ("route", "method", "status"))
+ERRORS = registry.counter(
+    "classpoint_http_request_errors_total", "HTTP requests that failed with a 5xx or exception",
+    ("route", "method"))
+LATENCY = registry.histogram(
+    "classpoint_http_request_duration_seconds", "HTTP request latency", ("route", "method"))
+IN_FLIGHT = registry.gauge(
+    "classpoint_http_requests_in_flight", "HTTP requests currently being served")
+
+STUDENTS_JOINED = registry.counter(
+    "classpoint_students_joined_total", "Students that joined a session")
+ANSWERS_SUBMITTED = registry.counter(
+    "classpoint_answers_submitted_total", "Answers accepted from students")
+ANSWER_RATE = RateMeter()
+registry.gauge("classpoint_answers_per_second",
+               "Answers accepted per second over the last minute", callback=ANSWER_RATE.rate)
+SESSIONS_AUTO_CLOSED = registry.counter(
+    "classpoint_sessions_auto_closed_total", "Sessions closed by the server at their deadline")
+LATE_ANSWERS_REJECTED = registry.counter(
+    "classpoint_late_answers_rejected_total", "Answers rejected because the session had closed")
+RATE_LIMITED = registry.counter(
+    "classpoint_rate_limited_total", "Requests refused with 429 by endpoint class", ("class",))
+READS_DEGRADED = registry.counter(
+    "classpoint_reads_degraded_total",
+    "Polls answered from the last cached body while the database was busy", ("endpoint",))
+READS_SHED = registry.counter(
+    "classpoint_reads_shed_total",
+    "Polls refused with 503 because the database was saturated", ("endpoint",))
+READS_EXECUTED = registry.counter(
+    "classpoint_reads_executed_total", "Poll reads that ran against the database",
+    ("endpoint",))
+READS_SAVED = registry.counter(
+    "classpoint_reads_saved_total",
+    "Poll reads answered by an identical read in flight or just finished",
+    ("endpoint", "reason"))
+DB_ADMISSION_WAIT = registry.histogram(
+    "classpoint_db_admission_wait_seconds", "Time waited for a database slot", ("priority",))
+JOIN_BATCH_SIZE = registry.histogram(
+    "classpoint_join_batch_size", "Student joins written per batch", ("kind",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 200))
+JOIN_BATCH_SECONDS = registry.histogram(
+    "classpoint_join_batch_seconds", "Time to write one batch of joins", ("kind",))
+
+
+DB_ROUND_TRIPS = registry.histogram(
+    "classpoint_db_round_trips_per_request", "Database statements executed per HTTP request",
+    ("route",), buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16, 32))
+DB_TIME = registry.histogram(
+    "classpoint_db_seconds_per_request", "Time spent in the database per HTTP request",
+    ("route",))
+
+
+def record_answer():
+    ANSWERS_SUBMITTED.inc()
+    ANSWER_RATE.mark()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording count, latency, status and in-flight per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_holder = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            status_holder[0] = 500
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            # Use the route template so /session/1 and /session/2 share a series
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "GET")
+            status = status_holder[0]
+            REQUESTS.inc(route_label, method, str(status))
+            LATENCY.observe(elapsed, route_label, method)
+            if status >= 500:
+                ERRORS.inc(route_label, method)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware recording database round trips and time per request
+
+    `begin` must bind a fresh counter dict for the request (see
+    database.begin_request_stats) and return it.
+    """
+
+    def __init__(self, app, begin):
+        self.app = app
+        self.begin = begin
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = self.begin()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            DB_ROUND_TRIPS.observe(stats["round_trips"], route)
+            DB_TIME.observe(stats["db_seconds"] + stats["connect_seconds"], route)
+
+
+def admission_collector(gate, priority_names):
+    """Build a registry collector exposing a PriorityGate's slots and queues"""
+
+    def collect():
+        yield ("classpoint_db_slots_in_use", "gauge",
+               "Database calls running now", [({}, gate.in_use)])
+        yield ("classpoint_db_slots_queued", "gauge",
+               "Database calls waiting for a slot by priority",
+               [({"priority": name}, gate.queued(priority))
+                for priority, name in priority_names.items()])
+
+    return collect
+
+
+def query_stats_collector(get_stats):
+    """Build a registry collector exposing database.get_query_stats() aggregates"""
+
+    def collect():
+        stats = get_stats()
+        statements = stats["statements"]
+        functions = stats["functions"]
+
+        def statement_labels(s):
+            return {"function": s["function"], "statement_id": s["statement_id"]}
+
+        # The text once per id, so the counters' series stay one per statement
+        texts = {s["statement_id"]: s["statement"] for s in statements}
+        yield ("classpoint_db_statement_info", "gauge",
+               "Normalized text of each statement_id (truncated)",
+               [({"statement_id": sid, "statement": text[:200]}, 1)
+                for sid, text in texts.items()])
+        yield ("classpoint_db_statement_calls_total", "counter",
+               "Executions per statement and calling helper",
+               [(statement_labels(s), s["calls"]) for s in statements])
+        yield ("classpoint_db_statement_seconds_total", "counter",
+               "Time spent executing each statement",
+               [(statement_labels(s), s["seconds"]) for s in statements])
+        yield ("classpoint_db_statement_max_seconds", "gauge",
+               "Slowest single execution of each statement",
+               [(statement_labels(s), s["max_seconds"]) for s in statements])
+        yield ("classpoint_db_statement_rows_total", "counter",
+               "Rows returned or affected per statement",
+               [(statement_labels(s), s["rows"]) for s in statements])
+        yield ("classpoint_db_function_calls_total", "counter",
+               "Calls per database helper",
+               [({"function": f["function"]}, f["calls"]) for f in functions])
+        yield ("classpoint_db_function_seconds_total", "counter",
+               "Time spent in each database helper, including connecting",
+               [({"function": f["function"]}, f["seconds"]) for f in functions])
+        yield ("classpoint_db_connections_total", "counter",
+               "Database connections opened", [({}, stats["connections"]["count"])])
+        yield ("classpoint_db_connect_seconds_total", "counter",
+               "Time spent acquiring database connections",
+               [({}, stats["connections"]["seconds"])])
+        yield ("classpoint_db_slow_queries_total", "counter",
+               "Statements slower than SLOW_QUERY_MS", [({}, stats["slow_queries"])])
+
+    return collect
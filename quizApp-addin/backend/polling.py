@@ -0,0 +1,102 @@
+"""
+Server-driven poll intervals
+
+Every poll response carries an `X-Next-Poll-Ms` header telling the client
+when to ask again. A session whose students are answering is polled at
+POLL_ACTIVE_MS. Once answers stop, the interval stretches linearly to
+POLL_IDLE_MS over POLL_IDLE_AFTER_S seconds. A closed session is polled
+at POLL_CLOSED_MS, whether this process closed it or read its closed row.
+Every interval is stretched again while the database
+gate has callers queued, so aggregate poll traffic follows activity and
+backs off under load. Activity is kept in memory per process, like the
+deadlines.
+"""
+
+from collections import OrderedDict
+import os
+import time
+
+POLL_ACTIVE_MS = int(os.getenv("POLL_ACTIVE_MS", 3000))
+POLL_IDLE_MS = int(os.getenv("POLL_IDLE_MS", 15000))
+POLL_CLOSED_MS = int(os.getenv("POLL_CLOSED_MS", 60000))
+# Seconds without answers or joins before a session counts as fully idle
+POLL_IDLE_AFTER_S = float(os.getenv("POLL_IDLE_AFTER_S", 30))
+# Upper bound of the load stretch (4 = at most four times longer)
+POLL_MAX_LOAD_FACTOR = float(os.getenv("POLL_MAX_LOAD_FACTOR", 4))
+# Student status checks only change when the teacher advances or closes
+POLL_STATUS_MIN_MS = int(os.getenv("POLL_STATUS_MIN_MS", 5000))
+POLL_MAX_SESSIONS = int(os.getenv("POLL_MAX_SESSIONS", 10000))
+
+NEXT_POLL_HEADER = "X-Next-Poll-Ms"
+
+
+class PollAdvisor:
+    """Last activity per session, turned into a next-poll hint"""
+
+    def __init__(self, active_ms=POLL_ACTIVE_MS, idle_ms=POLL_IDLE_MS,
+                 closed_ms=POLL_CLOSED_MS, idle_after=POLL_IDLE_AFTER_S,
+                 max_load_factor=POLL_MAX_LOAD_FACTOR, max_sessions=POLL_MAX_SESSIONS,
+                 clock=time.monotonic):
+        self.active_ms = active_ms
+        self.idle_ms = idle_ms
+        self.closed_ms = closed_ms
+        self.idle_after = idle_after
+        self.max_load_factor = max_load_factor
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self._last_activity = OrderedDict()    # session_id -> clock time
+        self._codes = {}                       # class_code -> session_id
+        self._closed = OrderedDict()           # session_id -> True, read as closed
+
+    def touch(self, session_id):
+        """Record an answer, join, new question or close in a session"""
+        self._last_activity[session_id] = self.clock()
+        self._last_activity.move_to_end(session_id)
+        while len(self._last_activity) > self.max_sessions:
+            self._last_activity.popitem(last=False)
+
+    def link(self, class_code, session_id):
+        """Remember which session a class code polls"""
+        if len(self._codes) >= self.max_sessions and class_code not in self._codes:
+            self._codes.clear()
+        self._codes[class_code] = session_id
+
+    def observe(self, session_id, status):
+        """Record the status read from a session's row"""
+        if status != 'closed':
+            self._closed.pop(session_id, None)
+            return
+        self._closed[session_id] = True
+        self._closed.move_to_end(session_id)
+        while len(self._closed) > self.max_sessions:
+            self._closed.popitem(last=False)
+
+    def is_closed(self, session_id):
+        """True when the session's row was last read as closed"""
+        return session_id in self._closed
+
+    def session_for_code(self, class_code):
+        return self._codes.get(class_code)
+
+    def activity(self, session_id):
+        """Clock time of the session's last recorded write, or None"""
+        return self._last_activity.get(session_id)
+
+    def next_poll_ms(self, session_id, closed=False, load=0.0, floor_ms=0):
+        """Milliseconds until the client should poll this session again
+
+        Args:
+            closed: The session no longer accepts answers
+            load: Callers queued per database slot; stretches the interval
+            floor_ms: Never hint less than this (e.g. for status checks)
+        """
+        if closed:
+            return self.closed_ms
+        last = self._last_activity.get(session_id)
+        if last is None:
+            interval = self.idle_ms
+        else:
+            idle = min(1.0, (self.clock() - last) / self.idle_after) if self.idle_after else 1.0
+            interval = self.active_ms + (self.idle_ms - self.active_ms) * idle
+        interval *= min(self.max_load_factor, 1.0 + max(0.0, load))
+        return int(max(interval, floor_ms))
@@ -0,0 +1,207 @@
+"""
+In-process admission control: token buckets per session, client and route class
+
+A stuck poller (an add-in with a 2-second timer in every open dialog) gets
+`429 Too Many Requests` with a `Retry-After` header once it exceeds its
+class's rate, and the requests of everyone else keep their share of the
+database. Limits are per process, like the response cache.
+
+    RATE_LIMITS="poll=2/10,status=100/300,answer=5/20,write=5/20,default=20/40"
+
+Each entry is `class=rate/burst`: `rate` requests per second refill a bucket
+holding at most `burst`. A class left out is not limited. Joins are left
+out by default: every student joins through the one Streamlit server, and
+joins are already batched and gated (see bench_joins.py); `join=50/500`
+would turn away about half of a 1,000-student join storm.
+"""
+
+from collections import OrderedDict
+from urllib.parse import parse_qs
+import math
+import os
+import re
+import time
+
+import orjson
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMITS = os.getenv("RATE_LIMITS",
+                        "poll=2/10,status=100/300,answer=5/20,write=5/20,default=20/40")
+# Idle buckets beyond this many are forgotten, oldest first
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", 10000))
+# Student buckets one address may hold; past it its new students share one
+RATE_LIMIT_KEYS_PER_ADDRESS = int(os.getenv("RATE_LIMIT_KEYS_PER_ADDRESS", 1000))
+
+# (class, method, path pattern), first match wins
+ROUTE_CLASSES = [
+    ("answer", "POST", re.compile(r"^/api/student/answer$")),
+    ("join", "POST", re.compile(r"^/api/student/join")),
+    # Every student's status check arrives from the one Streamlit server
+    ("status", "GET", re.compile(r"^/api/session/code/")),
+    ("poll", "GET", re.compile(r"^/api/sessions?/")),
+    ("write", "POST", re.compile(r"^/api/")),
+]
+# Classes whose endpoint acts as the student named in the query, so the
+# student (issued by a join) is the caller; every other class is keyed on
+# the peer address alone
+STUDENT_CLASSES = {"answer"}
+# Never limited: liveness probes, scrapes and the docs
+EXEMPT_PATHS = re.compile(r"^/(health|metrics|docs|redoc|openapi\.json)?$")
+
+_SESSION_IN_PATH = re.compile(r"/session/(?:code/)?(\w+)")
+
+
+def parse_limits(spec):
+    """Parse "class=rate/burst,..." into {class: (rate, burst)}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        rate, _, burst = value.partition("/")
+        try:
+            rate = float(rate)
+            limits[name.strip()] = (rate, float(burst) if burst else max(1.0, rate))
+        except ValueError:
+            continue
+    return limits
+
+
+def classify(method, path):
+    """Endpoint class of a request, or None when it is never limited"""
+    if EXEMPT_PATHS.match(path):
+        return None
+    for name, route_method, pattern in ROUTE_CLASSES:
+        if method == route_method and pattern.match(path):
+            return name
+    return "default"
+
+
+def peer_address(scope):
+    peer = scope.get("client")
+    return peer[0] if peer else "unknown"
+
+
+def request_key(scope, route_class):
+    """(session, client) a request is counted against
+
+    The client is the peer address. Answers are counted per student, so a
+    classroom behind one NAT or the Streamlit server is not one client;
+    RateLimiter caps how many students one address may spread over.
+    Headers and query values the endpoint does not act on never pick the
+    bucket.
+    """
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    match = _SESSION_IN_PATH.search(scope.get("path", ""))
+    session = match.group(1) if match else (query.get("session_id") or
+                                            query.get("class_code") or [None])[0]
+
+    if route_class in STUDENT_CLASSES and query.get("student_id"):
+        return session, "student_id:" + query["student_id"][0][:32]
+    return session, "ip:" + peer_address(scope)
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        """0.0 when a token was taken, else the seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+
+class RateLimiter:
+    """Token buckets keyed by (class, session, client)
+
+    Buckets not keyed on an address are counted against the address that
+    created them; one address holds at most `keys_per_address` of them and
+    shares its address bucket beyond that. Only touched from the event
+    loop, so no lock is needed.
+    """
+
+    def __init__(self, limits=None, max_buckets=RATE_LIMIT_MAX_BUCKETS,
+                 keys_per_address=RATE_LIMIT_KEYS_PER_ADDRESS, clock=time.monotonic):
+        self.limits = parse_limits(RATE_LIMITS) if limits is None else limits
+        self.max_buckets = max_buckets
+        self.keys_per_address = keys_per_address
+        self.clock = clock
+        self._buckets = OrderedDict()
+        # key -> address for buckets not keyed on an address, and their count per address
+        self._owners = {}
+        self._owned = {}
+
+    def check(self, route_class, session, client, address=None):
+        """Seconds the caller must wait, 0.0 when the request is admitted"""
+        limit = self.limits.get(route_class)
+        if limit is None:
+            return 0.0
+        now = self.clock()
+        key = (route_class, session, client)
+        bucket = self._buckets.get(key)
+        if bucket is None and address is not None and client != "ip:" + address:
+            if self._owned.get(address, 0) >= self.keys_per_address:
+                key = (route_class, session, "ip:" + address)
+                bucket = self._buckets.get(key)
+            else:
+                self._owners[key] = address
+                self._owned[address] = self._owned.get(address, 0) + 1
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(*limit, now)
+            while len(self._buckets) > self.max_buckets:
+                self._forget(self._buckets.popitem(last=False)[0])
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(now)
+
+    def _forget(self, key):
+        address = self._owners.pop(key, None)
+        if address is not None:
+            self._owned[address] -= 1
+            if not self._owned[address]:
+                del self._owned[address]
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 with Retry-After once a bucket is empty
+
+    `on_reject(route_class)` is called for every rejected request.
+    """
+
+    def __init__(self, app, limiter=None, on_reject=None, enabled=RATE_LIMIT_ENABLED):
+        self.app = app
+        self.limiter = limiter or RateLimiter()
+        self.on_reject = on_reject
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+
+        route_class = classify(scope.get("method", "GET"), scope.get("path", ""))
+        if route_class is None:
+            return await self.app(scope, receive, send)
+        wait = self.limiter.check(route_class, *request_key(scope, route_class),
+                                  address=peer_address(scope))
+        if not wait:
+            return await self.app(scope, receive, send)
+
+        if self.on_reject is not None:
+            self.on_reject(route_class)
+        retry_after = str(max(1, math.ceil(wait))) if wait != math.inf else "60"
+        body = orjson.dumps({"detail": "Too many requests", "retry_after": float(retry_after)})
+        await send({"type": "http.response.start", "status": 429, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", retry_after.encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,108 @@
+"""
+Fast JSON encoding and pre-serialized payload cache for hot endpoints
+
+Polling endpoints return the same body until a session's results_version
+changes, so the encoded bytes are kept next to the version they were built
+from and served as-is while the version is unchanged. The same version is
+exposed as an ETag so clients that send If-None-Match get an empty 304.
+"""
+
+from collections import OrderedDict
+from decimal import Decimal
+from threading import Lock
+import os
+
+import orjson
+from fastapi.responses import Response
+
+CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") != "0"
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 2048))
+
+
+def _default(value):
+    """Encode types orjson does not handle natively"""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(payload):
+    """Serialize a payload (dicts, RealDictRows, datetimes) straight to bytes"""
+    return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_response(body, status_code=200, headers=None, etag=None):
+    """Wrap already-encoded JSON bytes, skipping FastAPI's jsonable_encoder"""
+    if etag is not None:
+        headers = {**(headers or {}), "ETag": etag}
+    return Response(content=body, status_code=status_code,
+                    headers=headers, media_type="application/json")
+
+
+def make_etag(name, key, version):
+    """Validator for a payload that only changes when `version` does"""
+    if version is None:
+        return None
+    return f'"{name}-{key}-{version}"'
+
+
+def not_modified(request, etag):
+    """A 304 response if the client already holds this ETag, else None"""
+    if etag is None:
+        return None
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    candidates = [tag.strip() for tag in header.split(",")]
+    if etag in candidates or f"W/{etag}" in candidates or "*" in candidates:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+class ResponseCache:
+    """Bounded LRU of encoded payloads tagged with the version they were built from"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, enabled=CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, key, version):
+        """Return cached bytes for (name, key) if built from this version"""
+        if not self.enabled or version is None:
+            return None
+        with self._lock:
+            entry = self._entries.get((name, key))
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((name, key))
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, name, key):
+        """(version, bytes) last stored for (name, key), whatever the version, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._entries.get((name, key))
+
+    def put(self, name, key, version, body):
+        """Store encoded bytes for (name, key) at the given version"""
+        if not self.enabled or version is None:
+            return
+        with self._lock:
+            self._entries[(name, key)] = (version, body)
+            self._entries.move_to_end((name, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, name, key):
+        with self._lock:
+            self._entries.pop((name, key), None)
+
+
+response_cache = ResponseCache()
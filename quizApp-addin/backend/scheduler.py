@@ -0,0 +1,199 @@
+"""
+Server-side auto-close for quiz sessions
+
+Deadlines live in a heap ordered by time; one asyncio task sleeps until the
+earliest one, closes that session and reports it through `on_close`. Nothing
+polls the sessions table: deadlines are loaded once at startup and added as
+sessions start. The same deadlines answer "is this submission late?" from
+memory, so the answer endpoint needs no extra query. Closed sessions are
+forgotten CLOSED_RETENTION_SECONDS after closing; from then on storage's
+own status check turns their answers away.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import asyncio
+import heapq
+import logging
+import os
+
+logger = logging.getLogger("classpoint.scheduler")
+
+# Submissions this many seconds past the deadline are still accepted, to
+# absorb the client's network latency; none once a session is closed
+LATE_GRACE_SECONDS = 1.0
+# Wait before retrying a close the database refused
+RETRY_SECONDS = 5.0
+# How long a closed session's deadline is remembered
+CLOSED_RETENTION_SECONDS = float(os.getenv("SCHEDULER_CLOSED_RETENTION_SECONDS", 3600))
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def session_deadline(started_at, auto_close_minutes):
+    """Aware UTC deadline for a session, or None when it never auto-closes"""
+    if not started_at or not auto_close_minutes or auto_close_minutes <= 0:
+        return None
+    if isinstance(started_at, str):
+        started_at = datetime.fromisoformat(started_at)
+    if started_at.tzinfo is None:
+        # Stored as naive UTC
+        started_at = started_at.replace(tzinfo=timezone.utc)
+    return started_at + timedelta(minutes=auto_close_minutes)
+
+
+class DeadlineScheduler:
+    """Closes sessions at their deadline
+
+    Args:
+        close: Blocking `close(session_id) -> bool`, run in a worker thread
+        on_close: Optional coroutine `on_close(session_id, closed_at)` awaited
+            after the scheduler closed a session
+        run: Optional coroutine `run(fn, *args)` that runs `close` in place
+            of the default executor, e.g. behind the database gate
+    """
+
+    def __init__(self, close, on_close=None, run=None):
+        self.close = close
+        self.on_close = on_close
+        self.run = run
+        self._deadlines = {}   # session_id -> deadline; kept for a while after closing
+        self._heap = []        # (deadline, session_id); stale entries skipped
+        self._closed = OrderedDict()   # session_id -> closed_at, oldest first
+        self._wakeup = None
+        self._task = None
+        self.closed_count = 0
+
+    def schedule(self, session_id, deadline):
+        """Set or move a session's deadline"""
+        if deadline is None:
+            return
+        self._deadlines[session_id] = deadline
+        heapq.heappush(self._heap, (deadline, session_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def closed(self, session_id, closed_at=None):
+        """Record a session closed elsewhere; later submissions are late"""
+        closed_at = closed_at or utcnow()
+        deadline = self._deadlines.get(session_id)
+        self._deadlines[session_id] = min(deadline, closed_at) if deadline else closed_at
+        self._mark_closed(session_id, closed_at)
+
+    def deadline(self, session_id):
+        return self._deadlines.get(session_id)
+
+    def is_late(self, session_id, now=None):
+        """True once the session is closed, or its deadline (plus grace) has passed
+
+        False for sessions this process does not know or has forgotten;
+        submit_answer() checks the stored status for those.
+        """
+        if session_id in self._closed:
+            return True
+        deadline = self._deadlines.get(session_id)
+        if deadline is None:
+            return False
+        now = now or utcnow()
+        return now > deadline + timedelta(seconds=LATE_GRACE_SECONDS)
+
+    def pending(self):
+        """Number of sessions still waiting for their deadline"""
+        now = utcnow()
+        self._prune(now)
+        return sum(1 for session_id, deadline in self._deadlines.items()
+                   if deadline > now and session_id not in self._closed)
+
+    def _mark_closed(self, session_id, closed_at):
+        self._closed[session_id] = closed_at
+        self._closed.move_to_end(session_id)
+        self._prune(closed_at)
+
+    def _prune(self, now):
+        """Forget sessions closed more than CLOSED_RETENTION_SECONDS ago"""
+        cutoff = now - timedelta(seconds=CLOSED_RETENTION_SECONDS)
+        while self._closed:
+            session_id, closed_at = next(iter(self._closed.items()))
+            if closed_at > cutoff:
+                break
+            del self._closed[session_id]
+            self._deadlines.pop(session_id, None)
+
+    async def start(self, sessions=()):
+        """Schedule rows from get_auto_close_sessions() and start the timer task"""
+        for row in sessions:
+            self.schedule(row['session_id'],
+                          session_deadline(row['started_at'], row['auto_close_minutes']))
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Auto-close scheduler started", extra={
+            "event": "scheduler_started", "pending": len(self._heap)})
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _pop_due(self, now):
+        """Session ids whose current deadline is at or before now"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, session_id = heapq.heappop(self._heap)
+            # Skip entries superseded by a later schedule() or closed()
+            if session_id not in self._closed and self._deadlines.get(session_id) == deadline:
+                due.append(session_id)
+        return due
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = utcnow()
+            for session_id in self._pop_due(now):
+                await self._close(loop, session_id, now)
+
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, (self._heap[0][0] - utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _retry(self, session_id):
+        deadline = self._deadlines.get(session_id)
+        if deadline is not None:
+            heapq.heappush(self._heap, (deadline, session_id))
+            self._wakeup.set()
+
+    async def _close(self, loop, session_id, now):
+        try:
+            if self.run is not None:
+                closed = await self.run(self.close, session_id)
+            else:
+                closed = await loop.run_in_executor(None, self.close, session_id)
+        except Exception:
+            logger.exception("Auto-close failed, retrying", extra={"session_id": session_id})
+            loop.call_later(RETRY_SECONDS, self._retry, session_id)
+            return
+        if not closed:
+            logger.warning("Auto-close failed, retrying", extra={
+                "event": "auto_close_failed", "session_id": session_id})
+            loop.call_later(RETRY_SECONDS, self._retry, session_id)
+            return
+
+        self._mark_closed(session_id, now)
+        self.closed_count += 1
+        logger.info("Session auto-closed", extra={
+            "event": "session_auto_closed", "session_id": session_id})
+        if self.on_close is not None:
+            try:
+                await self.on_close(session_id, now)
+            except Exception:
+                logger.exception("Close event failed", extra={"session_id": session_id})
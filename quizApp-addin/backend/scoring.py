@@ -0,0 +1,60 @@
+"""
+Scoring rules shared by live leaderboards and session grading
+
+A question is worth SCORE_POINTS plus up to SCORE_SPEED_BONUS, which
+shrinks linearly to nothing at SCORE_SPEED_WINDOW_S seconds, scaled by the
+quiz's difficulty (quiz_mode) multiplier. A student earns that times their
+credit for the question:
+
+    credit = max(0, (correct picked - wrong picked) / correct answers)
+
+so a single-select answer scores all or nothing, and a multi-select answer
+with two of three correct options and no wrong one earns two thirds. The
+time of an answer set is that of its last answer.
+
+grading.py applies the same rules to a whole session at once; both must
+produce the same points.
+"""
+
+import os
+
+SCORE_POINTS = int(os.getenv("SCORE_POINTS", 1000))
+SCORE_SPEED_BONUS = int(os.getenv("SCORE_SPEED_BONUS", 500))
+SCORE_SPEED_WINDOW_S = float(os.getenv("SCORE_SPEED_WINDOW_S", 30))
+DIFFICULTY_MULTIPLIERS = {
+    "easy": float(os.getenv("SCORE_MULTIPLIER_EASY", 1.0)),
+    "medium": float(os.getenv("SCORE_MULTIPLIER_MEDIUM", 1.5)),
+    "hard": float(os.getenv("SCORE_MULTIPLIER_HARD", 2.0)),
+}
+
+
+def difficulty_multiplier(quiz_mode):
+    """Points multiplier of a quiz_mode; unknown modes count as easy"""
+    return DIFFICULTY_MULTIPLIERS.get((quiz_mode or "easy").lower(), DIFFICULTY_MULTIPLIERS["easy"])
+
+
+def answer_credit(correct_ids, chosen_ids):
+    """Share of a question earned by picking `chosen_ids`, from 0.0 to 1.0"""
+    if not correct_ids:
+        return 0.0
+    hits = len(correct_ids.intersection(chosen_ids))
+    wrong = len(chosen_ids) - hits
+    return min(1.0, max(0.0, (hits - wrong) / len(correct_ids)))
+
+
+def speed_factor(seconds):
+    if SCORE_SPEED_WINDOW_S <= 0:
+        return 0.0
+    return min(1.0, max(0.0, 1.0 - seconds / SCORE_SPEED_WINDOW_S))
+
+
+def score_question(correct_ids, chosen, multiplier=1.0):
+    """(points, credit, seconds) for one student's answers {answer_id: seconds} to a question"""
+    if not chosen:
+        return 0, 0.0, 0
+    credit = answer_credit(correct_ids, chosen.keys())
+    seconds = max(chosen.values())
+    if not credit:
+        return 0, 0.0, seconds
+    points = multiplier * credit * (SCORE_POINTS + SCORE_SPEED_BONUS * speed_factor(seconds))
+    return round(points), credit, seconds
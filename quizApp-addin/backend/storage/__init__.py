@@ -0,0 +1,45 @@
+"""
+Pluggable storage backends
+
+    STORAGE_BACKEND=postgres   # default; DB_* settings from .env
+    STORAGE_BACKEND=sqlite     # embedded file at SQLITE_PATH, no server needed
+    STORAGE_BACKEND=memory     # process-local, for tests and demos
+
+Backend modules are imported lazily so psycopg2 is only needed for Postgres.
+"""
+
+import os
+
+from .base import (
+    Storage,
+    SUMMARY_COLUMNS,
+    SNAPSHOT_SECTIONS,
+    SESSION_NOT_FOUND,
+    SESSION_NOT_ACTIVE,
+    QUESTION_NOT_OPEN,
+    NO_MORE_QUESTIONS,
+    hash_password,
+)
+
+BACKENDS = ("postgres", "sqlite", "memory")
+
+
+def create_storage(kind=None, **options):
+    """Build the configured backend
+
+    Args:
+        kind: "postgres", "sqlite" or "memory"; defaults to $STORAGE_BACKEND
+        options: `config` (psycopg2 connect kwargs) for Postgres,
+                 `path` for SQLite (defaults to $SQLITE_PATH)
+    """
+    kind = (kind or os.getenv("STORAGE_BACKEND", "postgres")).lower()
+    if kind == "postgres":
+        from .postgres import PostgresStorage
+        return PostgresStorage(options["config"])
+    if kind == "sqlite":
+        from .sqlite import SQLiteStorage
+        return SQLiteStorage(options.get("path") or os.getenv("SQLITE_PATH", "quiz_app.sqlite3"))
+    if kind == "memory":
+        from .memory import MemoryStorage
+        return MemoryStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND {kind!r}; expected one of {', '.join(BACKENDS)}")
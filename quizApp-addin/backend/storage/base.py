@@ -0,0 +1,327 @@
+"""
+Storage interface shared by the Postgres, SQLite and in-memory backends
+
+Every backend keeps the return conventions database.py always had: rows are
+plain dicts keyed by column name, writes return `(value, error)` tuples and
+reads return None (or []) when the lookup fails.
+"""
+
+from abc import ABC, abstractmethod
+import hashlib
+
+SUMMARY_COLUMNS = ('quiz_count', 'session_count', 'students_reached',
+                   'answers_collected', 'correct_answers')
+
+# Optional parts of get_session_snapshot(); the session row is always included
+SNAPSHOT_SECTIONS = ('results', 'stats', 'students')
+SNAPSHOT_SESSION_COLUMNS = ('session_id', 'quiz_id', 'class_code', 'status', 'started_at',
+                            'closed_at', 'auto_close_minutes', 'results_version',
+                            'current_question_id')
+
+# Errors from join_session_by_code(); the API maps them to 404 and 409
+SESSION_NOT_FOUND = "Session not found"
+SESSION_NOT_ACTIVE = "Session is not active"
+# Answers to any question but the session's current one are refused with this
+QUESTION_NOT_OPEN = "Question is not open"
+NO_MORE_QUESTIONS = "No more questions"
+# Session and question columns of the join read; the rest belong to the quiz or answers
+JOIN_SESSION_COLUMNS = ('session_id', 'class_code', 'status', 'started_at', 'auto_close_minutes',
+                        'current_question_id')
+JOIN_QUESTION_COLUMNS = ('question_id', 'question_text')
+JOIN_ANSWER_COLUMNS = ('answer_id', 'answer_text', 'answer_order', 'is_correct')
+
+def hash_password(password):
+    """Hash password using SHA256"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def grade_submission(correct_answer_ids, existing_rows, answer_id):
+    """Grade one more answer from a student against a question's correct set
+
+    Args:
+        correct_answer_ids: Set of answer ids marked correct for the question
+        existing_rows: Rows with `answer_id` and `is_correct` the student already submitted
+        answer_id: The answer being submitted now
+
+    Returns:
+        (is_correct, allow_multiple, correct_delta) where correct_delta is the
+        change in the number of correct student_answers rows once stored
+    """
+    # Check if multiple correct answers exist
+    allow_multiple = len(correct_answer_ids) >= 2
+
+    previously_correct = sum(1 for row in existing_rows if row['is_correct'])
+    existing_answers = set(row['answer_id'] for row in existing_rows)
+    existing_answers.add(answer_id)  # Add the new answer
+
+    if allow_multiple:
+        # For multiple: correct only if ALL correct answers selected and NO wrong answers
+        is_correct = (existing_answers == correct_answer_ids)
+        # Every row of the answer set carries the same correctness
+        correct_delta = (len(existing_rows) + 1 if is_correct else 0) - previously_correct
+    else:
+        # For single: correct if this answer is in correct set
+        is_correct = (answer_id in correct_answer_ids)
+        correct_delta = 1 if is_correct else 0
+    return is_correct, allow_multiple, correct_delta
+
+def build_question_set(quiz_id, rows):
+    """Group question/answer rows, ordered by question then answer, into the
+    quiz's questions each carrying its `answers`
+
+    Rows need the JOIN_QUESTION_COLUMNS and JOIN_ANSWER_COLUMNS; answer columns
+    are None for a question without answers.
+    """
+    questions = []
+    for row in rows:
+        if row['question_id'] is None:
+            continue
+        if not questions or questions[-1]['question_id'] != row['question_id']:
+            questions.append({'question_id': row['question_id'], 'quiz_id': quiz_id,
+                              'question_text': row['question_text'], 'answers': []})
+        if row['answer_id'] is not None:
+            questions[-1]['answers'].append(
+                dict({c: row[c] for c in JOIN_ANSWER_COLUMNS}, question_id=row['question_id']))
+
+    for question in questions:
+        # Auto-detect multiple correct answers
+        question['correct_count'] = sum(1 for ans in question['answers'] if ans['is_correct'])
+        question['allow_multiple'] = question['correct_count'] >= 2
+    return questions
+
+def build_quiz_details(quiz, questions):
+    """Assemble the get_quiz_details() payload from the quiz row and its question set
+
+    'question' and 'answers' are the first question, as single-question
+    clients expect; 'questions' is the whole set in order.
+    """
+    first = questions[0] if questions else None
+    correct_count = first['correct_count'] if first else 0
+
+    quiz_dict = dict(quiz)
+    if correct_count >= 2:
+        quiz_dict['allow_multiple'] = True
+
+    quiz_dict['correct_count'] = correct_count
+    quiz_dict['quiz_difficulty'] = quiz_dict.get('quiz_mode', 'easy')
+
+    return {
+        'quiz': quiz_dict,
+        'question': {k: first[k] for k in ('question_id', 'quiz_id', 'question_text')}
+                    if first else None,
+        'answers': first['answers'] if first else [],
+        'questions': questions
+    }
+
+def build_join_payload(student_id, rows):
+    """Assemble the join_session_by_code() payload from its session/quiz/question/answer rows
+
+    Each row is a quiz row widened with the JOIN_* columns, one row per answer,
+    ordered by question then answer.
+    """
+    first = rows[0]
+    extra = JOIN_SESSION_COLUMNS + JOIN_QUESTION_COLUMNS + JOIN_ANSWER_COLUMNS
+    quiz = {k: v for k, v in first.items() if k not in extra}
+    session = {c: first[c] for c in JOIN_SESSION_COLUMNS}
+    session['quiz_id'] = quiz['quiz_id']
+
+    payload = build_quiz_details(quiz, build_question_set(quiz['quiz_id'], rows))
+    payload['student_id'] = student_id
+    payload['session'] = session
+    return payload
+
+def finish_statistics(stats):
+    """Derive rates from the raw get_session_statistics() counts"""
+    stats = dict(stats)
+    stats['has_correct'] = bool(stats['has_correct'])
+    participants = stats['participant_count']
+    responded = stats['responded_count']
+    stats['response_rate'] = round(
+        responded / participants * 100, 1) if participants > 0 else 0.0
+    if stats['has_correct']:
+        stats['accuracy'] = round(
+            stats['correct_count'] / responded * 100, 1) if responded > 0 else 0.0
+    else:
+        stats['accuracy'] = None
+    elapsed = stats['elapsed_seconds']
+    stats['elapsed_seconds'] = max(0, int(elapsed)) if elapsed is not None else 0
+    return stats
+
+def finish_summary(summary, recent_quizzes):
+    """Add the derived accuracy and recent quizzes to teacher_summary counters"""
+    summary = dict(summary)
+    answers = summary['answers_collected']
+    summary['average_accuracy'] = round(
+        summary['correct_answers'] / answers * 100, 1) if answers > 0 else 0.0
+    summary['recent_quizzes'] = recent_quizzes
+    return summary
+
+
+class Storage(ABC):
+    """Data-access operations the backend and Streamlit apps rely on"""
+
+    name = "abstract"
+
+    def connect(self):
+        """Raw DB-API connection for SQL backends; None when there is none"""
+        return None
+
+    def ping(self):
+        """True when the backend can serve requests"""
+        conn = self.connect()
+        if not conn:
+            return False
+        conn.close()
+        return True
+
+    @abstractmethod
+    def ensure_schema(self):
+        """Create missing tables/columns; returns True on success"""
+
+    # Teachers
+    @abstractmethod
+    def create_teacher(self, username, email, password):
+        """Returns (teacher_id, error)"""
+
+    @abstractmethod
+    def authenticate_teacher(self, email, password):
+        """Returns the teacher row or None"""
+
+    @abstractmethod
+    def get_teacher_quizzes(self, teacher_id):
+        """Returns quiz rows with session_count, newest first"""
+
+    @abstractmethod
+    def get_teacher_summary(self, teacher_id, recent_limit=5):
+        """Returns dashboard counters plus recent_quizzes, or None"""
+
+    # Quizzes
+    @abstractmethod
+    def create_quiz(self, teacher_id, title, num_choices, allow_multiple, has_correct,
+                    competition_mode, start_with_slide, minimize_window, close_after,
+                    quiz_mode='easy'):
+        """Returns (quiz_id, error)"""
+
+    @abstractmethod
+    def add_question(self, quiz_id, question_text):
+        """Returns (question_id, error)"""
+
+    @abstractmethod
+    def add_answers(self, question_id, answers_list):
+        """Returns (ok, error)"""
+
+    @abstractmethod
+    def get_quiz_details(self, quiz_id):
+        """Returns {'quiz', 'question', 'answers', 'questions'} or None"""
+
+    # Sessions
+    @abstractmethod
+    def create_quiz_session(self, quiz_id, class_code, auto_close_minutes=None):
+        """Returns (session_id, error)"""
+
+    @abstractmethod
+    def get_session_by_code(self, class_code):
+        """Returns the session row joined with its quiz title, or None"""
+
+    @abstractmethod
+    def get_session_info(self, session_id):
+        """Returns the session row or None"""
+
+    @abstractmethod
+    def get_session_version(self, session_id):
+        """Returns the session's results_version or None"""
+
+    @abstractmethod
+    def get_quiz_sessions(self, quiz_id):
+        """Returns the quiz's sessions, newest first"""
+
+    @abstractmethod
+    def get_auto_close_sessions(self, session_id=None):
+        """Returns active sessions that close on a timer: session_id, started_at
+        and auto_close_minutes (the session's, else the quiz's close_submission_after)"""
+
+    @abstractmethod
+    def count_active_sessions(self):
+        """Returns the number of active sessions or None"""
+
+    @abstractmethod
+    def advance_question(self, session_id, question_id=None):
+        """Open the next question of an active session, or `question_id` when given
+
+        Returns (current_question_id, error); error is SESSION_NOT_FOUND,
+        SESSION_NOT_ACTIVE or NO_MORE_QUESTIONS.
+        """
+
+    @abstractmethod
+    def close_session(self, session_id):
+        """Returns True when the session was closed"""
+
+    # Students and answers
+    @abstractmethod
+    def add_student_to_session(self, session_id, student_name):
+        """Returns (student_id, error)"""
+
+    @abstractmethod
+    def add_students(self, joins):
+        """Register many students in one transaction
+
+        Args:
+            joins: List of (session_id, student_name)
+
+        Returns:
+            One (student_id, error) per join, in order; SESSION_NOT_FOUND for
+            unknown sessions
+        """
+
+    def join_session_by_code(self, class_code, student_name):
+        """Resolve a class code, register the student and read the quiz in one transaction
+
+        Returns ({'student_id', 'session', 'quiz', 'question', 'answers', 'questions'},
+        error); error is SESSION_NOT_FOUND or SESSION_NOT_ACTIVE when the code
+        can't be joined.
+        """
+        return self.join_sessions_by_code([(class_code, student_name)])[0]
+
+    @abstractmethod
+    def join_sessions_by_code(self, joins):
+        """join_session_by_code() for a list of (class_code, student_name) in one
+        transaction; returns one (payload, error) per join, in order"""
+
+    @abstractmethod
+    def submit_answer(self, student_id, session_id, question_id, answer_id, time_taken):
+        """Returns (ok, error); SESSION_NOT_ACTIVE once the session is closed,
+        QUESTION_NOT_OPEN unless question_id is the current question"""
+
+    @abstractmethod
+    def get_student_responses(self, session_id):
+        """Returns {'students', 'total_students', 'total_responses'} for the current
+        question, or None"""
+
+    @abstractmethod
+    def get_session_answers(self, session_id):
+        """Returns every student of a session with each answer they stored, as rows
+        of student_id, student_name, question_id, answer_id and time_taken_seconds
+        (NULL answer columns for students who answered nothing), or None"""
+
+    @abstractmethod
+    def get_session_results(self, session_id, question_id=None):
+        """Returns {'results', 'participant_count'} for one question (default: the
+        current one) or None"""
+
+    @abstractmethod
+    def get_sessions_results(self, session_ids, known_versions=None):
+        """Returns {session_id: {'status', 'results_version', 'current_question_id',
+        'results', 'participant_count'}} for the current question of each session, read from one
+        snapshot, or None. Unknown sessions are left out; 'results' is None for
+        sessions whose version equals known_versions[session_id]."""
+
+    @abstractmethod
+    def get_session_statistics(self, session_id):
+        """Returns counts and rates for the session's current question or None"""
+
+    @abstractmethod
+    def get_session_snapshot(self, session_id, sections=SNAPSHOT_SECTIONS):
+        """Returns {'session', ...sections} read from one consistent snapshot, or None
+
+        'results', 'stats' and 'students' hold what get_session_results(),
+        get_session_statistics() and get_student_responses() return.
+        """
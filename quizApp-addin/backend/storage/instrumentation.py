@@ -0,0 +1,147 @@
+"""
+Per-statement and per-helper timing shared by every storage backend
+
+SQL backends report each statement through record_statement(); the
+database.py facade wraps every public helper in `instrumented` so statements
+are attributed to the helper that ran them.
+"""
+
+from contextvars import ContextVar
+from threading import Lock
+import functools
+import hashlib
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger("classpoint.database")
+
+# Statements slower than this are logged (with parameter values redacted)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+# Distinct statements tracked; any beyond are counted together as OTHER_STATEMENT
+STATEMENT_STATS_MAX = int(os.getenv("STATEMENT_STATS_MAX", 500))
+OTHER_STATEMENT = "(other statements)"
+_NORMALIZED_CACHE_MAX = 1024
+
+# A parenthesized list of placeholders, e.g. IN (%s, %s, %s) or one VALUES row
+_PLACEHOLDER_LIST = re.compile(r"\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)")
+# Several such lists in a row: the rows of a multi-row VALUES
+_PLACEHOLDER_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+_current_function = ContextVar("db_function", default=None)
+# Per-request totals; a dict is bound by begin_request_stats() for each request
+_request_stats = ContextVar("db_request_stats", default=None)
+
+_stats_lock = Lock()
+_statement_stats = {}    # (function, statement) -> [calls, seconds, max_seconds, rows]
+_function_stats = {}     # function -> [calls, seconds, max_seconds]
+_connect_stats = [0, 0.0, 0.0]    # [connects, seconds, max_seconds]
+_slow_query_count = [0]
+_normalized_sql = {}    # query text -> normalized, cleared when it grows past the cap
+
+def _normalize(query):
+    """Collapse whitespace and placeholder lists so one statement always maps
+    to one key, whatever the width of its IN list or VALUES rows"""
+    key = _normalized_sql.get(query)
+    if key is None:
+        text = query.decode() if isinstance(query, bytes) else str(query)
+        key = _PLACEHOLDER_LIST.sub("(...)", " ".join(text.split()))
+        key = _PLACEHOLDER_ROWS.sub("(...)", key)
+        if len(_normalized_sql) >= _NORMALIZED_CACHE_MAX:
+            _normalized_sql.clear()
+        _normalized_sql[query] = key
+    return key
+
+def statement_id(statement):
+    """Short stable id of a normalized statement, for metric labels"""
+    return hashlib.sha1(statement.encode()).hexdigest()[:12]
+
+def _redact(params):
+    """Describe parameters by type only so values never reach the logs"""
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {k: type(v).__name__ for k, v in params.items()}
+    return [type(v).__name__ for v in params]
+
+def record_statement(query, params, elapsed, rows):
+    function = _current_function.get() or "direct"
+    statement = _normalize(query)
+    with _stats_lock:
+        key = (function, statement)
+        if key not in _statement_stats and len(_statement_stats) >= STATEMENT_STATS_MAX:
+            key = (function, OTHER_STATEMENT)
+        entry = _statement_stats.setdefault(key, [0, 0.0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+        entry[3] += max(rows, 0)
+
+    request = _request_stats.get()
+    if request is not None:
+        request['round_trips'] += 1
+        request['db_seconds'] += elapsed
+        request['rows'] += max(rows, 0)
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        _slow_query_count[0] += 1
+        logger.warning("Slow query", extra={
+            "event": "slow_query", "function": function, "statement": statement,
+            "params": _redact(params), "duration_ms": round(elapsed * 1000, 2),
+            "rows": rows})
+
+def record_connect(elapsed):
+    with _stats_lock:
+        _connect_stats[0] += 1
+        _connect_stats[1] += elapsed
+        _connect_stats[2] = max(_connect_stats[2], elapsed)
+    request = _request_stats.get()
+    if request is not None:
+        request['connect_seconds'] += elapsed
+
+def instrumented(func):
+    """Attribute the statements run by a helper to it and time the whole call"""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current_function.set(name)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_function.reset(token)
+            with _stats_lock:
+                entry = _function_stats.setdefault(name, [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] = max(entry[2], elapsed)
+    return wrapper
+
+def begin_request_stats():
+    """Start counting round trips for the current request; returns the counter dict"""
+    stats = {'round_trips': 0, 'db_seconds': 0.0, 'rows': 0, 'connect_seconds': 0.0}
+    _request_stats.set(stats)
+    return stats
+
+def get_query_stats():
+    """Snapshot of per-function, per-statement and connection timing aggregates"""
+    with _stats_lock:
+        return {
+            'statements': [
+                {'function': function, 'statement': statement,
+                 'statement_id': statement_id(statement), 'calls': e[0],
+                 'seconds': e[1], 'max_seconds': e[2], 'rows': e[3]}
+                for (function, statement), e in _statement_stats.items()
+            ],
+            'functions': [
+                {'function': function, 'calls': e[0], 'seconds': e[1], 'max_seconds': e[2]}
+                for function, e in _function_stats.items()
+            ],
+            'connections': {'count': _connect_stats[0], 'seconds': _connect_stats[1],
+                            'max_seconds': _connect_stats[2]},
+            'slow_queries': _slow_query_count[0],
+            'slow_query_ms': SLOW_QUERY_MS,
+        }
@@ -0,0 +1,528 @@
+"""
+Pure in-memory backend for tests and throwaway demos
+
+Tables are dicts of row dicts guarded by one lock. Nothing is persisted and
+nothing is shared between processes, so the Streamlit apps only see this
+data when they run in the same process as the code writing it.
+"""
+
+from datetime import datetime, timezone
+from threading import RLock
+
+from .base import (
+    Storage,
+    SUMMARY_COLUMNS,
+    SNAPSHOT_SECTIONS,
+    SNAPSHOT_SESSION_COLUMNS,
+    SESSION_NOT_FOUND,
+    SESSION_NOT_ACTIVE,
+    QUESTION_NOT_OPEN,
+    NO_MORE_QUESTIONS,
+    JOIN_SESSION_COLUMNS,
+    hash_password,
+    grade_submission,
+    build_question_set,
+    build_quiz_details,
+    finish_statistics,
+    finish_summary,
+)
+
+PRIMARY_KEYS = {
+    'teachers': 'teacher_id',
+    'quizzes': 'quiz_id',
+    'questions': 'question_id',
+    'answers': 'answer_id',
+    'quiz_sessions': 'session_id',
+    'students': 'student_id',
+    'student_answers': 'id',
+}
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class MemoryStorage(Storage):
+    """Storage kept in Python dicts; every read returns copies"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = RLock()
+        self._tables = {table: {} for table in PRIMARY_KEYS}
+        self._next_id = {table: 1 for table in PRIMARY_KEYS}
+        self._summary = {}
+
+    def _insert(self, table, row):
+        key = PRIMARY_KEYS[table]
+        row[key] = self._next_id[table]
+        self._next_id[table] += 1
+        self._tables[table][row[key]] = row
+        return row[key]
+
+    def _require(self, table, row_id):
+        if row_id not in self._tables[table]:
+            raise LookupError(f"{PRIMARY_KEYS[table]} {row_id} does not exist in {table}")
+        return self._tables[table][row_id]
+
+    def _rows(self, table, **where):
+        return [row for row in self._tables[table].values()
+                if all(row[k] == v for k, v in where.items())]
+
+    def _bump_teacher_summary(self, teacher_id, **deltas):
+        summary = self._summary.setdefault(teacher_id, {c: 0 for c in SUMMARY_COLUMNS})
+        for column, delta in deltas.items():
+            summary[column] += delta
+
+    def _teacher_of_session(self, session_id):
+        session = self._tables['quiz_sessions'][session_id]
+        return self._tables['quizzes'][session['quiz_id']]['teacher_id']
+
+    def _question_ids(self, quiz_id):
+        return sorted(q['question_id'] for q in self._rows('questions', quiz_id=quiz_id))
+
+    def _current_question(self, session_id):
+        session = self._tables['quiz_sessions'].get(session_id)
+        return session['current_question_id'] if session else None
+
+    def _quiz_rows(self, teacher_id):
+        quizzes = sorted(self._rows('quizzes', teacher_id=teacher_id),
+                         key=lambda q: (q['created_at'], q['quiz_id']), reverse=True)
+        return [{
+            'quiz_id': q['quiz_id'],
+            'title': q['title'],
+            'num_choices': q['num_choices'],
+            'created_at': q['created_at'],
+            'quiz_mode': q['quiz_mode'],
+            'session_count': len(self._rows('quiz_sessions', quiz_id=q['quiz_id'])),
+        } for q in quizzes]
+
+    def ping(self):
+        return True
+
+    def ensure_schema(self):
+        return True
+
+    # Teachers
+    def create_teacher(self, username, email, password):
+        with self._lock:
+            for teacher in self._tables['teachers'].values():
+                if teacher['username'] == username or teacher['email'] == email:
+                    return None, "Email or username already exists"
+            teacher_id = self._insert('teachers', {
+                'username': username,
+                'email': email,
+                'password': hash_password(password),
+                'created_at': _utcnow(),
+            })
+            self._bump_teacher_summary(teacher_id)
+            return teacher_id, None
+
+    def authenticate_teacher(self, email, password):
+        hashed_pw = hash_password(password)
+        with self._lock:
+            for teacher in self._tables['teachers'].values():
+                if teacher['email'] == email and teacher['password'] == hashed_pw:
+                    return {'teacher_id': teacher['teacher_id'],
+                            'username': teacher['username'],
+                            'email': teacher['email']}
+        return None
+
+    def get_teacher_quizzes(self, teacher_id):
+        with self._lock:
+            return self._quiz_rows(teacher_id)
+
+    def get_teacher_summary(self, teacher_id, recent_limit=5):
+        with self._lock:
+            summary = dict(self._summary.get(teacher_id) or {c: 0 for c in SUMMARY_COLUMNS})
+            return finish_summary(summary, self._quiz_rows(teacher_id)[:recent_limit])
+
+    # Quizzes
+    def create_quiz(self, teacher_id, title, num_choices, allow_multiple, has_correct,
+                    competition_mode, start_with_slide, minimize_window, close_after,
+                    quiz_mode='easy'):
+        with self._lock:
+            try:
+                self._require('teachers', teacher_id)
+            except LookupError as e:
+                return None, str(e)
+            quiz_id = self._insert('quizzes', {
+                'teacher_id': teacher_id,
+                'title': title,
+                'num_choices': num_choices,
+                'allow_multiple': allow_multiple,
+                'has_correct': has_correct,
+                'competition_mode': competition_mode,
+                'start_with_slide': start_with_slide,
+                'minimize_result_window': minimize_window,
+                'close_submission_after': close_after,
+                'created_at': _utcnow(),
+                'quiz_mode': quiz_mode,
+            })
+            self._bump_teacher_summary(teacher_id, quiz_count=1)
+            return quiz_id, None
+
+    def add_question(self, quiz_id, question_text):
+        with self._lock:
+            try:
+                self._require('quizzes', quiz_id)
+            except LookupError as e:
+                return None, str(e)
+            question_id = self._insert('questions', {
+                'quiz_id': quiz_id,
+                'question_text': question_text,
+            })
+            return question_id, None
+
+    def add_answers(self, question_id, answers_list):
+        with self._lock:
+            try:
+                self._require('questions', question_id)
+            except LookupError as e:
+                return False, str(e)
+            # All or nothing, like the SQL transaction
+            orders = [a['answer_order'] for a in self._rows('answers', question_id=question_id)]
+            for ans in answers_list:
+                if ans['order'] in orders:
+                    return False, f"Duplicate answer_order {ans['order']} for question {question_id}"
+                orders.append(ans['order'])
+            for ans in answers_list:
+                self._insert('answers', {
+                    'question_id': question_id,
+                    'answer_text': ans['text'],
+                    'answer_order': ans['order'],
+                    'is_correct': bool(ans['is_correct']),
+                })
+            return True, None
+
+    def get_quiz_details(self, quiz_id):
+        with self._lock:
+            quiz = self._tables['quizzes'].get(quiz_id)
+            if not quiz:
+                return None
+            # Shaped like the SQL question-set rows: one per answer
+            rows = []
+            for question_id in self._question_ids(quiz_id):
+                question = self._tables['questions'][question_id]
+                answers = sorted(self._rows('answers', question_id=question_id),
+                                 key=lambda a: a['answer_order']) or [None]
+                for answer in answers:
+                    row = dict(answer or {'answer_id': None})
+                    row['question_text'] = question['question_text']
+                    row['question_id'] = question_id
+                    rows.append(row)
+            return build_quiz_details(quiz, build_question_set(quiz_id, rows))
+
+    # Sessions
+    def create_quiz_session(self, quiz_id, class_code, auto_close_minutes=None):
+        with self._lock:
+            try:
+                self._require('quizzes', quiz_id)
+            except LookupError as e:
+                return None, str(e)
+            if self._rows('quiz_sessions', class_code=class_code):
+                return None, "Class code already exists"
+            session_id = self._insert('quiz_sessions', {
+                'quiz_id': quiz_id,
+                'class_code': class_code,
+                'status': 'active',
+                'started_at': _utcnow(),
+                'closed_at': None,
+                'show_responses': True,
+                'total_participants': 0,
+                'auto_close_minutes': auto_close_minutes,
+                'results_version': 0,
+                'current_question_id': min(self._question_ids(quiz_id), default=None),
+            })
+            self._bump_teacher_summary(self._teacher_of_session(session_id), session_count=1)
+            return session_id, None
+
+    def get_session_by_code(self, class_code):
+        with self._lock:
+            sessions = self._rows('quiz_sessions', class_code=class_code)
+            if not sessions:
+                return None
+            session = dict(sessions[0])
+            session['title'] = self._tables['quizzes'][session['quiz_id']]['title']
+            return session
+
+    def get_session_info(self, session_id):
+        with self._lock:
+            session = self._tables['quiz_sessions'].get(session_id)
+            if not session:
+                return None
+            return {k: session[k] for k in ('session_id', 'quiz_id', 'class_code', 'status',
+                                            'started_at', 'auto_close_minutes',
+                                            'current_question_id')}
+
+    def get_session_version(self, session_id):
+        with self._lock:
+            session = self._tables['quiz_sessions'].get(session_id)
+            return session['results_version'] if session else None
+
+    def get_quiz_sessions(self, quiz_id):
+        with self._lock:
+            sessions = sorted(self._rows('quiz_sessions', quiz_id=quiz_id),
+                              key=lambda s: (s['started_at'], s['session_id']), reverse=True)
+            return [{k: s[k] for k in ('session_id', 'class_code', 'started_at',
+                                       'closed_at', 'status')} for s in sessions]
+
+    def get_auto_close_sessions(self, session_id=None):
+        with self._lock:
+            sessions = []
+            for session in self._rows('quiz_sessions', status='active'):
+                if session_id is not None and session['session_id'] != session_id:
+                    continue
+                minutes = session['auto_close_minutes']
+                if minutes is None:
+                    minutes = self._tables['quizzes'][session['quiz_id']]['close_submission_after']
+                if minutes and minutes > 0:
+                    sessions.append({'session_id': session['session_id'],
+                                     'started_at': session['started_at'],
+                                     'auto_close_minutes': minutes})
+            return sorted(sessions, key=lambda s: s['session_id'])
+
+    def count_active_sessions(self):
+        with self._lock:
+            return len(self._rows('quiz_sessions', status='active'))
+
+    def advance_question(self, session_id, question_id=None):
+        with self._lock:
+            session = self._tables['quiz_sessions'].get(session_id)
+            if not session:
+                return None, SESSION_NOT_FOUND
+            if session['status'] != 'active':
+                return None, SESSION_NOT_ACTIVE
+            question_ids = self._question_ids(session['quiz_id'])
+            if question_id is None:
+                current = session['current_question_id']
+                later = [q for q in question_ids if current is not None and q > current]
+                if not later:
+                    return None, NO_MORE_QUESTIONS
+                question_id = later[0]
+            elif question_id not in question_ids:
+                return None, f"Question {question_id} is not part of this quiz"
+            session['current_question_id'] = question_id
+            session['results_version'] += 1
+            return question_id, None
+
+    def close_session(self, session_id):
+        with self._lock:
+            session = self._tables['quiz_sessions'].get(session_id)
+            if session:
+                session['status'] = 'closed'
+                session['closed_at'] = _utcnow()
+                session['results_version'] += 1
+            return True
+
+    # Students and answers
+    def add_student_to_session(self, session_id, student_name):
+        with self._lock:
+            try:
+                session = self._require('quiz_sessions', session_id)
+            except LookupError as e:
+                return None, str(e)
+            student_id = self._insert('students', {
+                'session_id': session_id,
+                'name': student_name,
+                'joined_at': _utcnow(),
+            })
+            session['total_participants'] = len(self._rows('students', session_id=session_id))
+            self._bump_teacher_summary(self._teacher_of_session(session_id), students_reached=1)
+            session['results_version'] += 1
+            return student_id, None
+
+    def add_students(self, joins):
+        with self._lock:
+            outcomes = []
+            for session_id, student_name in joins:
+                if session_id not in self._tables['quiz_sessions']:
+                    outcomes.append((None, SESSION_NOT_FOUND))
+                else:
+                    outcomes.append(self.add_student_to_session(session_id, student_name))
+            return outcomes
+
+    def join_sessions_by_code(self, joins):
+        with self._lock:
+            return [self.join_session_by_code(class_code, student_name)
+                    for class_code, student_name in joins]
+
+    def join_session_by_code(self, class_code, student_name):
+        with self._lock:
+            sessions = self._rows('quiz_sessions', class_code=class_code)
+            if not sessions:
+                return None, SESSION_NOT_FOUND
+            session = sessions[0]
+            if session['status'] != 'active':
+                return None, SESSION_NOT_ACTIVE
+            student_id, error = self.add_student_to_session(session['session_id'], student_name)
+            if error:
+                return None, error
+            joined = self.get_quiz_details(session['quiz_id'])
+            joined['student_id'] = student_id
+            joined['session'] = {c: session[c] for c in JOIN_SESSION_COLUMNS}
+            joined['session']['quiz_id'] = session['quiz_id']
+            return joined, None
+
+    def submit_answer(self, student_id, session_id, question_id, answer_id, time_taken):
+        with self._lock:
+            try:
+                self._require('students', student_id)
+                session = self._require('quiz_sessions', session_id)
+                self._require('questions', question_id)
+                self._require('answers', answer_id)
+            except LookupError as e:
+                return False, str(e)
+            if session['status'] != 'active':
+                return False, SESSION_NOT_ACTIVE
+            if session['current_question_id'] != question_id:
+                return False, QUESTION_NOT_OPEN
+
+            correct_answer_ids = set(a['answer_id'] for a in self._rows(
+                'answers', question_id=question_id, is_correct=True))
+            existing_rows = self._rows('student_answers', student_id=student_id,
+                                       question_id=question_id)
+
+            is_correct, allow_multiple, correct_delta = grade_submission(
+                correct_answer_ids, existing_rows, answer_id)
+
+            self._insert('student_answers', {
+                'student_id': student_id,
+                'session_id': session_id,
+                'question_id': question_id,
+                'answer_id': answer_id,
+                'is_correct': is_correct,
+                'submitted_at': _utcnow(),
+                'time_taken_seconds': time_taken,
+                'selected_options': None,
+            })
+            if allow_multiple:
+                for row in existing_rows:
+                    row['is_correct'] = is_correct
+
+            self._bump_teacher_summary(self._teacher_of_session(session_id),
+                                       answers_collected=1, correct_answers=correct_delta)
+            session['results_version'] += 1
+            return True, None
+
+    def get_student_responses(self, session_id):
+        with self._lock:
+            students = sorted(self._rows('students', session_id=session_id),
+                              key=lambda s: s['student_id'])
+            answers = self._tables['answers']
+            current = self._current_question(session_id)
+            formatted_responses = []
+            total_responses = 0
+            for s in students:
+                submitted = sorted(self._rows('student_answers', student_id=s['student_id'],
+                                              question_id=current),
+                                   key=lambda sa: sa['id'])
+                total_responses += len(submitted)
+                for sa in submitted or [None]:
+                    answer = answers.get(sa['answer_id']) if sa else None
+                    formatted_responses.append({
+                        'student_id': s['student_id'],
+                        'student_name': s['name'],
+                        'answer_text': answer['answer_text'] if answer else 'Not submitted',
+                        'is_correct': answer['is_correct'] if answer else False,
+                        'submitted_at': ''
+                    })
+            return {
+                'students': formatted_responses,
+                'total_students': len(students),
+                'total_responses': total_responses
+            }
+
+    def get_session_answers(self, session_id):
+        with self._lock:
+            rows = []
+            for s in sorted(self._rows('students', session_id=session_id),
+                            key=lambda s: s['student_id']):
+                submitted = sorted(self._rows('student_answers', student_id=s['student_id']),
+                                   key=lambda sa: sa['id'])
+                for sa in submitted or [None]:
+                    rows.append({
+                        'student_id': s['student_id'],
+                        'student_name': s['name'],
+                        'question_id': sa['question_id'] if sa else None,
+                        'answer_id': sa['answer_id'] if sa else None,
+                        'time_taken_seconds': sa['time_taken_seconds'] if sa else None,
+                    })
+            return rows
+
+    def get_session_results(self, session_id, question_id=None):
+        with self._lock:
+            session = self._tables['quiz_sessions'].get(session_id)
+            results = []
+            if session:
+                if question_id is None:
+                    question_id = session['current_question_id']
+                submitted = self._rows('student_answers', session_id=session_id)
+                question = self._tables['questions'].get(question_id)
+                if question and question['quiz_id'] == session['quiz_id']:
+                    for a in self._rows('answers', question_id=question_id):
+                        results.append({
+                            'answer_text': a['answer_text'],
+                            'answer_order': a['answer_order'],
+                            'is_correct': a['is_correct'],
+                            'count': len(set(sa['student_id'] for sa in submitted
+                                             if sa['answer_id'] == a['answer_id'])),
+                        })
+                results.sort(key=lambda r: r['answer_order'])
+            return {
+                'results': results,
+                'participant_count': len(self._rows('students', session_id=session_id))
+            }
+
+    def get_sessions_results(self, session_ids, known_versions=None):
+        known_versions = known_versions or {}
+        with self._lock:
+            sessions = {}
+            for session_id in sorted(set(session_ids)):
+                session = self._tables['quiz_sessions'].get(session_id)
+                if not session:
+                    continue
+                sessions[session_id] = dict(self.get_session_results(session_id),
+                                            status=session['status'],
+                                            results_version=session['results_version'],
+                                            current_question_id=session['current_question_id'])
+                if known_versions.get(session_id) == session['results_version']:
+                    sessions[session_id]['results'] = None
+            return sessions
+
+    def get_session_statistics(self, session_id):
+        with self._lock:
+            session = self._tables['quiz_sessions'].get(session_id)
+            if not session:
+                return None
+            all_correct = {}
+            for sa in self._rows('student_answers', session_id=session_id,
+                                 question_id=session['current_question_id']):
+                all_correct[sa['student_id']] = (all_correct.get(sa['student_id'], True)
+                                                 and bool(sa['is_correct']))
+            started_at = session['started_at']
+            return finish_statistics({
+                'session_id': session_id,
+                'status': session['status'],
+                'has_correct': self._tables['quizzes'][session['quiz_id']]['has_correct'],
+                'participant_count': len(self._rows('students', session_id=session_id)),
+                'responded_count': len(all_correct),
+                'correct_count': sum(1 for ok in all_correct.values() if ok),
+                'elapsed_seconds': ((_utcnow() - started_at).total_seconds()
+                                    if started_at else None),
+            })
+
+    def get_session_snapshot(self, session_id, sections=SNAPSHOT_SECTIONS):
+        # The lock is reentrant: every section is read under one acquisition
+        with self._lock:
+            session = self._tables['quiz_sessions'].get(session_id)
+            if not session:
+                return None
+            snapshot = {'session': {k: session[k] for k in SNAPSHOT_SESSION_COLUMNS}}
+            if 'results' in sections:
+                snapshot['results'] = self.get_session_results(session_id)
+            if 'stats' in sections:
+                snapshot['stats'] = self.get_session_statistics(session_id)
+            if 'students' in sections:
+                snapshot['students'] = self.get_student_responses(session_id)
+            return snapshot
@@ -0,0 +1,123 @@
+"""
+PostgreSQL backend (the schema in quiz_app_db plus SCHEMA_UPDATES)
+"""
+
+import logging
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from .instrumentation import record_statement, record_connect
+from .sql import SQLStorage
+
+logger = logging.getLogger("classpoint.database")
+
+# Schema additions on top of quiz_app_db, applied idempotently at backend startup
+SCHEMA_UPDATES = """
+    CREATE TABLE IF NOT EXISTS teacher_summary (
+        teacher_id integer PRIMARY KEY REFERENCES teachers(teacher_id) ON DELETE CASCADE,
+        quiz_count integer NOT NULL DEFAULT 0,
+        session_count integer NOT NULL DEFAULT 0,
+        students_reached integer NOT NULL DEFAULT 0,
+        answers_collected integer NOT NULL DEFAULT 0,
+        correct_answers integer NOT NULL DEFAULT 0,
+        updated_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Bumped on every join/answer/close so readers can reuse cached payloads
+    ALTER TABLE quiz_sessions
+        ADD COLUMN IF NOT EXISTS results_version integer NOT NULL DEFAULT 0;
+
+    -- The question students can answer now; the teacher advances it
+    ALTER TABLE quiz_sessions
+        ADD COLUMN IF NOT EXISTS current_question_id integer
+            REFERENCES questions(question_id) ON DELETE SET NULL;
+"""
+
+# Sessions from before current_question_id start on their quiz's first question
+CURRENT_QUESTION_BACKFILL = """
+    UPDATE quiz_sessions SET current_question_id = (
+        SELECT MIN(question_id) FROM questions WHERE quiz_id = quiz_sessions.quiz_id)
+    WHERE current_question_id IS NULL
+"""
+
+SUMMARY_BACKFILL = """
+    INSERT INTO teacher_summary (teacher_id, quiz_count, session_count,
+                                 students_reached, answers_collected, correct_answers)
+    SELECT t.teacher_id,
+           (SELECT COUNT(*) FROM quizzes q WHERE q.teacher_id = t.teacher_id),
+           (SELECT COUNT(*) FROM quiz_sessions qs
+              JOIN quizzes q ON qs.quiz_id = q.quiz_id
+             WHERE q.teacher_id = t.teacher_id),
+           (SELECT COUNT(*) FROM students s
+              JOIN quiz_sessions qs ON s.session_id = qs.session_id
+              JOIN quizzes q ON qs.quiz_id = q.quiz_id
+             WHERE q.teacher_id = t.teacher_id),
+           (SELECT COUNT(*) FROM student_answers sa
+              JOIN quiz_sessions qs ON sa.session_id = qs.session_id
+              JOIN quizzes q ON qs.quiz_id = q.quiz_id
+             WHERE q.teacher_id = t.teacher_id),
+           (SELECT COUNT(*) FROM student_answers sa
+              JOIN quiz_sessions qs ON sa.session_id = qs.session_id
+              JOIN quizzes q ON qs.quiz_id = q.quiz_id
+             WHERE q.teacher_id = t.teacher_id AND sa.is_correct)
+    FROM teachers t
+    WHERE NOT EXISTS (SELECT 1 FROM teacher_summary ts WHERE ts.teacher_id = t.teacher_id)
+"""
+
+
+class TimedCursor(RealDictCursor):
+    """RealDictCursor that records timing and row counts for every statement"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_statement(query, vars, time.perf_counter() - start, self.rowcount)
+
+
+class PostgresStorage(SQLStorage):
+    """One short-lived psycopg2 connection per call"""
+
+    name = "postgres"
+    IntegrityError = psycopg2.IntegrityError
+    NOW_UTC = "NOW() AT TIME ZONE 'UTC'"
+    ELAPSED_SECONDS = "EXTRACT(EPOCH FROM (NOW() AT TIME ZONE 'UTC' - {}))"
+    ALL_TRUE = "bool_and({})"
+
+    def __init__(self, config):
+        self.config = config
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return psycopg2.connect(**self.config, cursor_factory=TimedCursor)
+        except Exception as e:
+            logger.error("Database connection error: %s", e, extra={"event": "db_connect_failed"})
+            return None
+        finally:
+            record_connect(time.perf_counter() - start)
+
+    def ensure_schema(self):
+        """Create tables added after the original dump and backfill their data"""
+        conn = self.connect()
+        if not conn:
+            return False
+
+        try:
+            cur = conn.cursor()
+            cur.execute(SCHEMA_UPDATES)
+            # Only teachers without a summary row are counted, so restarts stay cheap
+            cur.execute(SUMMARY_BACKFILL)
+            cur.execute(CURRENT_QUESTION_BACKFILL)
+            conn.commit()
+            cur.close()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.exception("Error applying schema updates")
+            conn.rollback()
+            conn.close()
+            return False
@@ -0,0 +1,1021 @@
+"""
+SQL implementation shared by the Postgres and SQLite backends
+
+Statements use psycopg2's `%s` placeholders and portable SQL; the few
+dialect differences are class attributes a subclass overrides.
+"""
+
+import logging
+
+from .base import (
+    Storage,
+    SUMMARY_COLUMNS,
+    SNAPSHOT_SECTIONS,
+    SNAPSHOT_SESSION_COLUMNS,
+    SESSION_NOT_FOUND,
+    SESSION_NOT_ACTIVE,
+    QUESTION_NOT_OPEN,
+    NO_MORE_QUESTIONS,
+    JOIN_SESSION_COLUMNS,
+    JOIN_QUESTION_COLUMNS,
+    JOIN_ANSWER_COLUMNS,
+    hash_password,
+    grade_submission,
+    build_question_set,
+    build_quiz_details,
+    build_join_payload,
+    finish_statistics,
+    finish_summary,
+)
+
+logger = logging.getLogger("classpoint.database")
+
+TEACHER_OF_SESSION = """
+    SELECT q.teacher_id FROM quiz_sessions qs
+    JOIN quizzes q ON qs.quiz_id = q.quiz_id
+    WHERE qs.session_id = %s
+"""
+
+# A quiz's questions and their answers, one row per answer
+QUESTION_SET = f"""
+    SELECT {', '.join('qu.' + c for c in JOIN_QUESTION_COLUMNS)},
+           {', '.join('a.' + c for c in JOIN_ANSWER_COLUMNS)}
+    FROM questions qu
+    LEFT JOIN answers a ON a.question_id = qu.question_id
+    WHERE qu.quiz_id = %s
+    ORDER BY qu.question_id, a.answer_order
+"""
+
+# The session's open question, for statements filtering by question
+CURRENT_QUESTION = "(SELECT current_question_id FROM quiz_sessions WHERE session_id = %s)"
+
+
+class SQLStorage(Storage):
+    """Storage over a DB-API connection whose cursors return dict rows"""
+
+    # Exception raised on UNIQUE violations
+    IntegrityError = Exception
+    # Current UTC time as a naive timestamp
+    NOW_UTC = "CURRENT_TIMESTAMP"
+    # Seconds between now (UTC) and a timestamp column
+    ELAPSED_SECONDS = "EXTRACT(EPOCH FROM (NOW() AT TIME ZONE 'UTC' - {}))"
+    # Aggregate that is true only when every value is true
+    ALL_TRUE = "bool_and({})"
+    # Starts a read-only transaction whose statements all see one snapshot
+    BEGIN_SNAPSHOT = "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"
+
+    def connect(self):
+        raise NotImplementedError
+
+    def _bump_teacher_summary(self, cur, teacher_sql, params, **deltas):
+        """Apply counter deltas to a teacher's summary row in the caller's transaction
+
+        Args:
+            cur: Open cursor of the transaction doing the write
+            teacher_sql: Query selecting the owning teacher as a `teacher_id` column
+            params: Parameters for teacher_sql
+            deltas: Amount to add per SUMMARY_COLUMNS entry
+        """
+        columns = [c for c in SUMMARY_COLUMNS if deltas.get(c)]
+        if not columns:
+            return
+
+        # `WHERE true` keeps SQLite from parsing ON CONFLICT as a join constraint
+        cur.execute(f"""
+            INSERT INTO teacher_summary (teacher_id, {', '.join(columns)})
+            SELECT t.teacher_id, {', '.join(['%s'] * len(columns))}
+            FROM ({teacher_sql}) t
+            WHERE true
+            ON CONFLICT (teacher_id) DO UPDATE SET
+                {', '.join(f'{c} = teacher_summary.{c} + EXCLUDED.{c}' for c in columns)},
+                updated_at = CURRENT_TIMESTAMP
+        """, [deltas[c] for c in columns] + list(params))
+
+    def _bump_session_version(self, cur, session_id):
+        """Mark a session's results as changed in the caller's transaction"""
+        cur.execute("""
+            UPDATE quiz_sessions SET results_version = results_version + 1
+            WHERE session_id = %s
+        """, (session_id,))
+
+    # Teacher functions
+    def create_teacher(self, username, email, password):
+        conn = self.connect()
+        if not conn:
+            return None, "Database connection failed"
+
+        try:
+            cur = conn.cursor()
+            hashed_pw = hash_password(password)
+            cur.execute("""
+                INSERT INTO teachers (username, email, password)
+                VALUES (%s, %s, %s)
+                RETURNING teacher_id
+            """, (username, email, hashed_pw))
+            teacher_id = cur.fetchone()['teacher_id']
+            cur.execute("""
+                INSERT INTO teacher_summary (teacher_id) VALUES (%s)
+            """, (teacher_id,))
+            conn.commit()
+            cur.close()
+            conn.close()
+            return teacher_id, None
+        except self.IntegrityError:
+            conn.rollback()
+            conn.close()
+            return None, "Email or username already exists"
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return None, str(e)
+
+    def authenticate_teacher(self, email, password):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            hashed_pw = hash_password(password)
+            cur.execute("""
+                SELECT teacher_id, username, email
+                FROM teachers
+                WHERE email = %s AND password = %s
+            """, (email, hashed_pw))
+            teacher = cur.fetchone()
+            cur.close()
+            conn.close()
+            return teacher
+        except Exception as e:
+            logger.exception("Authentication error")
+            conn.close()
+            return None
+
+    def get_teacher_quizzes(self, teacher_id):
+        conn = self.connect()
+        if not conn:
+            return []
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT q.quiz_id, q.title, q.num_choices, q.created_at, q.quiz_mode,
+                       COUNT(DISTINCT qs.session_id) as session_count
+                FROM quizzes q
+                LEFT JOIN quiz_sessions qs ON q.quiz_id = qs.quiz_id
+                WHERE q.teacher_id = %s
+                GROUP BY q.quiz_id
+                ORDER BY q.created_at DESC, q.quiz_id DESC
+            """, (teacher_id,))
+            quizzes = cur.fetchall()
+            cur.close()
+            conn.close()
+            return quizzes
+        except Exception as e:
+            logger.exception("Error fetching quizzes")
+            conn.close()
+            return []
+
+    def get_teacher_summary(self, teacher_id, recent_limit=5):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT quiz_count, session_count, students_reached,
+                       answers_collected, correct_answers
+                FROM teacher_summary
+                WHERE teacher_id = %s
+            """, (teacher_id,))
+            row = cur.fetchone()
+            summary = dict(row) if row else {c: 0 for c in SUMMARY_COLUMNS}
+
+            # Only the newest quizzes are counted, so this stays cheap as history grows
+            cur.execute("""
+                SELECT q.quiz_id, q.title, q.num_choices, q.created_at, q.quiz_mode,
+                       (SELECT COUNT(*) FROM quiz_sessions qs
+                         WHERE qs.quiz_id = q.quiz_id) as session_count
+                FROM quizzes q
+                WHERE q.teacher_id = %s
+                ORDER BY q.created_at DESC, q.quiz_id DESC
+                LIMIT %s
+            """, (teacher_id, recent_limit))
+            recent_quizzes = cur.fetchall()
+            cur.close()
+            conn.close()
+
+            return finish_summary(summary, recent_quizzes)
+        except Exception as e:
+            logger.exception("Error fetching teacher summary")
+            conn.close()
+            return None
+
+    def create_quiz(self, teacher_id, title, num_choices, allow_multiple, has_correct,
+                    competition_mode, start_with_slide, minimize_window, close_after,
+                    quiz_mode='easy'):
+        conn = self.connect()
+        if not conn:
+            return None, "Database connection failed"
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO quizzes (
+                    teacher_id, title, num_choices, allow_multiple, has_correct,
+                    competition_mode, start_with_slide, minimize_result_window,
+                    close_submission_after, quiz_mode
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING quiz_id
+            """, (teacher_id, title, num_choices, allow_multiple, has_correct,
+                  competition_mode, start_with_slide, minimize_window, close_after,
+                  quiz_mode))
+            quiz_id = cur.fetchone()['quiz_id']
+            self._bump_teacher_summary(cur, "SELECT %s AS teacher_id", (teacher_id,),
+                                       quiz_count=1)
+            conn.commit()
+            cur.close()
+            conn.close()
+            return quiz_id, None
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return None, str(e)
+
+    def add_question(self, quiz_id, question_text):
+        conn = self.connect()
+        if not conn:
+            return None, "Database connection failed"
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO questions (quiz_id, question_text)
+                VALUES (%s, %s)
+                RETURNING question_id
+            """, (quiz_id, question_text))
+            question_id = cur.fetchone()['question_id']
+            conn.commit()
+            cur.close()
+            conn.close()
+            return question_id, None
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return None, str(e)
+
+    def add_answers(self, question_id, answers_list):
+        conn = self.connect()
+        if not conn:
+            return False, "Database connection failed"
+
+        try:
+            cur = conn.cursor()
+            for ans in answers_list:
+                cur.execute("""
+                    INSERT INTO answers (question_id, answer_text, answer_order, is_correct)
+                    VALUES (%s, %s, %s, %s)
+                """, (question_id, ans['text'], ans['order'], ans['is_correct']))
+            conn.commit()
+            cur.close()
+            conn.close()
+            return True, None
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return False, str(e)
+
+    def get_quiz_details(self, quiz_id):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+
+            cur.execute("SELECT * FROM quizzes WHERE quiz_id = %s", (quiz_id,))
+            quiz = cur.fetchone()
+
+            if not quiz:
+                conn.close()
+                return None
+
+            cur.execute(QUESTION_SET, (quiz_id,))
+            questions = build_question_set(quiz_id, cur.fetchall())
+
+            cur.close()
+            conn.close()
+
+            return build_quiz_details(quiz, questions)
+        except Exception as e:
+            logger.exception("Error fetching quiz details")
+            conn.close()
+            return None
+
+    def create_quiz_session(self, quiz_id, class_code, auto_close_minutes=None):
+        conn = self.connect()
+        if not conn:
+            return None, "Database connection failed"
+        try:
+            cur = conn.cursor()
+            cur.execute(f"""
+                INSERT INTO quiz_sessions (quiz_id, class_code, status, auto_close_minutes,
+                                           started_at, current_question_id)
+                VALUES (%s, %s, 'active', %s, {self.NOW_UTC},
+                        (SELECT MIN(question_id) FROM questions WHERE quiz_id = %s))
+                RETURNING session_id
+            """, (quiz_id, class_code, auto_close_minutes, quiz_id))
+            session_id = cur.fetchone()['session_id']
+            self._bump_teacher_summary(cur, TEACHER_OF_SESSION, (session_id,),
+                                       session_count=1)
+            conn.commit()
+            cur.close()
+            conn.close()
+            return session_id, None
+        except self.IntegrityError:
+            conn.rollback()
+            conn.close()
+            return None, "Class code already exists"
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return None, str(e)
+
+    def get_session_by_code(self, class_code):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT qs.*, q.quiz_id, q.title
+                FROM quiz_sessions qs
+                JOIN quizzes q ON qs.quiz_id = q.quiz_id
+                WHERE qs.class_code = %s
+            """, (class_code,))
+            session = cur.fetchone()
+            cur.close()
+            conn.close()
+            return session
+        except Exception as e:
+            logger.exception("Error fetching session")
+            conn.close()
+            return None
+
+    def get_session_info(self, session_id):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT session_id, quiz_id, class_code, status,
+                       started_at, auto_close_minutes, current_question_id
+                FROM quiz_sessions
+                WHERE session_id = %s
+            """, (session_id,))
+            session = cur.fetchone()
+            cur.close()
+            conn.close()
+            return session
+        except Exception as e:
+            logger.exception("Error fetching session info")
+            conn.close()
+            return None
+
+    def get_session_version(self, session_id):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT results_version FROM quiz_sessions WHERE session_id = %s
+            """, (session_id,))
+            row = cur.fetchone()
+            cur.close()
+            conn.close()
+            return row['results_version'] if row else None
+        except Exception as e:
+            logger.exception("Error fetching session version")
+            conn.close()
+            return None
+
+    def get_quiz_sessions(self, quiz_id):
+        conn = self.connect()
+        if not conn:
+            return []
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT session_id, class_code, started_at, closed_at, status
+                FROM quiz_sessions
+                WHERE quiz_id = %s
+                ORDER BY started_at DESC, session_id DESC
+            """, (quiz_id,))
+            sessions = cur.fetchall()
+            cur.close()
+            conn.close()
+            return sessions
+        except Exception as e:
+            logger.exception("Error fetching quiz sessions")
+            conn.close()
+            return []
+
+    def add_student_to_session(self, session_id, student_name):
+        conn = self.connect()
+        if not conn:
+            return None, "Database connection failed"
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO students (session_id, name)
+                VALUES (%s, %s)
+                RETURNING student_id
+            """, (session_id, student_name))
+            student_id = cur.fetchone()['student_id']
+            self._bump_teacher_summary(cur, TEACHER_OF_SESSION, (session_id,),
+                                       students_reached=1)
+            self._bump_session_version(cur, session_id)
+            conn.commit()
+            cur.close()
+            conn.close()
+            return student_id, None
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return None, str(e)
+
+    def _insert_students(self, cur, joins):
+        """Insert (session_id, name) pairs with one statement; returns their ids in order"""
+        if not joins:
+            return []
+        cur.execute(f"""
+            INSERT INTO students (session_id, name)
+            VALUES {', '.join(['(%s, %s)'] * len(joins))}
+            RETURNING student_id
+        """, [value for join in joins for value in join])
+        # Ids are drawn in VALUES order, whatever order RETURNING reports them in
+        return sorted(row['student_id'] for row in cur.fetchall())
+
+    def _count_joins(self, cur, joined_sessions):
+        """Teacher-summary bumps for the students a batch added, one per session"""
+        counts = {}
+        for session_id in joined_sessions:
+            counts[session_id] = counts.get(session_id, 0) + 1
+        for session_id, count in counts.items():
+            self._bump_teacher_summary(cur, TEACHER_OF_SESSION, (session_id,),
+                                       students_reached=count)
+
+    def add_students(self, joins):
+        conn = self.connect()
+        if not conn:
+            return [(None, "Database connection failed")] * len(joins)
+
+        try:
+            cur = conn.cursor()
+            session_ids = sorted({session_id for session_id, _ in joins})
+            # Bumping the versions first also finds which sessions exist
+            cur.execute(f"""
+                UPDATE quiz_sessions SET results_version = results_version + 1
+                WHERE session_id IN ({', '.join(['%s'] * len(session_ids))})
+                RETURNING session_id
+            """, session_ids)
+            existing = {row['session_id'] for row in cur.fetchall()}
+
+            accepted = [join for join in joins if join[0] in existing]
+            student_ids = iter(self._insert_students(cur, accepted))
+            self._count_joins(cur, [session_id for session_id, _ in accepted])
+            conn.commit()
+            cur.close()
+            conn.close()
+            return [(next(student_ids), None) if session_id in existing
+                    else (None, SESSION_NOT_FOUND) for session_id, _ in joins]
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return [(None, str(e))] * len(joins)
+
+    def join_sessions_by_code(self, joins):
+        conn = self.connect()
+        if not conn:
+            return [(None, "Database connection failed")] * len(joins)
+
+        try:
+            cur = conn.cursor()
+            codes = sorted({class_code for class_code, _ in joins})
+            # Sessions, quizzes and whole question sets for every code in one statement
+            cur.execute(f"""
+                SELECT q.*,
+                       {', '.join('qs.' + c for c in JOIN_SESSION_COLUMNS)},
+                       {', '.join('qu.' + c for c in JOIN_QUESTION_COLUMNS)},
+                       {', '.join('a.' + c for c in JOIN_ANSWER_COLUMNS)}
+                FROM quiz_sessions qs
+                JOIN quizzes q ON qs.quiz_id = q.quiz_id
+                LEFT JOIN questions qu ON qu.quiz_id = q.quiz_id
+                LEFT JOIN answers a ON a.question_id = qu.question_id
+                WHERE qs.class_code IN ({', '.join(['%s'] * len(codes))})
+                ORDER BY qs.session_id, qu.question_id, a.answer_order
+            """, codes)
+            rows_by_code = {}
+            for row in cur.fetchall():
+                rows_by_code.setdefault(row['class_code'], []).append(row)
+
+            # Bumping the versions of the still-active sessions also locks them,
+            # so a close racing the batch wins
+            active = [rows[0]['session_id'] for rows in rows_by_code.values()
+                      if rows[0]['status'] == 'active']
+            still_active = set()
+            if active:
+                cur.execute(f"""
+                    UPDATE quiz_sessions SET results_version = results_version + 1
+                    WHERE session_id IN ({', '.join(['%s'] * len(active))})
+                      AND status = 'active'
+                    RETURNING session_id
+                """, active)
+                still_active = {row['session_id'] for row in cur.fetchall()}
+
+            def session_of(class_code):
+                rows = rows_by_code.get(class_code)
+                return rows[0]['session_id'] if rows else None
+
+            accepted = [(session_of(code), name) for code, name in joins
+                        if session_of(code) in still_active]
+            student_ids = iter(self._insert_students(cur, accepted))
+            self._count_joins(cur, [session_id for session_id, _ in accepted])
+            conn.commit()
+            cur.close()
+            conn.close()
+
+            # Students of one session share everything but their id
+            payloads = {}
+            outcomes = []
+            for class_code, _ in joins:
+                rows = rows_by_code.get(class_code)
+                if not rows:
+                    outcomes.append((None, SESSION_NOT_FOUND))
+                elif rows[0]['session_id'] not in still_active:
+                    outcomes.append((None, SESSION_NOT_ACTIVE))
+                else:
+                    if class_code not in payloads:
+                        payloads[class_code] = build_join_payload(None, rows)
+                    outcomes.append((dict(payloads[class_code], student_id=next(student_ids)),
+                                     None))
+            return outcomes
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return [(None, str(e))] * len(joins)
+
+    def submit_answer(self, student_id, session_id, question_id, answer_id, time_taken):
+        conn = self.connect()
+        if not conn:
+            return False, "Database connection failed"
+
+        try:
+            cur = conn.cursor()
+
+            # Get all correct answer IDs for this question
+            cur.execute("""
+                SELECT answer_id FROM answers
+                WHERE question_id = %s AND is_correct = true
+            """, (question_id,))
+            correct_answer_ids = set(row['answer_id'] for row in cur.fetchall())
+
+            # Get all answers this student has already submitted
+            cur.execute("""
+                SELECT answer_id, is_correct FROM student_answers
+                WHERE student_id = %s AND question_id = %s
+            """, (student_id, question_id))
+            existing_rows = cur.fetchall()
+
+            is_correct, allow_multiple, correct_delta = grade_submission(
+                correct_answer_ids, existing_rows, answer_id)
+
+            # Inserts nothing unless the session is active with this question open
+            cur.execute("""
+                INSERT INTO student_answers
+                (student_id, session_id, question_id, answer_id, is_correct, time_taken_seconds)
+                SELECT %s, %s, %s, %s, %s, %s FROM quiz_sessions
+                WHERE session_id = %s AND current_question_id = %s AND status = 'active'
+            """, (student_id, session_id, question_id, answer_id, is_correct, time_taken,
+                  session_id, question_id))
+            if cur.rowcount == 0:
+                cur.execute("""
+                    SELECT status FROM quiz_sessions WHERE session_id = %s
+                """, (session_id,))
+                session = cur.fetchone()
+                conn.rollback()
+                conn.close()
+                if session and session['status'] != 'active':
+                    return False, SESSION_NOT_ACTIVE
+                return False, QUESTION_NOT_OPEN
+
+            # Correctness is evaluated on the complete answer set, so every
+            # answer from this student for this question is updated
+            if allow_multiple:
+                cur.execute("""
+                    UPDATE student_answers
+                    SET is_correct = %s
+                    WHERE student_id = %s AND question_id = %s
+                """, (is_correct, student_id, question_id))
+
+            self._bump_teacher_summary(cur, TEACHER_OF_SESSION, (session_id,),
+                                       answers_collected=1, correct_answers=correct_delta)
+            self._bump_session_version(cur, session_id)
+
+            conn.commit()
+            cur.close()
+            conn.close()
+            return True, None
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            logger.exception("Error submitting answer")
+            return False, str(e)
+
+    def _read_student_responses(self, cur, session_id):
+        cur.execute(f"""
+            SELECT
+                s.student_id,
+                s.name as student_name,
+                COALESCE(a.answer_text, 'Not submitted') as answer_text,
+                COALESCE(a.is_correct, false) as is_correct,
+                '' as submitted_at
+            FROM students s
+            LEFT JOIN student_answers sa ON s.student_id = sa.student_id
+                AND sa.question_id = {CURRENT_QUESTION}
+            LEFT JOIN answers a ON sa.answer_id = a.answer_id
+            WHERE s.session_id = %s
+            ORDER BY s.student_id ASC, sa.id ASC
+        """, (session_id, session_id))
+        responses = cur.fetchall()
+
+        cur.execute(f"""
+            SELECT COUNT(DISTINCT s.student_id) as total_students,
+                   COUNT(sa.id) as total_responses
+            FROM students s
+            LEFT JOIN student_answers sa ON s.student_id = sa.student_id
+                AND sa.question_id = {CURRENT_QUESTION}
+            WHERE s.session_id = %s
+        """, (session_id, session_id))
+        counts = cur.fetchone()
+
+        formatted_responses = []
+        for r in responses:
+            formatted_responses.append({
+                'student_id': r['student_id'],
+                'student_name': r['student_name'],
+                'answer_text': r['answer_text'],
+                'is_correct': r['is_correct'],
+                'submitted_at': r['submitted_at']
+            })
+
+        return {
+            'students': formatted_responses,
+            'total_students': counts['total_students'],
+            'total_responses': counts['total_responses']
+        }
+
+    def get_student_responses(self, session_id):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            responses = self._read_student_responses(cur, session_id)
+            cur.close()
+            conn.close()
+            return responses
+        except Exception as e:
+            logger.exception("Error fetching student responses")
+            conn.close()
+            return None
+
+    def get_session_answers(self, session_id):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT s.student_id, s.name as student_name,
+                       sa.question_id, sa.answer_id, sa.time_taken_seconds
+                FROM students s
+                LEFT JOIN student_answers sa ON sa.student_id = s.student_id
+                WHERE s.session_id = %s
+                ORDER BY s.student_id, sa.id
+            """, (session_id,))
+            rows = cur.fetchall()
+            cur.close()
+            conn.close()
+            return rows
+        except Exception as e:
+            logger.exception("Error fetching session answers")
+            conn.close()
+            return None
+
+    def _read_session_results(self, cur, session_id, question_id=None):
+        # Answer distribution of one question (counts unique students per answer)
+        cur.execute("""
+            SELECT
+                a.answer_text,
+                a.answer_order,
+                a.is_correct,
+                COUNT(DISTINCT sa.student_id) as count
+            FROM answers a
+            JOIN questions q ON a.question_id = q.question_id
+            JOIN quiz_sessions qs ON q.quiz_id = qs.quiz_id
+            LEFT JOIN student_answers sa ON a.answer_id = sa.answer_id
+                AND sa.session_id = qs.session_id
+            WHERE qs.session_id = %s
+              AND q.question_id = COALESCE(%s, qs.current_question_id)
+            GROUP BY a.answer_id, a.answer_text, a.answer_order, a.is_correct
+            ORDER BY a.answer_order
+        """, (session_id, question_id))
+        results = cur.fetchall()
+
+        # Total students who joined (not just responded)
+        cur.execute("""
+            SELECT COUNT(*) as total FROM students WHERE session_id = %s
+        """, (session_id,))
+        participant_count = cur.fetchone()['total']
+
+        return {
+            'results': results,
+            'participant_count': participant_count
+        }
+
+    def get_session_results(self, session_id, question_id=None):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            results = self._read_session_results(cur, session_id, question_id)
+            cur.close()
+            conn.close()
+            return results
+        except Exception as e:
+            logger.exception("Error fetching results")
+            conn.close()
+            return None
+
+    def get_sessions_results(self, session_ids, known_versions=None):
+        known_versions = known_versions or {}
+        session_ids = sorted(set(session_ids))
+        if not session_ids:
+            return {}
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            cur.execute(self.BEGIN_SNAPSHOT)
+            cur.execute(f"""
+                SELECT qs.session_id, qs.status, qs.results_version, qs.current_question_id,
+                       (SELECT COUNT(*) FROM students s
+                         WHERE s.session_id = qs.session_id) as participant_count
+                FROM quiz_sessions qs
+                WHERE qs.session_id IN ({', '.join(['%s'] * len(session_ids))})
+            """, session_ids)
+            sessions = {}
+            for row in cur.fetchall():
+                unchanged = known_versions.get(row['session_id']) == row['results_version']
+                sessions[row['session_id']] = dict(row, results=None if unchanged else [])
+
+            # Answer distributions of every changed session's current question at once
+            changed = sorted(s for s, row in sessions.items() if row['results'] is not None)
+            if changed:
+                cur.execute(f"""
+                    SELECT
+                        qs.session_id,
+                        a.answer_text,
+                        a.answer_order,
+                        a.is_correct,
+                        COUNT(DISTINCT sa.student_id) as count
+                    FROM quiz_sessions qs
+                    JOIN answers a ON a.question_id = qs.current_question_id
+                    LEFT JOIN student_answers sa ON a.answer_id = sa.answer_id
+                        AND sa.session_id = qs.session_id
+                    WHERE qs.session_id IN ({', '.join(['%s'] * len(changed))})
+                    GROUP BY qs.session_id, a.answer_id, a.answer_text, a.answer_order,
+                             a.is_correct
+                    ORDER BY qs.session_id, a.answer_order
+                """, changed)
+                for row in cur.fetchall():
+                    row = dict(row)
+                    sessions[row.pop('session_id')]['results'].append(row)
+
+            cur.close()
+            conn.rollback()
+            conn.close()
+            return sessions
+        except Exception as e:
+            logger.exception("Error fetching results of several sessions")
+            conn.rollback()
+            conn.close()
+            return None
+
+    def _read_session_statistics(self, cur, session_id):
+        # A student counts as fully correct only if every answer they submitted
+        # to the current question is correct
+        cur.execute(f"""
+            WITH per_student AS (
+                SELECT student_id, {self.ALL_TRUE.format('is_correct')} as all_correct
+                FROM student_answers
+                WHERE session_id = %s AND question_id = {CURRENT_QUESTION}
+                GROUP BY student_id
+            )
+            SELECT
+                qs.session_id,
+                qs.status,
+                q.has_correct,
+                (SELECT COUNT(*) FROM students s
+                  WHERE s.session_id = qs.session_id) as participant_count,
+                (SELECT COUNT(*) FROM per_student) as responded_count,
+                (SELECT COUNT(*) FROM per_student WHERE all_correct) as correct_count,
+                {self.ELAPSED_SECONDS.format('qs.started_at')} as elapsed_seconds
+            FROM quiz_sessions qs
+            JOIN quizzes q ON qs.quiz_id = q.quiz_id
+            WHERE qs.session_id = %s
+        """, (session_id, session_id, session_id))
+        stats = cur.fetchone()
+        return finish_statistics(stats) if stats else None
+
+    def get_session_statistics(self, session_id):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            stats = self._read_session_statistics(cur, session_id)
+            cur.close()
+            conn.close()
+            return stats
+        except Exception as e:
+            logger.exception("Error fetching session statistics")
+            conn.close()
+            return None
+
+    def get_session_snapshot(self, session_id, sections=SNAPSHOT_SECTIONS):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            cur.execute(self.BEGIN_SNAPSHOT)
+            cur.execute(f"""
+                SELECT {', '.join(SNAPSHOT_SESSION_COLUMNS)}
+                FROM quiz_sessions
+                WHERE session_id = %s
+            """, (session_id,))
+            session = cur.fetchone()
+
+            snapshot = None
+            if session:
+                snapshot = {'session': session}
+                if 'results' in sections:
+                    snapshot['results'] = self._read_session_results(cur, session_id)
+                if 'stats' in sections:
+                    snapshot['stats'] = self._read_session_statistics(cur, session_id)
+                if 'students' in sections:
+                    snapshot['students'] = self._read_student_responses(cur, session_id)
+
+            cur.close()
+            conn.rollback()
+            conn.close()
+            return snapshot
+        except Exception as e:
+            logger.exception("Error fetching session snapshot")
+            conn.rollback()
+            conn.close()
+            return None
+
+    def get_auto_close_sessions(self, session_id=None):
+        conn = self.connect()
+        if not conn:
+            return []
+
+        try:
+            cur = conn.cursor()
+            cur.execute(f"""
+                SELECT session_id, started_at, auto_close_minutes
+                FROM (
+                    SELECT qs.session_id, qs.started_at,
+                           COALESCE(qs.auto_close_minutes, q.close_submission_after)
+                               AS auto_close_minutes
+                    FROM quiz_sessions qs
+                    JOIN quizzes q ON qs.quiz_id = q.quiz_id
+                    WHERE qs.status = 'active'
+                    {"AND qs.session_id = %s" if session_id is not None else ""}
+                ) timed
+                WHERE auto_close_minutes > 0
+                ORDER BY session_id
+            """, (session_id,) if session_id is not None else None)
+            sessions = cur.fetchall()
+            cur.close()
+            conn.close()
+            return sessions
+        except Exception as e:
+            logger.exception("Error fetching auto-close sessions")
+            conn.close()
+            return []
+
+    def count_active_sessions(self):
+        conn = self.connect()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) as count FROM quiz_sessions WHERE status = 'active'")
+            count = cur.fetchone()['count']
+            cur.close()
+            conn.close()
+            return count
+        except Exception as e:
+            logger.exception("Error counting active sessions")
+            conn.close()
+            return None
+
+    def advance_question(self, session_id, question_id=None):
+        conn = self.connect()
+        if not conn:
+            return None, "Database connection failed"
+
+        if question_id is None:
+            target = """(SELECT MIN(question_id) FROM questions
+                         WHERE quiz_id = quiz_sessions.quiz_id
+                           AND question_id > quiz_sessions.current_question_id)"""
+            params = ()
+        else:
+            target = """(SELECT question_id FROM questions
+                         WHERE quiz_id = quiz_sessions.quiz_id AND question_id = %s)"""
+            params = (question_id,)
+
+        try:
+            cur = conn.cursor()
+            cur.execute(f"""
+                UPDATE quiz_sessions
+                SET current_question_id = {target},
+                    results_version = results_version + 1
+                WHERE session_id = %s AND status = 'active' AND {target} IS NOT NULL
+                RETURNING current_question_id
+            """, params + (session_id,) + params)
+            row = cur.fetchone()
+            if not row:
+                cur.execute("SELECT status FROM quiz_sessions WHERE session_id = %s",
+                            (session_id,))
+                session = cur.fetchone()
+                conn.rollback()
+                conn.close()
+                if not session:
+                    return None, SESSION_NOT_FOUND
+                if session['status'] != 'active':
+                    return None, SESSION_NOT_ACTIVE
+                return None, NO_MORE_QUESTIONS if question_id is None else \
+                    f"Question {question_id} is not part of this quiz"
+            conn.commit()
+            cur.close()
+            conn.close()
+            return row['current_question_id'], None
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return None, str(e)
+
+    def close_session(self, session_id):
+        conn = self.connect()
+        if not conn:
+            return False
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE quiz_sessions
+                SET status = 'closed', closed_at = CURRENT_TIMESTAMP,
+                    results_version = results_version + 1
+                WHERE session_id = %s
+            """, (session_id,))
+            conn.commit()
+            cur.close()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.exception("Error closing session")
+            conn.rollback()
+            conn.close()
+            return False
@@ -0,0 +1,220 @@
+"""
+Embedded SQLite backend for single-classroom installs, demos and tests
+
+The whole quiz_app_db schema lives in one file opened in WAL mode, so the
+API and the Streamlit apps can read while a student's answer is written.
+Statements are shared with the Postgres backend; the cursor translates
+psycopg2 `%s` placeholders to SQLite's `?`.
+"""
+
+from datetime import datetime
+import logging
+import sqlite3
+import time
+
+from .instrumentation import record_statement, record_connect
+from .sql import SQLStorage
+
+logger = logging.getLogger("classpoint.database")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS teachers (
+        teacher_id integer PRIMARY KEY AUTOINCREMENT,
+        username varchar(100) NOT NULL UNIQUE,
+        email varchar(100) NOT NULL UNIQUE,
+        password varchar(100) NOT NULL,
+        created_at timestamp DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS quizzes (
+        quiz_id integer PRIMARY KEY AUTOINCREMENT,
+        teacher_id integer REFERENCES teachers(teacher_id) ON DELETE CASCADE,
+        title varchar(200) NOT NULL,
+        num_choices integer NOT NULL,
+        allow_multiple boolean DEFAULT false,
+        has_correct boolean DEFAULT false,
+        competition_mode boolean DEFAULT false,
+        start_with_slide boolean DEFAULT false,
+        minimize_result_window boolean DEFAULT false,
+        close_submission_after integer,
+        created_at timestamp DEFAULT CURRENT_TIMESTAMP,
+        quiz_mode varchar(20) DEFAULT 'easy'
+    );
+
+    CREATE TABLE IF NOT EXISTS questions (
+        question_id integer PRIMARY KEY AUTOINCREMENT,
+        quiz_id integer REFERENCES quizzes(quiz_id) ON DELETE CASCADE,
+        question_text text NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS answers (
+        answer_id integer PRIMARY KEY AUTOINCREMENT,
+        question_id integer REFERENCES questions(question_id) ON DELETE CASCADE,
+        answer_text text NOT NULL,
+        answer_order integer NOT NULL,
+        is_correct boolean DEFAULT false,
+        CONSTRAINT unique_order UNIQUE (question_id, answer_order)
+    );
+
+    CREATE TABLE IF NOT EXISTS quiz_sessions (
+        session_id integer PRIMARY KEY AUTOINCREMENT,
+        quiz_id integer REFERENCES quizzes(quiz_id) ON DELETE CASCADE,
+        class_code varchar(10) NOT NULL UNIQUE,
+        status varchar(20) DEFAULT 'active',
+        started_at timestamp DEFAULT CURRENT_TIMESTAMP,
+        closed_at timestamp,
+        show_responses boolean DEFAULT true,
+        total_participants integer DEFAULT 0,
+        auto_close_minutes integer,
+        results_version integer NOT NULL DEFAULT 0,
+        current_question_id integer REFERENCES questions(question_id) ON DELETE SET NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS students (
+        student_id integer PRIMARY KEY AUTOINCREMENT,
+        session_id integer REFERENCES quiz_sessions(session_id) ON DELETE CASCADE,
+        name varchar(100) NOT NULL,
+        joined_at timestamp DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS student_answers (
+        id integer PRIMARY KEY AUTOINCREMENT,
+        student_id integer REFERENCES students(student_id) ON DELETE CASCADE,
+        session_id integer REFERENCES quiz_sessions(session_id) ON DELETE CASCADE,
+        question_id integer REFERENCES questions(question_id) ON DELETE CASCADE,
+        answer_id integer REFERENCES answers(answer_id) ON DELETE CASCADE,
+        is_correct boolean DEFAULT false,
+        submitted_at timestamp DEFAULT CURRENT_TIMESTAMP,
+        time_taken_seconds integer,
+        selected_options text
+    );
+
+    CREATE TABLE IF NOT EXISTS teacher_summary (
+        teacher_id integer PRIMARY KEY REFERENCES teachers(teacher_id) ON DELETE CASCADE,
+        quiz_count integer NOT NULL DEFAULT 0,
+        session_count integer NOT NULL DEFAULT 0,
+        students_reached integer NOT NULL DEFAULT 0,
+        answers_collected integer NOT NULL DEFAULT 0,
+        correct_answers integer NOT NULL DEFAULT 0,
+        updated_at timestamp DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_quizzes_teacher ON quizzes(teacher_id);
+    CREATE INDEX IF NOT EXISTS idx_questions_quiz ON questions(quiz_id);
+    CREATE INDEX IF NOT EXISTS idx_sessions_quiz ON quiz_sessions(quiz_id);
+    CREATE INDEX IF NOT EXISTS idx_students_session ON students(session_id);
+    CREATE INDEX IF NOT EXISTS idx_student_answers_session ON student_answers(session_id);
+    CREATE INDEX IF NOT EXISTS idx_student_answers_student
+        ON student_answers(student_id, question_id);
+
+    CREATE TRIGGER IF NOT EXISTS trigger_update_participant_count
+    AFTER INSERT ON students
+    BEGIN
+        UPDATE quiz_sessions
+        SET total_participants = (
+            SELECT COUNT(*) FROM students WHERE session_id = NEW.session_id
+        )
+        WHERE session_id = NEW.session_id;
+    END;
+"""
+
+# Columns added since the first SQLite release: (table, column, definition, backfill)
+COLUMN_UPDATES = [
+    ('quiz_sessions', 'current_question_id',
+     'integer REFERENCES questions(question_id) ON DELETE SET NULL',
+     """UPDATE quiz_sessions SET current_question_id = (
+            SELECT MIN(question_id) FROM questions WHERE quiz_id = quiz_sessions.quiz_id)"""),
+]
+
+# SQLite stores booleans as 0/1; these columns are handed back as bool like psycopg2 does
+BOOLEAN_COLUMNS = frozenset({
+    'allow_multiple', 'has_correct', 'competition_mode', 'start_with_slide',
+    'minimize_result_window', 'show_responses', 'is_correct',
+})
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("timestamp", lambda value: datetime.fromisoformat(value.decode()))
+
+
+def _dict_row(cursor, row):
+    return {
+        column[0]: bool(value) if column[0] in BOOLEAN_COLUMNS and value is not None else value
+        for column, value in zip(cursor.description, row)
+    }
+
+
+class _Cursor(sqlite3.Cursor):
+    """Cursor accepting psycopg2-style `%s` placeholders and timing every statement"""
+
+    def execute(self, query, params=None):
+        start = time.perf_counter()
+        try:
+            if params is None:
+                return super().execute(query)
+            return super().execute(query.replace("%s", "?").replace("%%", "%"), tuple(params))
+        finally:
+            record_statement(query, params, time.perf_counter() - start, self.rowcount)
+
+
+class _Connection(sqlite3.Connection):
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+
+class SQLiteStorage(SQLStorage):
+    """One short-lived connection per call to a WAL-mode database file"""
+
+    name = "sqlite"
+    IntegrityError = sqlite3.IntegrityError
+    NOW_UTC = "CURRENT_TIMESTAMP"
+    ELAPSED_SECONDS = "(julianday('now') - julianday({})) * 86400"
+    ALL_TRUE = "MIN({})"
+    # In WAL mode a read transaction keeps the snapshot of its first read
+    BEGIN_SNAPSHOT = "BEGIN"
+
+    def __init__(self, path, busy_timeout_ms=5000):
+        if path == ":memory:":
+            raise ValueError("SQLite storage needs a file; use the memory backend instead")
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.ensure_schema()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                                   detect_types=sqlite3.PARSE_DECLTYPES,
+                                   factory=_Connection)
+            conn.row_factory = _dict_row
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+            return conn
+        except Exception as e:
+            logger.error("Database connection error: %s", e, extra={"event": "db_connect_failed"})
+            return None
+        finally:
+            record_connect(time.perf_counter() - start)
+
+    def ensure_schema(self):
+        """Create the full schema in a new file; add newer columns to an existing one"""
+        conn = self.connect()
+        if not conn:
+            return False
+
+        try:
+            # WAL is persistent, so setting it once per file is enough
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            for table, column, definition, backfill in COLUMN_UPDATES:
+                columns = {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                    conn.execute(backfill)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.exception("Error applying schema updates")
+            conn.close()
+            return False
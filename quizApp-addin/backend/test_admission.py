@@ -0,0 +1,85 @@
+"""
+Tests for the priority admission gate
+
+    python -m pytest -q test_admission.py
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from admission import Overloaded, PriorityGate, READ, WRITE
+
+
+def test_writes_are_admitted_before_waiting_reads():
+    order = []
+
+    async def scenario():
+        gate = PriorityGate(slots=1, read_queue_max=10, read_timeout=5)
+        await gate.acquire(WRITE)
+
+        async def wait(priority, name):
+            await gate.acquire(priority)
+            order.append(name)
+            gate.release()
+
+        tasks = [asyncio.create_task(wait(READ, "poll 1")),
+                 asyncio.create_task(wait(READ, "poll 2")),
+                 asyncio.create_task(wait(WRITE, "answer"))]
+        await asyncio.sleep(0)
+        assert gate.busy() and gate.queued(READ) == 2 and gate.queued(WRITE) == 1
+        gate.release()
+        await asyncio.gather(*tasks)
+        return gate.in_use
+
+    assert asyncio.run(scenario()) == 0
+    assert order == ["answer", "poll 1", "poll 2"]
+
+
+def test_reads_are_shed_but_writes_wait():
+    async def scenario():
+        gate = PriorityGate(slots=1, read_queue_max=1, read_timeout=0.01)
+        await gate.acquire(WRITE)
+        queued = asyncio.create_task(gate.acquire(READ))
+        await asyncio.sleep(0)
+        # The read queue is full: refused without waiting
+        with pytest.raises(Overloaded):
+            await gate.acquire(READ)
+        # The queued read gives up after read_timeout
+        with pytest.raises(Overloaded):
+            await queued
+        write = asyncio.create_task(gate.acquire(WRITE))
+        await asyncio.sleep(0.02)
+        assert not write.done()
+        gate.release()
+        await write
+        gate.release()
+        return gate.in_use, gate.queued()
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+def test_run_holds_the_slot_until_the_thread_finishes():
+    started, finish = threading.Event(), threading.Event()
+    admitted = []
+
+    def blocking(value):
+        started.set()
+        finish.wait(5)
+        return value * 2
+
+    async def scenario():
+        gate = PriorityGate(slots=1, on_admit=lambda p, waited: admitted.append(p))
+        call = asyncio.create_task(gate.run(READ, blocking, 21))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        # The caller stops waiting; the thread still holds the slot
+        call.cancel()
+        await asyncio.sleep(0.01)
+        held = gate.in_use
+        finish.set()
+        result = await gate.run(WRITE, lambda: "next")
+        return held, result, gate.in_use
+
+    assert asyncio.run(scenario()) == (1, "next", 0)
+    assert admitted == [READ, WRITE]
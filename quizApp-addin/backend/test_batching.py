@@ -0,0 +1,85 @@
+"""
+Tests for the join micro-batcher
+
+    python -m pytest -q test_batching.py
+"""
+
+import asyncio
+
+from batching import MicroBatcher
+
+
+def test_concurrent_submits_share_one_flush():
+    flushed = []
+
+    def flush(items):
+        flushed.append(list(items))
+        return [item * 10 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(flush, window=0.01, max_batch=100)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    assert asyncio.run(scenario()) == [0, 10, 20, 30, 40]
+    assert flushed == [[0, 1, 2, 3, 4]]
+
+
+def test_full_batches_flush_without_waiting():
+    sizes = []
+
+    async def scenario():
+        batcher = MicroBatcher(lambda items: list(items), window=60, max_batch=3,
+                               on_flush=lambda size, seconds: sizes.append(size))
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(6))), timeout=5)
+        return results, batcher.batches, batcher.items
+
+    assert asyncio.run(scenario()) == ([0, 1, 2, 3, 4, 5], 2, 6)
+    assert sizes == [3, 3]
+
+
+def test_flush_errors_reach_every_caller():
+    def flush(items):
+        raise RuntimeError("database down")
+
+    async def scenario():
+        batcher = MicroBatcher(flush, window=0.001)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2),
+                                    return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert [str(e) for e in errors] == ["database down"] * 2
+
+
+def test_flush_can_run_through_a_gate():
+    calls = []
+
+    async def run(flush, items):
+        calls.append(len(items))
+        return flush(items)
+
+    async def scenario():
+        batcher = MicroBatcher(lambda items: [i + 1 for i in items], window=0.001, run=run)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    assert asyncio.run(scenario()) == [2, 3]
+    assert calls == [2]
+
+
+def test_drain_writes_waiting_and_in_flight_batches():
+    flushed = []
+
+    async def scenario():
+        batcher = MicroBatcher(lambda items: flushed.extend(items) or list(items),
+                               window=60, max_batch=2)
+        first = asyncio.ensure_future(asyncio.gather(*(batcher.submit(i) for i in range(3))))
+        await asyncio.sleep(0)
+        # One full batch is being written; the third item waits for the window
+        assert len(batcher._flushing) == 1 and len(batcher._pending) == 1
+        await batcher.drain()
+        assert not batcher._flushing
+        return await first
+
+    assert asyncio.run(scenario()) == [0, 1, 2]
+    assert sorted(flushed) == [0, 1, 2]
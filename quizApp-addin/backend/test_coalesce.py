@@ -0,0 +1,101 @@
+"""
+Tests for single-flight read coalescing
+
+    python -m pytest -q test_coalesce.py
+"""
+
+import asyncio
+
+import pytest
+
+from coalesce import SingleFlight
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_overlapping_calls_share_one_execution():
+    calls, saved = [], []
+
+    async def read():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"count": len(calls)}
+
+    async def scenario():
+        flight = SingleFlight(ttl=0, on_saved=lambda key, reason: saved.append(reason))
+        first = await asyncio.gather(*(flight.do(("results", 4), read) for _ in range(5)))
+        # Nothing is kept with ttl=0: the next call executes again
+        second = await flight.do(("results", 4), read)
+        other = await flight.do(("results", 5), read)
+        return first, second, other, flight.executed, flight.saved
+
+    first, second, other, executed, saved_count = asyncio.run(scenario())
+    assert first == [{"count": 1}] * 5
+    assert second == {"count": 2} and other == {"count": 3}
+    assert (executed, saved_count) == (3, 4)
+    assert saved == ["inflight"] * 4
+
+
+def test_results_are_reused_until_the_ttl_passes():
+    clock = FakeClock()
+    saved = []
+    values = iter(range(10))
+
+    async def read():
+        return next(values)
+
+    async def scenario():
+        flight = SingleFlight(ttl=0.5, clock=clock,
+                              on_saved=lambda key, reason: saved.append(reason))
+        results = [await flight.do("k", read), await flight.do("k", read)]
+        clock.now += 0.6
+        results.append(await flight.do("k", read))
+        return results
+
+    assert asyncio.run(scenario()) == [0, 0, 1]
+    assert saved == ["ttl"]
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    attempts = []
+
+    async def read():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise LookupError("Session not found")
+        return "ok"
+
+    async def scenario():
+        flight = SingleFlight(ttl=10)
+        errors = await asyncio.gather(flight.do("k", read), flight.do("k", read),
+                                      return_exceptions=True)
+        assert all(isinstance(e, LookupError) for e in errors)
+        return await flight.do("k", read)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert len(attempts) == 2
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    async def read():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        flight = SingleFlight(ttl=0)
+        first = asyncio.create_task(flight.do("k", read))
+        second = asyncio.create_task(flight.do("k", read))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
@@ -0,0 +1,89 @@
+"""
+Tests for vectorized session grading
+
+    python -m pytest -q test_grading.py
+"""
+
+import random
+
+from grading import grade_session
+from leaderboard import Leaderboard
+from scoring import difficulty_multiplier, SCORE_POINTS, SCORE_SPEED_BONUS
+
+
+def make_questions(layout):
+    """Question set like get_question_set(): `layout` is one list of
+    correctness flags per question; answer ids are question_id * 10 + order"""
+    return [{'question_id': q, 'answers': [
+        {'answer_id': q * 10 + i, 'is_correct': flag} for i, flag in enumerate(flags)]}
+        for q, flags in enumerate(layout, 1)]
+
+
+def row(student_id, question_id=None, answer_id=None, seconds=None):
+    return {'student_id': student_id, 'student_name': f"S{student_id}",
+            'question_id': question_id, 'answer_id': answer_id, 'time_taken_seconds': seconds}
+
+
+def test_partial_credit_difficulty_and_ranking():
+    questions = make_questions([[True, False, False], [True, True, True, False]])
+    rows = [
+        row(1, 1, 10, 0), row(1, 2, 20, 0), row(1, 2, 21, 0), row(1, 2, 22, 0),
+        # Two of three, then one right and one wrong
+        row(2, 1, 10, 0), row(2, 2, 20, 0), row(2, 2, 21, 0),
+        row(3, 1, 11, 0), row(3, 2, 20, 0), row(3, 2, 23, 0),
+        row(4),
+    ]
+    grades = grade_session(questions, rows, "hard")
+    full = SCORE_POINTS + SCORE_SPEED_BONUS
+    multiplier = difficulty_multiplier("hard")
+    assert grades['multiplier'] == multiplier and grades['question_count'] == 2
+
+    by_id = {s['student_id']: s for s in grades['students']}
+    assert by_id[1]['score'] == 2 * round(multiplier * full)
+    assert by_id[2]['score'] == round(multiplier * full) + round(multiplier * 2 / 3 * full)
+    assert (by_id[2]['correct'], by_id[2]['partial']) == (1, 1)
+    assert (by_id[3]['score'], by_id[3]['answered']) == (0, 2)
+    assert (by_id[4]['score'], by_id[4]['answered']) == (0, 0)
+    assert [s['student_id'] for s in grades['students']] == [1, 2, 3, 4]
+    assert [s['rank'] for s in grades['students']] == [1, 2, 3, 4]
+
+    assert [(q['answered'], q['correct']) for q in grades['questions']] == [(3, 2), (3, 1)]
+    assert grades['questions'][1]['average_credit'] == round((1 + 2 / 3) / 4, 3)
+
+
+def test_matches_the_live_leaderboard():
+    rng = random.Random(11)
+    layout = [[rng.random() < 0.4 for _ in range(4)] for _ in range(6)]
+    for flags in layout:
+        flags[0] = True
+    questions = make_questions(layout)
+    correct = {q['question_id']: frozenset(a['answer_id'] for a in q['answers'] if a['is_correct'])
+               for q in questions}
+
+    rows = []
+    for student_id in range(1, 60):
+        for q in questions:
+            if rng.random() < 0.8:
+                for a in rng.sample(q['answers'], rng.randint(1, 3)):
+                    rows.append(row(student_id, q['question_id'], a['answer_id'],
+                                    rng.randint(0, 45)))
+        if not any(r['student_id'] == student_id for r in rows):
+            rows.append(row(student_id))
+    # A stored answer repeated with a new time counts once, at the later row's time
+    rows.append(dict(rows[0], time_taken_seconds=1))
+
+    board = Leaderboard(correct, difficulty_multiplier("medium"))
+    board.load({}, rows)
+    grades = grade_session(questions, rows, "medium")
+    live = board.top(len(board))
+    assert [(s['student_id'], s['score'], s['correct'], s['seconds']) for s in grades['students']] \
+        == [(e['student_id'], e['score'], e['correct'], e['seconds']) for e in live]
+
+
+def test_empty_sessions_and_unknown_answers():
+    questions = make_questions([[True, False]])
+    assert grade_session(questions, [])['students'] == []
+    grades = grade_session(questions, [row(1, 1, 999, 3)], None)
+    assert grades['quiz_mode'] == "easy"
+    assert grades['students'][0]['score'] == 0
+    assert grade_session([], [row(1)])['students'][0]['answered'] == 0
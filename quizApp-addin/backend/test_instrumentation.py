@@ -0,0 +1,50 @@
+"""
+Tests for per-statement query stats and their /metrics series
+
+    python -m pytest -q test_instrumentation.py
+"""
+
+from metrics import MetricsRegistry, query_stats_collector
+from storage import instrumentation
+from storage.instrumentation import get_query_stats, instrumented, record_statement
+
+
+def test_placeholder_lists_collapse_to_one_statement():
+    normalize = instrumentation._normalize
+    assert normalize("SELECT *\n  FROM quiz_sessions WHERE session_id IN (%s, %s)") == \
+        normalize("SELECT * FROM quiz_sessions WHERE session_id IN (%s,%s, %s, %s)") == \
+        "SELECT * FROM quiz_sessions WHERE session_id IN (...)"
+    assert normalize("INSERT INTO students (session_id, name) VALUES (%s, %s), (%s, %s)") == \
+        normalize("INSERT INTO students (session_id, name) VALUES (%s, %s)") == \
+        "INSERT INTO students (session_id, name) VALUES (...)"
+
+
+def test_metric_series_are_unique_per_statement(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_statement_stats", {})
+    prefix = "SELECT " + "a, " * 60
+
+    @instrumented
+    def helper():
+        # Differ only after 120 characters, and in IN-list width
+        record_statement(prefix + "b FROM t", None, 0.001, 1)
+        record_statement(prefix + "c FROM t", None, 0.001, 1)
+        for width in range(1, 6):
+            record_statement(f"SELECT x FROM t WHERE id IN ({', '.join(['%s'] * width)})",
+                             [0] * width, 0.001, width)
+
+    helper()
+    registry = MetricsRegistry()
+    registry.add_collector(query_stats_collector(get_query_stats))
+    lines = [line for line in registry.render().splitlines()
+             if line.startswith("classpoint_db_statement_calls_total{")]
+    assert len(lines) == len(set(lines)) == 3
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == 7
+
+
+def test_statements_beyond_the_cap_are_counted_together(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_statement_stats", {})
+    monkeypatch.setattr(instrumentation, "STATEMENT_STATS_MAX", 2)
+    for i in range(5):
+        record_statement(f"SELECT {i}", None, 0.001, 1)
+    statements = {s['statement']: s['calls'] for s in get_query_stats()['statements']}
+    assert statements == {"SELECT 0": 1, "SELECT 1": 1, instrumentation.OTHER_STATEMENT: 3}
@@ -0,0 +1,86 @@
+"""
+Tests for live leaderboards
+
+    python -m pytest -q test_leaderboard.py
+"""
+
+import random
+
+from leaderboard import Leaderboard, LeaderboardRegistry, SkipList
+
+
+def test_skip_list_ranks_match_a_sorted_list():
+    rng = random.Random(3)
+    ranking = SkipList(rng)
+    keys = set()
+    for step in range(3000):
+        key = rng.randint(0, 500)
+        if key in keys and step % 3:
+            assert ranking.remove(key)
+            keys.discard(key)
+        elif key not in keys:
+            ranking.insert(key, str(key))
+            keys.add(key)
+        if step % 100 == 0:
+            ordered = sorted(keys)
+            assert len(ranking) == len(ordered)
+            assert [k for k, _ in ranking.first(len(ordered))] == ordered
+            for rank, k in enumerate(ordered, 1):
+                assert ranking.rank(k) == rank
+    assert ranking.rank(10 ** 6) is None
+    assert not ranking.remove(10 ** 6)
+
+
+def test_answers_move_students_and_report_ranks():
+    board = Leaderboard({10: frozenset({100}), 20: frozenset({200, 201})}, rng=random.Random(1))
+    for student_id, name in ((1, "Ada"), (2, "Bo"), (3, "Cy")):
+        board.add_student(student_id, name)
+    # Ties on score are broken by answer time, then student id
+    assert [e['student_id'] for e in board.top()] == [1, 2, 3]
+
+    assert board.record(3, 10, 100, 5) == (3, 1)
+    assert board.record(2, 10, 100, 2) == (3, 1)
+    assert board.record(1, 10, 101, 1) == (3, 3)
+    # Half of a multi-select answer set earns half the question
+    assert board.record(3, 20, 200, 4) == (2, 1)
+    assert board.record(3, 20, 201, 9) == (1, 1)
+    # Replaying a stored answer changes nothing
+    assert board.record(3, 20, 201, 9) == (1, 1)
+
+    top = board.top(2)
+    assert [(e['rank'], e['student_name'], e['correct']) for e in top] == [
+        (1, "Cy", 2), (2, "Bo", 1)]
+    assert board.standing(1)['rank'] == 3 and board.standing(1)['score'] == 0
+    assert board.standing(99) is None
+    assert len(board) == 3
+
+
+def test_rebuilding_from_rows_matches_live_updates():
+    correct = {10: frozenset({100}), 20: frozenset({200})}
+    answers = [(1, 10, 100, 4), (2, 10, 100, 2), (2, 20, 201, 3), (1, 20, 200, 8)]
+    live = Leaderboard(correct)
+    for student_id in (1, 2, 3):
+        live.add_student(student_id, f"S{student_id}")
+    for answer in answers:
+        live.record(*answer)
+
+    rows = [{'student_id': s, 'student_name': f"S{s}", 'question_id': q,
+             'answer_id': a, 'time_taken_seconds': t} for s, q, a, t in answers]
+    rows.append({'student_id': 3, 'student_name': "S3", 'question_id': None,
+                 'answer_id': None, 'time_taken_seconds': None})
+    rebuilt = Leaderboard()
+    # An answer recorded live before the rows arrive is merged, not counted twice
+    rebuilt.record(*answers[0])
+    rebuilt.load(correct, rows)
+    assert rebuilt.top() == live.top()
+
+
+def test_registry_drops_the_least_recently_used_board():
+    boards = LeaderboardRegistry(max_sessions=2)
+    first = boards.create(1)
+    boards.create(2)
+    assert boards.get(1) is first
+    boards.create(3)
+    assert boards.get(2) is None and boards.get(1) is first
+    boards.discard(1)
+    assert boards.get(1) is None
@@ -0,0 +1,70 @@
+"""
+Tests for the server-driven poll interval
+
+    python -m pytest -q test_polling.py
+"""
+
+from polling import PollAdvisor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def advisor(clock):
+    return PollAdvisor(active_ms=2000, idle_ms=10000, closed_ms=60000, idle_after=20,
+                       max_load_factor=3, clock=clock)
+
+
+def test_interval_stretches_as_answers_stop():
+    clock = FakeClock()
+    polls = advisor(clock)
+    # Nothing seen yet (e.g. after a restart): idle until an answer arrives
+    assert polls.next_poll_ms(4) == 10000
+    polls.touch(4)
+    assert polls.next_poll_ms(4) == 2000
+    clock.now += 10
+    assert polls.next_poll_ms(4) == 6000
+    clock.now += 60
+    assert polls.next_poll_ms(4) == 10000
+    polls.touch(4)
+    assert polls.next_poll_ms(4) == 2000
+
+
+def test_closed_sessions_load_and_floors():
+    clock = FakeClock()
+    polls = advisor(clock)
+    polls.touch(4)
+    assert polls.next_poll_ms(4, closed=True) == 60000
+    assert polls.next_poll_ms(4, load=0.5) == 3000
+    assert polls.next_poll_ms(4, load=10) == 6000
+    assert polls.next_poll_ms(4, floor_ms=5000) == 5000
+
+
+def test_sessions_read_as_closed_are_polled_slowly():
+    polls = PollAdvisor(closed_ms=60000, max_sessions=2)
+    # Closed before this process started: only the row says so
+    polls.observe(4, 'closed')
+    assert polls.is_closed(4) and not polls.is_closed(5)
+    polls.observe(4, 'active')
+    assert not polls.is_closed(4)
+    for session_id in range(3):
+        polls.observe(session_id, 'closed')
+    assert not polls.is_closed(0) and polls.is_closed(2)
+
+
+def test_class_codes_map_to_sessions():
+    polls = PollAdvisor(max_sessions=2)
+    polls.link("ABC123", 4)
+    assert polls.session_for_code("ABC123") == 4
+    assert polls.session_for_code("ZZZ999") is None
+    polls.link("DEF456", 5)
+    polls.link("GHI789", 6)
+    assert polls.session_for_code("GHI789") == 6
+    for session_id in range(5):
+        polls.touch(session_id)
+    assert len(polls._last_activity) == 2
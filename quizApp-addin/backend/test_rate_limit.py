@@ -0,0 +1,116 @@
+"""
+Tests for the token-bucket rate limiter
+
+    python -m pytest -q test_rate_limit.py
+"""
+
+import asyncio
+
+from rate_limit import (
+    RATE_LIMITS,
+    RateLimiter,
+    RateLimitMiddleware,
+    classify,
+    parse_limits,
+    request_key,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def scope(method, path, query=b"", headers=(), client=("10.0.0.1", 5000)):
+    return {"type": "http", "method": method, "path": path, "query_string": query,
+            "headers": list(headers), "client": client}
+
+
+def test_parse_and_classify():
+    assert parse_limits("poll=2/10, answer=5 ,bad=x/y") == {"poll": (2.0, 10.0),
+                                                            "answer": (5.0, 5.0)}
+    assert classify("GET", "/api/session/4/results") == "poll"
+    assert classify("GET", "/api/sessions/results") == "poll"
+    assert classify("GET", "/api/session/code/ABC123") == "status"
+    assert classify("POST", "/api/student/answer") == "answer"
+    assert classify("POST", "/api/student/join-by-code") == "join"
+    assert classify("POST", "/api/session/4/close") == "write"
+    assert classify("GET", "/api/teacher/1/summary") == "default"
+    assert classify("GET", "/health") is None
+    assert classify("GET", "/metrics") is None
+    # Joins are batched and gated instead
+    assert "join" not in parse_limits(RATE_LIMITS)
+
+
+def test_request_keys():
+    assert request_key(scope("GET", "/api/session/4/results"), "poll") == ("4", "ip:10.0.0.1")
+    assert request_key(scope("POST", "/api/student/answer",
+                             b"student_id=7&session_id=4&answer_id=1"), "answer") \
+        == ("4", "student_id:7")
+    # Neither a header nor a query id the endpoint ignores picks a fresh bucket
+    assert request_key(scope("GET", "/api/session/4/results", b"student_id=7&teacher_id=2",
+                             headers=[(b"x-client-id", b"dialog-2")]), "poll") \
+        == ("4", "ip:10.0.0.1")
+    assert request_key(scope("GET", "/api/session/code/ABC123", client=None), "status") \
+        == ("ABC123", "ip:unknown")
+
+
+def test_one_address_holds_a_bounded_number_of_student_buckets():
+    limiter = RateLimiter({"answer": (1.0, 1.0)}, keys_per_address=2, clock=FakeClock())
+    for student in ("student_id:1", "student_id:2"):
+        assert limiter.check("answer", "4", student, address="10.0.0.1") == 0.0
+    # Rotating student ids past the cap lands in the address's one bucket
+    assert limiter.check("answer", "4", "student_id:3", address="10.0.0.1") == 0.0
+    assert limiter.check("answer", "4", "student_id:4", address="10.0.0.1") == 1.0
+    assert limiter.check("answer", "4", "student_id:1", address="10.0.0.1") == 1.0
+    assert limiter.check("answer", "4", "student_id:5", address="10.0.0.2") == 0.0
+
+    # Forgotten buckets free their address's share
+    small = RateLimiter({"answer": (1.0, 1.0)}, max_buckets=1, keys_per_address=1,
+                        clock=FakeClock())
+    assert small.check("answer", "4", "student_id:1", address="10.0.0.1") == 0.0
+    assert small.check("answer", "5", "ip:10.0.0.3", address="10.0.0.3") == 0.0
+    assert small.check("answer", "4", "student_id:2", address="10.0.0.1") == 0.0
+    assert small._owned == {"10.0.0.1": 1}
+
+
+def test_bucket_refills_at_its_rate():
+    clock = FakeClock()
+    limiter = RateLimiter({"poll": (2.0, 3.0)}, clock=clock)
+    assert [limiter.check("poll", "4", "a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.check("poll", "4", "a") == 0.5
+    # Other sessions, clients and unlimited classes are unaffected
+    assert limiter.check("poll", "5", "a") == 0.0
+    assert limiter.check("poll", "4", "b") == 0.0
+    assert limiter.check("answer", "4", "a") == 0.0
+    clock.now += 0.5
+    assert limiter.check("poll", "4", "a") == 0.0
+    assert limiter.check("poll", "4", "a") == 0.5
+
+
+def test_middleware_answers_429_with_retry_after():
+    rejected, sent, served = [], [], []
+
+    async def app(scope, receive, send):
+        served.append(scope["path"])
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = RateLimitMiddleware(app, RateLimiter({"poll": (0.25, 1.0)}, clock=FakeClock()),
+                                     on_reject=rejected.append, enabled=True)
+
+    async def scenario():
+        for _ in range(2):
+            await middleware(scope("GET", "/api/session/4/results"), None, send)
+        await middleware(scope("GET", "/health"), None, send)
+
+    asyncio.run(scenario())
+    assert served == ["/api/session/4/results", "/health"]
+    assert rejected == ["poll"]
+    start = sent[0]
+    assert start["status"] == 429
+    assert (b"retry-after", b"4") in start["headers"]
@@ -0,0 +1,114 @@
+"""
+Tests for the auto-close scheduler
+
+    python -m pytest -q test_scheduler.py
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from scheduler import DeadlineScheduler, session_deadline, utcnow
+
+
+def test_session_deadline():
+    started = datetime(2024, 1, 1, 9, 0)
+    assert session_deadline(started, 5) == datetime(2024, 1, 1, 9, 5, tzinfo=timezone.utc)
+    assert session_deadline("2024-01-01T09:00:00+00:00", 1) == \
+        datetime(2024, 1, 1, 9, 1, tzinfo=timezone.utc)
+    assert session_deadline(started, 0) is None
+    assert session_deadline(started, None) is None
+
+
+def test_closes_due_sessions_in_deadline_order():
+    closed, events = [], []
+
+    async def on_close(session_id, closed_at):
+        events.append(session_id)
+
+    async def scenario():
+        scheduler = DeadlineScheduler(lambda sid: closed.append(sid) or True, on_close)
+        now = utcnow()
+        # Already overdue when loaded at startup
+        await scheduler.start([{'session_id': 1, 'started_at': now - timedelta(minutes=2),
+                                'auto_close_minutes': 1}])
+        scheduler.schedule(3, now + timedelta(seconds=0.2))
+        scheduler.schedule(2, now + timedelta(seconds=0.1))
+        scheduler.schedule(4, now + timedelta(seconds=0.1))
+        scheduler.closed(4)                         # closed by the teacher first
+        scheduler.schedule(5, now + timedelta(hours=1))
+        await asyncio.sleep(0.4)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert closed == [1, 2, 3]
+    assert events == [1, 2, 3]
+    assert scheduler.closed_count == 3
+    assert scheduler.pending() == 1
+
+
+def test_late_submissions():
+    scheduler = DeadlineScheduler(lambda sid: True)
+    now = utcnow()
+    scheduler.schedule(1, now)
+    assert not scheduler.is_late(1, now + timedelta(seconds=0.5))
+    assert scheduler.is_late(1, now + timedelta(seconds=2))
+    assert not scheduler.is_late(2)
+
+    scheduler.schedule(3, now + timedelta(minutes=5))
+    scheduler.closed(3, now)
+    # No grace once the teacher has closed it
+    assert scheduler.is_late(3, now)
+    assert scheduler.deadline(3) == now
+
+
+def test_failed_close_is_retried(monkeypatch):
+    import scheduler as scheduler_module
+    monkeypatch.setattr(scheduler_module, "RETRY_SECONDS", 0.05)
+    attempts = []
+
+    async def scenario():
+        scheduler = DeadlineScheduler(lambda sid: attempts.append(sid) or len(attempts) > 1)
+        await scheduler.start()
+        scheduler.schedule(7, utcnow())
+        await asyncio.sleep(0.3)
+        await scheduler.stop()
+        return scheduler
+
+    assert asyncio.run(scenario()).closed_count == 1
+    assert attempts == [7, 7]
+
+
+def test_closes_through_the_injected_runner():
+    ran = []
+
+    async def run(fn, *args):
+        ran.append(args)
+        return fn(*args)
+
+    async def scenario():
+        scheduler = DeadlineScheduler(lambda sid: True, run=run)
+        await scheduler.start()
+        scheduler.schedule(8, utcnow())
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        return scheduler
+
+    assert asyncio.run(scenario()).closed_count == 1
+    assert ran == [(8,)]
+
+
+def test_closed_sessions_are_forgotten_after_retention(monkeypatch):
+    import scheduler as scheduler_module
+    monkeypatch.setattr(scheduler_module, "CLOSED_RETENTION_SECONDS", 60)
+    scheduler = DeadlineScheduler(lambda sid: True)
+    now = utcnow()
+    scheduler.schedule(1, now + timedelta(minutes=5))
+    scheduler.closed(1, now - timedelta(minutes=2))
+    assert scheduler.is_late(1, now)
+
+    # Closing another prunes the ones closed before the retention window
+    scheduler.closed(2, now)
+    assert scheduler.deadline(1) is None and not scheduler.is_late(1, now)
+    assert scheduler.is_late(2, now)
+    assert len(scheduler._closed) == len(scheduler._deadlines) == 1
@@ -0,0 +1,53 @@
+"""
+Tests for the scoring rules
+
+    python -m pytest -q test_scoring.py
+"""
+
+from scoring import (
+    answer_credit,
+    difficulty_multiplier,
+    score_question,
+    SCORE_POINTS,
+    SCORE_SPEED_BONUS,
+    SCORE_SPEED_WINDOW_S,
+)
+
+
+def test_multi_select_earns_partial_credit():
+    correct = frozenset({1, 2, 3})
+    assert answer_credit(correct, {1, 2, 3}) == 1.0
+    assert answer_credit(correct, {1, 2}) == 2 / 3
+    # Each wrong pick cancels a right one
+    assert answer_credit(correct, {1, 2, 9}) == 1 / 3
+    assert answer_credit(correct, {1, 8, 9}) == 0.0
+    assert answer_credit(frozenset({1}), {1}) == 1.0
+    assert answer_credit(frozenset({1}), {1, 2}) == 0.0
+    assert answer_credit(frozenset(), {1}) == 0.0
+    assert answer_credit(None, {1}) == 0.0
+
+
+def test_points_scale_with_speed_credit_and_difficulty():
+    full = SCORE_POINTS + SCORE_SPEED_BONUS
+    assert score_question(frozenset({1}), {1: 0}) == (full, 1.0, 0)
+    assert score_question(frozenset({1}), {1: 0}, difficulty_multiplier("hard")) == \
+        (round(2 * full), 1.0, 0)
+    late = SCORE_SPEED_WINDOW_S * 10
+    assert score_question(frozenset({1}), {1: late}) == (SCORE_POINTS, 1.0, late)
+
+    # The set's time is its last answer's
+    points, credit, seconds = score_question(frozenset({1, 2}), {1: 3, 2: 6})
+    assert (credit, seconds) == (1.0, 6)
+    assert SCORE_POINTS < points < full
+    points, credit, _ = score_question(frozenset({1, 2}), {1: 0})
+    assert (points, credit) == (round(full / 2), 0.5)
+
+    assert score_question(frozenset({1}), {2: 4}) == (0, 0.0, 4)
+    assert score_question(frozenset({1}), {}) == (0, 0.0, 0)
+
+
+def test_difficulty_multipliers():
+    assert difficulty_multiplier("easy") == 1.0
+    assert difficulty_multiplier("Medium") == 1.5
+    assert difficulty_multiplier("hard") == 2.0
+    assert difficulty_multiplier(None) == difficulty_multiplier("unknown") == 1.0
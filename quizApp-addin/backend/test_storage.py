@@ -0,0 +1,473 @@
+"""
+Conformance tests every storage backend must pass
+
+    python -m pytest -q test_storage.py                  # memory + sqlite
+    TEST_POSTGRES=1 python -m pytest -q test_storage.py  # + Postgres from .env
+
+The Postgres run writes to the configured database; point .env at a
+development database.
+"""
+
+import os
+import uuid
+
+import pytest
+
+from storage import (
+    create_storage,
+    SESSION_NOT_FOUND,
+    SESSION_NOT_ACTIVE,
+    QUESTION_NOT_OPEN,
+    NO_MORE_QUESTIONS,
+)
+
+BACKENDS = ["memory", "sqlite"]
+if os.getenv("TEST_POSTGRES") == "1":
+    BACKENDS.append("postgres")
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, tmp_path):
+    if request.param == "postgres":
+        from database import DB_CONFIG
+        backend = create_storage("postgres", config=DB_CONFIG)
+        assert backend.ensure_schema()
+    else:
+        backend = create_storage(request.param, path=str(tmp_path / "quiz.sqlite3"))
+    return backend
+
+
+def unique(prefix):
+    return f"{prefix}_{uuid.uuid4().hex[:8]}"
+
+
+def make_teacher(store):
+    name = unique("t")
+    teacher_id, error = store.create_teacher(name, f"{name}@example.com", "secret")
+    assert error is None
+    return teacher_id, f"{name}@example.com"
+
+
+def make_quiz(store, teacher_id, correct=(0,), num_choices=4, has_correct=True):
+    quiz_id, error = store.create_quiz(teacher_id, "Capitals", num_choices, len(correct) > 1,
+                                       has_correct, False, False, False, None, 'easy')
+    assert error is None
+    question_id, error = store.add_question(quiz_id, "Pick the capital")
+    assert error is None
+    ok, error = store.add_answers(question_id, [
+        {'text': f"Choice {i}", 'order': i, 'is_correct': i in correct}
+        for i in range(num_choices)])
+    assert ok and error is None
+    answer_ids = [a['answer_id'] for a in store.get_quiz_details(quiz_id)['answers']]
+    return quiz_id, question_id, answer_ids
+
+
+def make_session(store, quiz_id):
+    class_code = uuid.uuid4().hex[:6].upper()
+    session_id, error = store.create_quiz_session(quiz_id, class_code, 30)
+    assert error is None
+    return session_id, class_code
+
+
+def test_teacher_accounts(store):
+    teacher_id, email = make_teacher(store)
+    teacher = store.authenticate_teacher(email, "secret")
+    assert teacher['teacher_id'] == teacher_id
+    assert teacher['email'] == email
+    assert store.authenticate_teacher(email, "wrong") is None
+
+    username = teacher['username']
+    assert store.create_teacher(username, unique("x") + "@example.com", "pw") == \
+        (None, "Email or username already exists")
+    assert store.create_teacher(unique("x"), email, "pw") == \
+        (None, "Email or username already exists")
+
+
+def test_quiz_details(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, question_id, answer_ids = make_quiz(store, teacher_id, correct=(1, 3))
+
+    details = store.get_quiz_details(quiz_id)
+    assert details['quiz']['title'] == "Capitals"
+    assert details['quiz']['allow_multiple'] is True
+    assert details['quiz']['correct_count'] == 2
+    assert details['quiz']['quiz_difficulty'] == 'easy'
+    assert details['question']['question_id'] == question_id
+    assert [a['answer_order'] for a in details['answers']] == [0, 1, 2, 3]
+    assert [a['is_correct'] for a in details['answers']] == [False, True, False, True]
+    assert store.get_quiz_details(10 ** 9) is None
+
+
+def test_duplicate_answer_order_is_rejected(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, question_id, _ = make_quiz(store, teacher_id)
+    ok, error = store.add_answers(question_id, [{'text': "Again", 'order': 0, 'is_correct': False}])
+    assert not ok and error
+    assert len(store.get_quiz_details(quiz_id)['answers']) == 4
+
+
+def test_sessions_and_codes(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, _, _ = make_quiz(store, teacher_id)
+    session_id, class_code = make_session(store, quiz_id)
+
+    session = store.get_session_by_code(class_code)
+    assert session['session_id'] == session_id
+    assert session['quiz_id'] == quiz_id
+    assert session['title'] == "Capitals"
+    assert session['status'] == 'active'
+    assert store.get_session_by_code("NOPE00") is None
+
+    info = store.get_session_info(session_id)
+    assert info['class_code'] == class_code
+    assert info['auto_close_minutes'] == 30
+    assert info['started_at'] is not None
+
+    assert store.create_quiz_session(quiz_id, class_code) == (None, "Class code already exists")
+
+    second_id, _ = make_session(store, quiz_id)
+    assert [s['session_id'] for s in store.get_quiz_sessions(quiz_id)] == [second_id, session_id]
+    assert store.get_quiz_sessions(10 ** 9) == []
+
+
+def test_single_select_grading(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, question_id, answer_ids = make_quiz(store, teacher_id, correct=(0,))
+    session_id, _ = make_session(store, quiz_id)
+
+    alice, _ = store.add_student_to_session(session_id, "Alice")
+    bob, _ = store.add_student_to_session(session_id, "Bob")
+    store.add_student_to_session(session_id, "Carol")
+    assert store.submit_answer(alice, session_id, question_id, answer_ids[0], 4) == (True, None)
+    assert store.submit_answer(bob, session_id, question_id, answer_ids[2], 6) == (True, None)
+
+    results = store.get_session_results(session_id)
+    assert results['participant_count'] == 3
+    assert [r['count'] for r in results['results']] == [1, 0, 1, 0]
+    assert [r['is_correct'] for r in results['results']] == [True, False, False, False]
+
+    responses = store.get_student_responses(session_id)
+    assert responses['total_students'] == 3
+    assert responses['total_responses'] == 2
+    assert [(r['student_name'], r['answer_text'], r['is_correct'])
+            for r in responses['students']] == [
+        ("Alice", "Choice 0", True), ("Bob", "Choice 2", False), ("Carol", "Not submitted", False)]
+
+    stats = store.get_session_statistics(session_id)
+    assert stats['participant_count'] == 3
+    assert stats['responded_count'] == 2
+    assert stats['correct_count'] == 1
+    assert stats['response_rate'] == 66.7
+    assert stats['accuracy'] == 50.0
+    assert stats['has_correct'] is True
+    assert 0 <= stats['elapsed_seconds'] < 60
+
+
+def test_multi_select_grading(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, question_id, answer_ids = make_quiz(store, teacher_id, correct=(0, 2))
+    session_id, _ = make_session(store, quiz_id)
+
+    exact, _ = store.add_student_to_session(session_id, "Exact")
+    partial, _ = store.add_student_to_session(session_id, "Partial")
+    extra, _ = store.add_student_to_session(session_id, "Extra")
+
+    store.submit_answer(exact, session_id, question_id, answer_ids[0], 3)
+    store.submit_answer(exact, session_id, question_id, answer_ids[2], 3)
+    store.submit_answer(partial, session_id, question_id, answer_ids[0], 3)
+    for index in (0, 2, 3):
+        store.submit_answer(extra, session_id, question_id, answer_ids[index], 3)
+
+    stats = store.get_session_statistics(session_id)
+    assert stats['responded_count'] == 3
+    assert stats['correct_count'] == 1
+    assert stats['accuracy'] == 33.3
+
+    # The exact answer set is 2 correct rows; nothing else counts
+    summary = store.get_teacher_summary(teacher_id)
+    assert summary['answers_collected'] == 6
+    assert summary['correct_answers'] == 2
+
+
+def test_session_answers(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, question_id, answer_ids = make_quiz(store, teacher_id, correct=(0, 2))
+    session_id, _ = make_session(store, quiz_id)
+
+    alice, _ = store.add_student_to_session(session_id, "Alice")
+    bob, _ = store.add_student_to_session(session_id, "Bob")
+    assert store.submit_answer(alice, session_id, question_id, answer_ids[0], 4) == (True, None)
+    assert store.submit_answer(alice, session_id, question_id, answer_ids[2], 7) == (True, None)
+
+    rows = store.get_session_answers(session_id)
+    assert [(r['student_id'], r['student_name'], r['question_id'], r['answer_id'],
+             r['time_taken_seconds']) for r in rows] == [
+        (alice, "Alice", question_id, answer_ids[0], 4),
+        (alice, "Alice", question_id, answer_ids[2], 7),
+        (bob, "Bob", None, None, None)]
+    assert store.get_session_answers(10 ** 9) == []
+
+
+def test_statistics_without_correct_answers(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, question_id, answer_ids = make_quiz(store, teacher_id, correct=(), has_correct=False)
+    session_id, _ = make_session(store, quiz_id)
+    student, _ = store.add_student_to_session(session_id, "Poll")
+    store.submit_answer(student, session_id, question_id, answer_ids[1], 2)
+
+    stats = store.get_session_statistics(session_id)
+    assert stats['has_correct'] is False
+    assert stats['accuracy'] is None
+    assert stats['response_rate'] == 100.0
+    assert store.get_session_statistics(10 ** 9) is None
+
+
+def test_versions_and_close(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, question_id, answer_ids = make_quiz(store, teacher_id)
+    session_id, class_code = make_session(store, quiz_id)
+    active_before = store.count_active_sessions()
+
+    versions = [store.get_session_version(session_id)]
+    student, _ = store.add_student_to_session(session_id, "Dana")
+    versions.append(store.get_session_version(session_id))
+    store.submit_answer(student, session_id, question_id, answer_ids[0], 1)
+    versions.append(store.get_session_version(session_id))
+    assert store.close_session(session_id) is True
+    versions.append(store.get_session_version(session_id))
+    assert versions == sorted(set(versions))
+    # Closed sessions take no more answers, whatever the caller's clock says
+    assert store.submit_answer(student, session_id, question_id, answer_ids[1], 2) == \
+        (False, SESSION_NOT_ACTIVE)
+    assert store.get_session_version(session_id) == versions[-1]
+
+    assert store.get_session_by_code(class_code)['status'] == 'closed'
+    assert store.get_quiz_sessions(quiz_id)[0]['closed_at'] is not None
+    assert store.count_active_sessions() == active_before - 1
+    assert store.get_session_version(10 ** 9) is None
+
+
+def test_session_snapshot(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, question_id, answer_ids = make_quiz(store, teacher_id)
+    session_id, class_code = make_session(store, quiz_id)
+    student, _ = store.add_student_to_session(session_id, "Finn")
+    store.submit_answer(student, session_id, question_id, answer_ids[0], 2)
+
+    snapshot = store.get_session_snapshot(session_id)
+    assert snapshot['session']['class_code'] == class_code
+    assert snapshot['session']['results_version'] == store.get_session_version(session_id)
+    assert snapshot['results'] == store.get_session_results(session_id)
+    assert snapshot['students'] == store.get_student_responses(session_id)
+    assert snapshot['stats']['correct_count'] == 1
+
+    partial = store.get_session_snapshot(session_id, ('stats',))
+    assert set(partial) == {'session', 'stats'}
+    assert store.get_session_snapshot(10 ** 9) is None
+
+
+def test_results_of_several_sessions(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, question_id, answer_ids = make_quiz(store, teacher_id)
+    first, _ = make_session(store, quiz_id)
+    second, _ = make_session(store, quiz_id)
+    student, _ = store.add_student_to_session(first, "Gus")
+    store.submit_answer(student, first, question_id, answer_ids[1], 3)
+
+    batch = store.get_sessions_results([first, second, first, 10 ** 9])
+    assert set(batch) == {first, second}
+    for session_id in (first, second):
+        single = store.get_session_results(session_id)
+        assert batch[session_id]['results'] == single['results']
+        assert batch[session_id]['participant_count'] == single['participant_count']
+        assert batch[session_id]['results_version'] == store.get_session_version(session_id)
+        assert batch[session_id]['current_question_id'] == question_id
+        assert batch[session_id]['status'] == 'active'
+    assert [r['count'] for r in batch[first]['results']] == [0, 1, 0, 0]
+
+    # Sessions still at the version the caller holds come without results
+    known = {first: batch[first]['results_version'], second: -1}
+    again = store.get_sessions_results([first, second], known)
+    assert again[first]['results'] is None
+    assert again[second]['results'] == batch[second]['results']
+    assert store.get_sessions_results([]) == {}
+
+
+def test_join_session_by_code(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, question_id, answer_ids = make_quiz(store, teacher_id, correct=(1, 2))
+    session_id, class_code = make_session(store, quiz_id)
+    version = store.get_session_version(session_id)
+
+    joined, error = store.join_session_by_code(class_code, "Ada")
+    assert error is None
+    assert joined['session']['session_id'] == session_id
+    assert joined['session']['quiz_id'] == quiz_id
+    assert joined['session']['status'] == 'active'
+    # Same quiz payload as get_quiz_details()
+    details = store.get_quiz_details(quiz_id)
+    for part in ('quiz', 'question', 'answers'):
+        assert joined[part] == details[part]
+    assert joined['quiz']['allow_multiple'] is True
+    assert [a['answer_id'] for a in joined['answers']] == answer_ids
+
+    assert store.get_session_version(session_id) == version + 1
+    assert store.get_student_responses(session_id)['total_students'] == 1
+    assert store.get_teacher_summary(teacher_id)['students_reached'] == 1
+    assert store.submit_answer(joined['student_id'], session_id, question_id,
+                               answer_ids[1], 3) == (True, None)
+
+    assert store.join_session_by_code("NOPE00", "Ada") == (None, SESSION_NOT_FOUND)
+    assert store.close_session(session_id)
+    assert store.join_session_by_code(class_code, "Late") == (None, SESSION_NOT_ACTIVE)
+    assert store.get_student_responses(session_id)['total_students'] == 1
+
+
+def test_batched_joins(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, _, _ = make_quiz(store, teacher_id)
+    open_id, open_code = make_session(store, quiz_id)
+    closed_id, closed_code = make_session(store, quiz_id)
+    assert store.close_session(closed_id)
+    version = store.get_session_version(open_id)
+
+    names = [f"Student {i}" for i in range(5)]
+    joins = [(open_code, names[0]), ("NOPE00", "Ghost"), (open_code, names[1]),
+             (closed_code, "Late"), (open_code, names[2])]
+    outcomes = store.join_sessions_by_code(joins)
+    assert [error for _, error in outcomes] == \
+        [None, SESSION_NOT_FOUND, None, SESSION_NOT_ACTIVE, None]
+    joined = [payload for payload, _ in outcomes if payload]
+    assert len({p['student_id'] for p in joined}) == 3
+    assert all(p['session']['session_id'] == open_id for p in joined)
+    assert joined[0]['answers'] == store.get_quiz_details(quiz_id)['answers']
+    assert store.get_session_version(open_id) > version
+
+    # Ids come back in the order the joins were given
+    outcomes = store.add_students([(open_id, names[3]), (10 ** 6, "Ghost"), (open_id, names[4])])
+    assert outcomes[1] == (None, SESSION_NOT_FOUND)
+    student_ids = [p['student_id'] for p in joined] + [outcomes[0][0], outcomes[2][0]]
+    responses = store.get_student_responses(open_id)
+    assert [(s['student_id'], s['student_name']) for s in responses['students']] == \
+        sorted(zip(student_ids, names))
+    assert store.get_teacher_summary(teacher_id)['students_reached'] == 5
+    assert store.get_student_responses(closed_id)['total_students'] == 0
+
+
+def test_multi_question_sessions(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, first_id, first_answers = make_quiz(store, teacher_id, correct=(0,))
+    second_id, error = store.add_question(quiz_id, "Pick the river")
+    assert error is None
+    assert store.add_answers(second_id, [
+        {'text': f"River {i}", 'order': i, 'is_correct': i in (1, 2)} for i in range(3)]) == \
+        (True, None)
+
+    details = store.get_quiz_details(quiz_id)
+    assert [q['question_id'] for q in details['questions']] == [first_id, second_id]
+    assert details['question']['question_id'] == first_id
+    assert details['questions'][1]['allow_multiple'] is True
+    second_answers = [a['answer_id'] for a in details['questions'][1]['answers']]
+    assert len(second_answers) == 3
+
+    session_id, class_code = make_session(store, quiz_id)
+    joined, _ = store.join_session_by_code(class_code, "Ada")
+    student_id = joined['student_id']
+    assert joined['session']['current_question_id'] == first_id
+    assert joined['questions'] == details['questions']
+
+    # Only the open question takes answers
+    assert store.submit_answer(student_id, session_id, second_id, second_answers[1], 1) == \
+        (False, QUESTION_NOT_OPEN)
+    assert store.submit_answer(student_id, session_id, first_id, first_answers[0], 1) == \
+        (True, None)
+
+    version = store.get_session_version(session_id)
+    assert store.advance_question(session_id) == (second_id, None)
+    assert store.get_session_version(session_id) == version + 1
+    assert store.get_session_info(session_id)['current_question_id'] == second_id
+    assert store.submit_answer(student_id, session_id, first_id, first_answers[1], 1) == \
+        (False, QUESTION_NOT_OPEN)
+
+    # Tallies are per question
+    stats = store.get_session_statistics(session_id)
+    assert (stats['responded_count'], stats['correct_count']) == (0, 0)
+    assert sum(r['count'] for r in store.get_session_results(session_id)['results']) == 0
+    for answer_id in second_answers[1:]:
+        assert store.submit_answer(student_id, session_id, second_id, answer_id, 2) == \
+            (True, None)
+    stats = store.get_session_statistics(session_id)
+    assert (stats['responded_count'], stats['correct_count']) == (1, 1)
+    assert [r['count'] for r in store.get_session_results(session_id)['results']] == [0, 1, 1]
+    assert [r['count'] for r in store.get_session_results(session_id, first_id)['results']] == \
+        [1, 0, 0, 0]
+    responses = store.get_student_responses(session_id)
+    assert responses['total_responses'] == 2
+    assert [s['answer_text'] for s in responses['students']] == ["River 1", "River 2"]
+
+    assert store.advance_question(session_id) == (None, NO_MORE_QUESTIONS)
+    assert store.advance_question(session_id, first_id) == (first_id, None)
+    assert store.advance_question(session_id, 10 ** 6)[0] is None
+    assert store.close_session(session_id)
+    assert store.advance_question(session_id) == (None, SESSION_NOT_ACTIVE)
+    assert store.advance_question(10 ** 6) == (None, SESSION_NOT_FOUND)
+
+
+def test_auto_close_sessions(store):
+    teacher_id, _ = make_teacher(store)
+    quiz_id, _, _ = make_quiz(store, teacher_id)
+    timed, _ = make_session(store, quiz_id)
+    untimed, error = store.create_quiz_session(quiz_id, uuid.uuid4().hex[:6].upper(), 0)
+    assert error is None
+
+    rows = store.get_auto_close_sessions(timed)
+    assert [(r['session_id'], r['auto_close_minutes']) for r in rows] == [(timed, 30)]
+    assert rows[0]['started_at'] is not None
+    assert store.get_auto_close_sessions(untimed) == []
+    assert timed in [r['session_id'] for r in store.get_auto_close_sessions()]
+
+    # Without a session override the quiz's close_submission_after applies
+    timed_quiz, error = store.create_quiz(teacher_id, "Timed", 2, False, True, False,
+                                          False, False, 7, 'easy')
+    inherited, error = store.create_quiz_session(timed_quiz, uuid.uuid4().hex[:6].upper())
+    assert error is None
+    assert [r['auto_close_minutes'] for r in store.get_auto_close_sessions(inherited)] == [7]
+
+    store.close_session(timed)
+    assert store.get_auto_close_sessions(timed) == []
+
+
+def test_teacher_summary_and_quizzes(store):
+    teacher_id, _ = make_teacher(store)
+    empty = store.get_teacher_summary(teacher_id)
+    assert empty['quiz_count'] == 0
+    assert empty['average_accuracy'] == 0.0
+    assert empty['recent_quizzes'] == []
+
+    first_quiz, question_id, answer_ids = make_quiz(store, teacher_id)
+    second_quiz, _, _ = make_quiz(store, teacher_id)
+    session_id, _ = make_session(store, first_quiz)
+    make_session(store, first_quiz)
+    student, _ = store.add_student_to_session(session_id, "Eve")
+    store.submit_answer(student, session_id, question_id, answer_ids[0], 5)
+
+    summary = store.get_teacher_summary(teacher_id, recent_limit=1)
+    assert summary['quiz_count'] == 2
+    assert summary['session_count'] == 2
+    assert summary['students_reached'] == 1
+    assert summary['answers_collected'] == 1
+    assert summary['correct_answers'] == 1
+    assert summary['average_accuracy'] == 100.0
+    assert [q['quiz_id'] for q in summary['recent_quizzes']] == [second_quiz]
+
+    quizzes = store.get_teacher_quizzes(teacher_id)
+    assert [(q['quiz_id'], q['session_count']) for q in quizzes] == \
+        [(second_quiz, 0), (first_quiz, 2)]
+
+
+def test_sqlite_persists_between_instances(tmp_path):
+    path = str(tmp_path / "persist.sqlite3")
+    teacher_id, _ = make_teacher(create_storage("sqlite", path=path))
+    assert create_storage("sqlite", path=path).get_teacher_summary(teacher_id)['quiz_count'] == 0
+    with create_storage("sqlite", path=path).connect() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()['journal_mode'] == 'wal'
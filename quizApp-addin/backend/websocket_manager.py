@@ -1,6 +1,9 @@
 from fastapi import WebSocket
 from typing import Dict, List
 import json
+import logging
+
+logger = logging.getLogger("classpoint.websocket")
 
 class ConnectionManager:
     def __init__(self):
@@ -12,12 +15,13 @@ class ConnectionManager:
         if session_id not in self.active_connections:
             self.active_connections[session_id] = []
         self.active_connections[session_id].append(websocket)
-        print(f"Client connected to session {session_id}")
+        logger.info("Client connected", extra={"event": "client_connected", "session_id": session_id})
 
     def disconnect(self, websocket: WebSocket, session_id: int):
         if session_id in self.active_connections:
             self.active_connections[session_id].remove(websocket)
-            print(f"Client disconnected from session {session_id}")
+            logger.info("Client disconnected",
+                        extra={"event": "client_disconnected", "session_id": session_id})
 
     async def broadcast_to_session(self, session_id: int, message: dict):
         """Send message to all connected clients in a session"""
@@ -27,7 +31,8 @@ class ConnectionManager:
                 try:
                     await connection.send_json(message)
                 except Exception as e:
-                    print(f"Error sending message: {e}")
+                    logger.warning("Error sending message: %s", e,
+                                   extra={"event": "broadcast_failed", "session_id": session_id})
                     dead_connections.append(connection)
             
             # Remove dead connections
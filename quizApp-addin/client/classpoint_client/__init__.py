@@ -0,0 +1,24 @@
+"""
+Python client for the ClassPoint Quiz backend API
+
+    from classpoint_client import ApiClient
+
+    api = ApiClient("http://localhost:8000")
+    session = api.get_session_by_code("ABC123")
+
+AsyncApiClient (needs httpx) offers the same methods as coroutines.
+"""
+
+from ._common import DEFAULT_BASE_URL, ApiError, ETagCache, RetryPolicy
+from .client import ApiClient
+
+__all__ = ["ApiClient", "AsyncApiClient", "ApiError", "ETagCache", "RetryPolicy",
+           "DEFAULT_BASE_URL"]
+
+
+def __getattr__(name):
+    # httpx is optional, so the async client is only imported when asked for
+    if name == "AsyncApiClient":
+        from .async_client import AsyncApiClient
+        return AsyncApiClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,301 @@
+"""
+Pieces shared by the sync and async clients: errors, retry policy, the ETag
+cache and the endpoint methods themselves
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+import json
+import os
+import random
+
+DEFAULT_BASE_URL = os.getenv("CLASSPOINT_API_URL", "http://localhost:8000")
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10.0
+# Server hint for when to poll again, copied into dict responses as 'next_poll_ms'
+NEXT_POLL_HEADER = "X-Next-Poll-Ms"
+
+
+class ApiError(Exception):
+    """Request failed: an error status, or no response at all (status_code None)"""
+
+    def __init__(self, message, status_code=None, detail=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.detail = detail if detail is not None else message
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter
+
+    GETs are retried on transport errors and 502/503/504. Other methods are
+    only retried when the request provably never reached the server, or the
+    server rejected it unprocessed (429, or 503 with Retry-After).
+    """
+
+    def __init__(self, attempts=3, backoff=0.2, max_backoff=2.0, max_retry_after=5.0):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def retry_error(self, method, attempt, not_sent):
+        """Seconds to wait before retrying a transport error, or None"""
+        if attempt + 1 >= self.attempts or not (method == "GET" or not_sent):
+            return None
+        return self.delay(attempt)
+
+    def retry_status(self, method, attempt, status, retry_after_header):
+        """Seconds to wait before retrying an error status, or None"""
+        if attempt + 1 >= self.attempts:
+            return None
+        retry_after = parse_retry_after(retry_after_header)
+        if status == 429 or (status == 503 and retry_after is not None):
+            return self.delay(attempt, retry_after)
+        if method == "GET" and status in (502, 503, 504):
+            return self.delay(attempt)
+        return None
+
+
+def parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class ETagCache:
+    """Bounded LRU of GET bodies keyed by URL, revalidated with If-None-Match"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+
+    def lookup(self, key):
+        """(etag, body) stored for key, or (None, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key, etag, body):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+
+def clean_params(params):
+    """Drop unset query parameters and spell booleans the way FastAPI expects"""
+    if not params:
+        return None
+    return {k: ("true" if v else "false") if isinstance(v, bool) else v
+            for k, v in params.items() if v is not None}
+
+
+def cache_key(path, params):
+    return f"{path}?{urlencode(sorted(params.items()))}" if params else path
+
+
+def decode(body):
+    return json.loads(body) if body else None
+
+
+def next_poll_ms(headers):
+    """The server's X-Next-Poll-Ms hint, or None"""
+    try:
+        return max(0, int(headers.get(NEXT_POLL_HEADER)))
+    except (TypeError, ValueError):
+        return None
+
+
+def with_poll_hint(value, headers):
+    """Add the server's poll hint to a dict response as 'next_poll_ms'"""
+    hint = next_poll_ms(headers)
+    if hint is not None and isinstance(value, dict):
+        value["next_poll_ms"] = hint
+    return value
+
+
+def finish(method, path, status, headers, body, key, cached_body, etags, none_on):
+    """Turn a final response into a return value or an ApiError"""
+    if status == 304 and cached_body is not None:
+        etags.hit()
+        return with_poll_hint(decode(cached_body), headers)
+    if status in none_on:
+        return None
+    if status >= 400:
+        try:
+            detail = decode(body).get("detail")
+        except (ValueError, AttributeError):
+            detail = None
+        raise ApiError(f"{method} {path} returned {status}: {detail or ''}".rstrip(": "),
+                       status_code=status, detail=detail)
+    etag = headers.get("ETag")
+    if key is not None and etag:
+        etags.store(key, etag, body)
+    return with_poll_hint(decode(body), headers)
+
+
+class Endpoints:
+    """The backend API, one method per endpoint
+
+    Subclasses provide `_request(method, path, params, json, none_on)`; with
+    the async client every method returns an awaitable of the same value.
+    Lookups return None when the server answers 404. Poll responses carry
+    'next_poll_ms': poll again no sooner than that.
+    """
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    # Teachers
+    def register_teacher(self, username: str, email: str, password: str):
+        """Returns {'teacher_id', 'username', 'email'}; ApiError(400) if taken"""
+        return self._request("POST", "/api/auth/register",
+                             json={"username": username, "email": email, "password": password})
+
+    def login(self, email: str, password: str):
+        """Returns {'teacher_id', 'username', 'email'} or None for bad credentials"""
+        return self._request("POST", "/api/auth/login",
+                             json={"email": email, "password": password}, none_on=(401,))
+
+    def get_teacher_quizzes(self, teacher_id: int):
+        return self._request("GET", f"/api/teacher/{teacher_id}/quizzes")
+
+    def get_teacher_summary(self, teacher_id: int, recent: int = 5):
+        return self._request("GET", f"/api/teacher/{teacher_id}/summary",
+                             params={"recent": recent})
+
+    # Quizzes
+    def create_quiz(self, teacher_id: int, title: str, question_text: str,
+                    answers: List[Dict[str, Any]], num_choices: Optional[int] = None,
+                    allow_multiple: bool = False, has_correct: bool = True,
+                    quiz_mode: str = "easy", start_with_slide: bool = True,
+                    minimize_window: bool = False, auto_close_minutes: int = 1,
+                    more_questions: Optional[List[Dict[str, Any]]] = None):
+        """`answers` is a list of {'text', 'order', 'is_correct'}; `more_questions`
+        adds {'question_text', 'answers'} asked after the first. Returns
+        {'quiz_id', 'question_id'} of the first question."""
+        return self._request("POST", "/api/quiz/create", params={
+            "teacher_id": teacher_id,
+            "title": title,
+            "question_text": question_text,
+            "num_choices": num_choices or len(answers),
+            "allow_multiple": allow_multiple,
+            "has_correct": has_correct,
+            "quiz_mode": quiz_mode,
+            "start_with_slide": start_with_slide,
+            "minimize_window": minimize_window,
+            "auto_close_minutes": auto_close_minutes,
+        }, json={"answers": list(answers), "questions": list(more_questions or [])})
+
+    def get_quiz(self, quiz_id: int):
+        """Returns {'quiz', 'question', 'answers'}"""
+        return self._request("GET", f"/api/quiz/{quiz_id}", none_on=(404,))
+
+    def get_quiz_sessions(self, quiz_id: int):
+        return self._request("GET", f"/api/quiz/{quiz_id}/sessions")
+
+    # Sessions
+    def start_session(self, quiz_id: int, auto_close_minutes: Optional[int] = None):
+        """Returns {'session_id', 'class_code', 'status', 'deadline'}"""
+        return self._request("POST", "/api/session/start", json={
+            "quiz_id": quiz_id, "override_auto_close_minutes": auto_close_minutes})
+
+    def get_session_by_code(self, class_code: str):
+        return self._request("GET", f"/api/session/code/{class_code}", none_on=(404,))
+
+    def get_session_info(self, session_id: int):
+        return self._request("GET", f"/api/session/{session_id}/info", none_on=(404,))
+
+    def get_session_results(self, session_id: int, question_id: Optional[int] = None):
+        """Results of the open question, or of `question_id`"""
+        params = {"question_id": question_id} if question_id is not None else None
+        return self._request("GET", f"/api/session/{session_id}/results", params=params,
+                             none_on=(404,))
+
+    def get_sessions_results(self, session_ids: List[int],
+                             known_versions: Optional[Dict[int, int]] = None):
+        """Results of several sessions in one request. Returns {'sessions': {'<id>':
+        results with 'results_version'}, 'unchanged': [ids], 'missing': [ids]};
+        sessions still at their `known_versions` entry are only listed as unchanged."""
+        known_versions = known_versions or {}
+        ids = ",".join(f"{i}:{known_versions[i]}" if i in known_versions else str(i)
+                       for i in session_ids)
+        return self._request("GET", "/api/sessions/results", params={"ids": ids})
+
+    def get_session_stats(self, session_id: int):
+        return self._request("GET", f"/api/session/{session_id}/stats", none_on=(404,))
+
+    def get_session_snapshot(self, session_id: int, sections: Optional[List[str]] = None):
+        """Returns {'session', 'results', 'stats', 'students'} from one read;
+        `sections` picks a subset of the last three"""
+        params = {"sections": ",".join(sections)} if sections is not None else None
+        return self._request("GET", f"/api/session/{session_id}/snapshot", params=params,
+                             none_on=(404,))
+
+    def get_leaderboard(self, session_id: int, limit: Optional[int] = None,
+                        student_id: Optional[int] = None):
+        """Returns {'session_id', 'entries', 'total_students'} for a competition-mode
+        session, plus 'student' (their own entry) when `student_id` is given"""
+        params = {k: v for k, v in (("limit", limit), ("student_id", student_id))
+                  if v is not None}
+        return self._request("GET", f"/api/session/{session_id}/leaderboard",
+                             params=params or None, none_on=(404, 409))
+
+    def get_session_grades(self, session_id: int):
+        """Returns {'session_id', 'status', 'quiz_mode', 'multiplier', 'question_count',
+        'students', 'questions'}; students are ranked by score over the whole quiz"""
+        return self._request("GET", f"/api/session/{session_id}/grades", none_on=(404,))
+
+    def get_student_responses(self, session_id: int):
+        return self._request("GET", f"/api/session/{session_id}/student-responses",
+                             none_on=(404,))
+
+    def advance_question(self, session_id: int, question_id: Optional[int] = None):
+        """Open the next question (or `question_id`); returns the pushed
+        {'question_index', 'question_count', 'question'} event. ApiError(400)
+        when there are no more questions."""
+        params = {"question_id": question_id} if question_id is not None else None
+        return self._request("POST", f"/api/session/{session_id}/advance", params=params)
+
+    def close_session(self, session_id: int):
+        return self._request("POST", f"/api/session/{session_id}/close")
+
+    # Students
+    def join_session(self, session_id: int, student_name: str):
+        """Returns {'student_id'}"""
+        return self._request("POST", "/api/student/join",
+                             params={"session_id": session_id, "student_name": student_name})
+
+    def join_by_code(self, class_code: str, student_name: str):
+        """Register by class code in one round trip; returns {'student_id', 'session',
+        'quiz', 'question', 'answers', 'server_time'}. ApiError(404) for an unknown
+        code, ApiError(409) when the session is closed."""
+        return self._request("POST", "/api/student/join-by-code",
+                             params={"class_code": class_code, "student_name": student_name})
+
+    def submit_answer(self, student_id: int, session_id: int, question_id: int,
+                      answer_id: int, time_taken: int = 0):
+        return self._request("POST", "/api/student/answer", params={
+            "student_id": student_id, "session_id": session_id, "question_id": question_id,
+            "answer_id": answer_id, "time_taken": time_taken})
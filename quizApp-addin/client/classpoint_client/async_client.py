@@ -0,0 +1,74 @@
+"""
+asyncio client over one pooled httpx.AsyncClient (pip install classpoint-client[async])
+"""
+
+import asyncio
+
+import httpx
+
+from ._common import (
+    DEFAULT_BASE_URL,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    ApiError,
+    Endpoints,
+    ETagCache,
+    RetryPolicy,
+    cache_key,
+    clean_params,
+    finish,
+)
+
+
+class AsyncApiClient(Endpoints):
+    """Same methods as ApiClient; each returns an awaitable
+
+        async with AsyncApiClient() as api:
+            results = await api.get_session_results(session_id)
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, pool_size=20, retry=None,
+                 etag_cache_size=256):
+        self.base_url = base_url.rstrip("/")
+        self.retry = retry or RetryPolicy()
+        self.etags = ETagCache(etag_cache_size)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size,
+                                max_keepalive_connections=pool_size))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def _request(self, method, path, params=None, json=None, none_on=()):
+        params = clean_params(params)
+        key = cache_key(path, params) if method == "GET" else None
+        etag, cached_body = self.etags.lookup(key) if key else (None, None)
+        headers = {"If-None-Match": etag} if etag else None
+
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, path, params=params,
+                                                     json=json, headers=headers)
+            except httpx.HTTPError as e:
+                not_sent = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                wait = self.retry.retry_error(method, attempt, not_sent)
+                if wait is None:
+                    raise ApiError(f"{method} {path} failed: {e}") from e
+            else:
+                wait = self.retry.retry_status(method, attempt, response.status_code,
+                                               response.headers.get("Retry-After"))
+                if wait is None:
+                    return finish(method, path, response.status_code, response.headers,
+                                  response.content, key, cached_body, self.etags, none_on)
+            await asyncio.sleep(wait)
+            attempt += 1
@@ -0,0 +1,84 @@
+"""
+Synchronous client over one pooled, keep-alive requests.Session
+"""
+
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from ._common import (
+    DEFAULT_BASE_URL,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    ApiError,
+    Endpoints,
+    ETagCache,
+    RetryPolicy,
+    cache_key,
+    clean_params,
+    finish,
+)
+
+
+def _not_sent(exc):
+    """True when the request failed before any byte reached the server"""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(exc, requests.exceptions.ConnectionError) and \
+        isinstance(reason, NewConnectionError)
+
+
+class ApiClient(Endpoints):
+    """Thread-safe client for the backend API
+
+    Create one per process and share it (e.g. with st.cache_resource) so
+    every caller reuses the same connection pool and ETag cache.
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, pool_size=20, retry=None,
+                 etag_cache_size=256):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.retry = retry or RetryPolicy()
+        self.etags = ETagCache(etag_cache_size)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _request(self, method, path, params=None, json=None, none_on=()):
+        params = clean_params(params)
+        key = cache_key(path, params) if method == "GET" else None
+        etag, cached_body = self.etags.lookup(key) if key else (None, None)
+        headers = {"If-None-Match": etag} if etag else None
+
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, self.base_url + path, params=params,
+                                                json=json, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                wait = self.retry.retry_error(method, attempt, _not_sent(e))
+                if wait is None:
+                    raise ApiError(f"{method} {path} failed: {e}") from e
+            else:
+                wait = self.retry.retry_status(method, attempt, response.status_code,
+                                               response.headers.get("Retry-After"))
+                if wait is None:
+                    return finish(method, path, response.status_code, response.headers,
+                                  response.content, key, cached_body, self.etags, none_on)
+            time.sleep(wait)
+            attempt += 1
@@ -0,0 +1,172 @@
+"""
+Tests for the API clients: retries, Retry-After, the ETag cache and poll hints
+
+    python -m pytest -q test_client.py
+
+The sync client runs over a scripted requests adapter and the async client
+over an httpx.MockTransport (skipped when httpx is not installed).
+"""
+
+import asyncio
+import io
+import json
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+from classpoint_client import ApiClient, ApiError, ETagCache, RetryPolicy
+from classpoint_client import _common, client as client_module
+
+
+def reply(status, body=None, **headers):
+    """(status, headers, body) of one scripted response; underscores in
+    header names become dashes"""
+    headers = {name.replace("_", "-"): value for name, value in headers.items()}
+    if body is not None:
+        headers.setdefault("Content-Type", "application/json")
+    return status, headers, json.dumps(body).encode() if body is not None else b""
+
+
+class ScriptedAdapter(HTTPAdapter):
+    """Answers each request with the next scripted reply, or raises it"""
+
+    def __init__(self, replies):
+        super().__init__()
+        self.replies = list(replies)
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        scripted = self.replies.pop(0)
+        if isinstance(scripted, Exception):
+            raise scripted
+        status, headers, body = scripted
+        raw = HTTPResponse(body=io.BytesIO(body), headers=headers, status=status,
+                           preload_content=False)
+        return self.build_response(request, raw)
+
+
+def scripted_client(replies, retry=None):
+    api = ApiClient("http://api.test", retry=retry)
+    adapter = ScriptedAdapter(replies)
+    api.session.mount("http://", adapter)
+    return api, adapter
+
+
+def test_retry_policy():
+    policy = RetryPolicy(attempts=3, backoff=0.2, max_backoff=2.0, max_retry_after=5.0)
+    # Full jitter stays within the attempt's backoff
+    assert 0 <= policy.retry_status("GET", 1, 503, None) <= 0.4
+    assert policy.retry_status("GET", 0, 502, None) is not None
+    # Writes are only retried when the server says it did not process them
+    assert policy.retry_status("POST", 0, 503, None) is None
+    assert policy.retry_status("POST", 0, 500, None) is None
+    assert policy.retry_status("POST", 0, 503, "1.5") == 1.5
+    assert policy.retry_status("POST", 0, 429, "30") == 5.0
+    assert policy.retry_status("POST", 0, 429, "soon") is not None
+    assert policy.retry_status("GET", 2, 503, "1") is None
+
+    assert policy.retry_error("GET", 0, not_sent=False) is not None
+    assert policy.retry_error("POST", 0, not_sent=True) is not None
+    assert policy.retry_error("POST", 0, not_sent=False) is None
+    assert policy.retry_error("GET", 2, not_sent=True) is None
+
+    assert _common.parse_retry_after("-3") == 0.0
+    assert _common.parse_retry_after(None) is None
+
+
+def test_poll_hints_and_etag_cache():
+    assert _common.next_poll_ms({"X-Next-Poll-Ms": "250"}) == 250
+    assert _common.next_poll_ms({"X-Next-Poll-Ms": "-5"}) == 0
+    assert _common.next_poll_ms({"X-Next-Poll-Ms": "soon"}) is None
+    assert _common.next_poll_ms({}) is None
+    assert _common.with_poll_hint([1], {"X-Next-Poll-Ms": "250"}) == [1]
+
+    etags = ETagCache(max_entries=2)
+    etags.store("a", '"1"', b"{}")
+    etags.store("b", '"2"', b"{}")
+    assert etags.lookup("a") == ('"1"', b"{}")
+    etags.store("c", '"3"', b"{}")
+    # "b" was the least recently used
+    assert etags.lookup("b") == (None, None)
+    assert etags.lookup("a")[0] == '"1"' and etags.lookup("c")[0] == '"3"'
+    ETagCache(max_entries=0).store("a", '"1"', b"{}")
+
+    assert _common.cache_key("/x", {"b": 2, "a": 1}) == "/x?a=1&b=2"
+    assert _common.clean_params({"a": True, "b": None, "c": 3}) == {"a": "true", "c": 3}
+
+
+def test_sync_client_retries_and_revalidates(monkeypatch):
+    waits = []
+    monkeypatch.setattr(client_module.time, "sleep", waits.append)
+    api, adapter = scripted_client([
+        reply(503),
+        requests.ConnectionError("reset"),
+        reply(200, {"results": []}, ETag='"v1"', X_Next_Poll_Ms="500"),
+        reply(304, X_Next_Poll_Ms="900"),
+    ], retry=RetryPolicy(attempts=3, backoff=0.1))
+
+    assert api.get_session_results(4) == {"results": [], "next_poll_ms": 500}
+    assert len(adapter.sent) == 3 and len(waits) == 2
+    # The cached body comes back on 304, with the new hint
+    assert api.get_session_results(4) == {"results": [], "next_poll_ms": 900}
+    assert adapter.sent[-1].headers["If-None-Match"] == '"v1"'
+    assert api.etags.hits == 1
+
+
+def test_sync_client_retries_writes_only_when_unprocessed(monkeypatch):
+    waits = []
+    monkeypatch.setattr(client_module.time, "sleep", waits.append)
+    api, adapter = scripted_client([
+        reply(503, {"detail": "Server busy"}, Retry_After="2"),
+        reply(200, {"success": True}),
+        reply(503, {"detail": "Server busy"}),
+        reply(404, {"detail": "Session not found"}),
+    ])
+
+    assert api.submit_answer(1, 4, 10, 100) == {"success": True}
+    assert waits == [2.0]
+    with pytest.raises(ApiError) as failure:
+        api.close_session(4)
+    assert failure.value.status_code == 503 and failure.value.detail == "Server busy"
+    assert api.get_session_info(4) is None
+    assert len(adapter.sent) == 4
+
+
+def test_async_client_retries_and_revalidates():
+    httpx = pytest.importorskip("httpx")
+    from classpoint_client import AsyncApiClient
+
+    replies = [
+        reply(503),
+        reply(200, {"results": []}, ETag='"v1"', X_Next_Poll_Ms="500"),
+        reply(304, X_Next_Poll_Ms="900"),
+        reply(429, {"detail": "Too many requests"}, Retry_After="1"),
+        reply(200, {"success": True}),
+    ]
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        status, headers, body = replies.pop(0)
+        return httpx.Response(status, headers=headers, content=body)
+
+    async def scenario():
+        api = AsyncApiClient("http://api.test", retry=RetryPolicy(backoff=0, max_retry_after=0))
+        await api.client.aclose()
+        api.client = httpx.AsyncClient(base_url=api.base_url,
+                                       transport=httpx.MockTransport(handler))
+        async with api:
+            first = await api.get_session_results(4)
+            second = await api.get_session_results(4)
+            answer = await api.submit_answer(1, 4, 10, 100)
+        return first, second, answer, api.etags.hits
+
+    first, second, answer, hits = asyncio.run(scenario())
+    assert first == {"results": [], "next_poll_ms": 500}
+    assert second == {"results": [], "next_poll_ms": 900}
+    assert sent[2].headers["If-None-Match"] == '"v1"'
+    assert answer == {"success": True} and hits == 1
+    assert len(sent) == 5
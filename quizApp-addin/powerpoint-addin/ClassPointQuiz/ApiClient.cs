@@ -151,6 +151,10 @@ namespace ClassPointQuiz
             public DateTime? ended_at { get; set; }
             public bool is_active { get; set; }
             public int? auto_close_minutes { get; set; }
+
+            // Authoritative close time and the server clock it was read against
+            public DateTime? deadline { get; set; }
+            public DateTime? server_time { get; set; }
         }
         public class StudentResponseDetail
         {
@@ -168,6 +172,36 @@ namespace ClassPointQuiz
             public int total_responses { get; set; }
         }
 
+        public class SnapshotSession
+        {
+            public int session_id { get; set; }
+            public string class_code { get; set; }
+            public string status { get; set; }
+            public DateTime started_at { get; set; }
+            public DateTime? closed_at { get; set; }
+            public DateTime? deadline { get; set; }
+            public int results_version { get; set; }
+        }
+
+        public class SnapshotStats
+        {
+            public int participant_count { get; set; }
+            public int responded_count { get; set; }
+            public int correct_count { get; set; }
+            public double response_rate { get; set; }
+            public double? accuracy { get; set; }
+            public bool has_correct { get; set; }
+        }
+
+        // Sections that were not requested are null
+        public class SessionSnapshot
+        {
+            public SnapshotSession session { get; set; }
+            public ResultsResponse results { get; set; }
+            public SnapshotStats stats { get; set; }
+            public StudentDetailsResponse students { get; set; }
+        }
+
 
 
         // Retry helper method with exponential backoff
@@ -317,6 +351,39 @@ namespace ClassPointQuiz
                 }
             }, "GetResults");
         }
+        public static async Task<SessionSnapshot> GetSessionSnapshotAsync(int sessionId, string sections = null)
+        {
+            return await RetryAsync(async () =>
+            {
+                try
+                {
+                    string url = $"{BASE_URL}/session/{sessionId}/snapshot";
+                    if (sections != null)
+                    {
+                        url += $"?sections={Uri.EscapeDataString(sections)}";
+                    }
+
+                    var response = await client.GetAsync(url);
+                    var responseContent = await response.Content.ReadAsStringAsync();
+
+                    if (!response.IsSuccessStatusCode)
+                    {
+                        throw new Exception($"API Error: {response.StatusCode} - {responseContent}");
+                    }
+
+                    return JsonConvert.DeserializeObject<SessionSnapshot>(responseContent);
+                }
+                catch (HttpRequestException)
+                {
+                    throw; // Let RetryAsync handle retries
+                }
+                catch (Exception ex)
+                {
+                    throw new Exception($"API Error: {ex.Message}");
+                }
+            }, "GetSessionSnapshot");
+        }
+
         public static async Task<StudentDetailsResponse> GetStudentResponsesAsync(int sessionId)
         {
             return await RetryAsync(async () =>
@@ -24,6 +24,7 @@ namespace ClassPointQuiz
         private Button btnViewStudents;
         private Button btnAddToSlides; // Add this field
         private DateTime sessionStartTime;
+        private DateTime? sessionDeadline; // Server deadline on the local clock
         private bool sessionClosed = false;
         private List<ApiClient.ResultItem> currentResults;
 
@@ -73,7 +74,14 @@ namespace ClassPointQuiz
                         ? sessionInfo.started_at.ToLocalTime()
                         : sessionInfo.started_at;
 
-                    System.Diagnostics.Debug.WriteLine($"Session start time SET: {sessionStartTime}");
+                    // The server closes the session itself; count down to its deadline,
+                    // offset by server_time so a wrong local clock does not matter
+                    if (sessionInfo.deadline.HasValue && sessionInfo.server_time.HasValue)
+                    {
+                        this.sessionDeadline = DateTime.Now + (sessionInfo.deadline.Value - sessionInfo.server_time.Value);
+                    }
+
+                    System.Diagnostics.Debug.WriteLine($"Session start time SET: {sessionStartTime}, deadline: {sessionDeadline}");
 
                     this.Invoke((MethodInvoker)delegate {
                         UpdateCountdown();
@@ -300,6 +308,17 @@ namespace ClassPointQuiz
             Task.Run(async () => await LoadResults());
         }
 
+        private TimeSpan GetRemainingTime()
+        {
+            if (sessionDeadline.HasValue)
+            {
+                return sessionDeadline.Value - DateTime.Now;
+            }
+
+            TimeSpan elapsed = DateTime.Now - sessionStartTime;
+            return TimeSpan.FromMinutes(autoCloseMinutes) - elapsed;
+        }
+
         private void UpdateCountdown()
         {
             if (sessionClosed)
@@ -321,11 +340,9 @@ namespace ClassPointQuiz
                 return;
             }
 
-            TimeSpan elapsed = DateTime.Now - sessionStartTime;
-            TimeSpan total = TimeSpan.FromMinutes(autoCloseMinutes);
-            TimeSpan remaining = total - elapsed;
+            TimeSpan remaining = GetRemainingTime();
 
-            System.Diagnostics.Debug.WriteLine($"Countdown - Elapsed: {elapsed.TotalMinutes:F2}m, Remaining: {remaining.TotalMinutes:F2}m");
+            System.Diagnostics.Debug.WriteLine($"Countdown - Remaining: {remaining.TotalMinutes:F2}m");
 
             if (remaining.TotalSeconds <= 0)
             {
@@ -369,9 +386,22 @@ namespace ClassPointQuiz
         {
             try
             {
-                var results = await ApiClient.GetResultsAsync(sessionId);
+                // One request for results, status and deadline
+                var snapshot = await ApiClient.GetSessionSnapshotAsync(sessionId, "results");
+
+                if (snapshot == null || snapshot.results == null) return;
 
-                if (results == null) return;
+                var results = snapshot.results;
+
+                // Closed on the server (deadline or another client); the countdown
+                // timer shows it on its next tick
+                if (snapshot.session != null && snapshot.session.status == "closed" && !sessionClosed)
+                {
+                    sessionClosed = true;
+                    ThisAddIn.CurrentSessionId = 0;
+                    ThisAddIn.CurrentClassCode = null;
+                    ThisAddIn.CurrentSessionStartTime = DateTime.MinValue;
+                }
 
                 currentResults = results.results;
 
@@ -714,9 +744,7 @@ namespace ClassPointQuiz
                 // Check if time is up before allowing
                 if (sessionStartTime != DateTime.MinValue && !sessionClosed)
                 {
-                    TimeSpan elapsed = DateTime.Now - sessionStartTime;
-                    TimeSpan total = TimeSpan.FromMinutes(autoCloseMinutes);
-                    TimeSpan remaining = total - elapsed;
+                    TimeSpan remaining = GetRemainingTime();
 
                     if (remaining.TotalSeconds > 0)
                     {
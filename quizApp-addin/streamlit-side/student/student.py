@@ -2,19 +2,23 @@
 # Streamlit app for students to join and answer quizzes
 
 import streamlit as st
+import os
 import sys
-sys.path.insert(0, r'C:\Users\pc\Desktop\ClassPointQuiz')
-from backend import database
 import time
 
+try:
+    from classpoint_client import ApiClient, ApiError
+except ImportError:
+    # Not installed: use the package from the repository checkout
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "client"))
+    from classpoint_client import ApiClient, ApiError
 
-from backend.database import (
-    get_session_by_code,
-    add_student_to_session,
-    get_quiz_details,
-    submit_answer
-)
-from streamlit_autorefresh import st_autorefresh
+# Backend API URL
+API_URL = os.getenv("CLASSPOINT_API_URL", "http://localhost:8000")
+
+# Only the status fragment reruns on this timer; the question renders once.
+# It asks the backend only once the server's next_poll_ms hint has passed.
+STATUS_REFRESH_SECONDS = 5
 
 # Page config
 st.set_page_config(
@@ -23,6 +27,46 @@ st.set_page_config(
     layout="centered"
 )
 
+@st.cache_resource(show_spinner=False)
+def get_api():
+    """One pooled API client shared by every student of this app"""
+    return ApiClient(API_URL)
+
+api = get_api()
+
+def check_session(class_code):
+    """(session, closed) for a class code. closed is only True when the backend
+    says so (unknown code or not active); (None, False) when it could not be
+    asked (rate limited, overloaded, network), so callers try again later"""
+    try:
+        session = api.get_session_by_code(class_code)
+    except ApiError:
+        return None, False
+    return session, not session or session.get('status') != 'active'
+
+def get_quiz_details(quiz_id):
+    """Quiz, question and answers, or None"""
+    try:
+        return api.get_quiz(quiz_id)
+    except ApiError as e:
+        st.error(f"Backend error: {e.detail}")
+        return None
+
+def join_by_code(class_code, student_name):
+    """Returns (joined, error); joined carries the session and the quiz payload"""
+    try:
+        return api.join_by_code(class_code, student_name), None
+    except ApiError as e:
+        return None, e
+
+def submit_answer(student_id, session_id, question_id, answer_id, time_taken):
+    """Returns (ok, error)"""
+    try:
+        api.submit_answer(student_id, session_id, question_id, answer_id, time_taken)
+        return True, None
+    except ApiError as e:
+        return False, e.detail
+
 # Custom CSS for classy white and blue design
 st.markdown("""
 <style>
@@ -281,6 +325,12 @@ if 'answered' not in st.session_state:
     st.session_state.answered = False
 if 'start_time' not in st.session_state:
     st.session_state.start_time = None
+if 'quiz_details' not in st.session_state:
+    st.session_state.quiz_details = None
+if 'session_closed' not in st.session_state:
+    st.session_state.session_closed = False
+if 'current_question_id' not in st.session_state:
+    st.session_state.current_question_id = None
 
 # Join Page
 def show_join_page():
@@ -308,31 +358,28 @@ def show_join_page():
                 if not class_code or not student_name:
                     st.error("Please enter both class code and your name!")
                 else:
-                    # Check if session exists
-                    session = get_session_by_code(class_code)
-
-                    if not session:
+                    # One request resolves the code, registers the student and returns the quiz
+                    joined, error = join_by_code(class_code, student_name)
+
+                    if joined:
+                        st.session_state.student_joined = True
+                        st.session_state.student_id = joined['student_id']
+                        st.session_state.session_id = joined['session']['session_id']
+                        st.session_state.quiz_id = joined['session']['quiz_id']
+                        st.session_state.quiz_details = {
+                            part: joined[part] for part in ('quiz', 'question', 'answers', 'questions')}
+                        st.session_state.current_question_id = joined['session']['current_question_id']
+                        st.session_state.student_name = student_name
+                        st.session_state.class_code = class_code
+                        st.session_state.start_time = time.time()
+                        st.success(f"Welcome, {student_name}!")
+                        st.rerun()
+                    elif error.status_code == 404:
                         st.error("Invalid class code!")
-                    elif session['status'] != 'active':
+                    elif error.status_code == 409:
                         st.warning("⚠️ This quiz session is not currently active. Please check with your teacher.")
                     else:
-                        # Add student to session
-                        student_id, error = add_student_to_session(
-                            session['session_id'],
-                            student_name
-                        )
-
-                        if student_id:
-                            st.session_state.student_joined = True
-                            st.session_state.student_id = student_id
-                            st.session_state.session_id = session['session_id']
-                            st.session_state.student_name = student_name
-                            st.session_state.class_code = class_code
-                            st.session_state.start_time = time.time()
-                            st.success(f"Welcome, {student_name}!")
-                            st.rerun()
-                        else:
-                            st.error(f"Failed to join: {error}")
+                        st.error(f"Failed to join: {error.detail}")
 
     with col2:
         st.info("""
@@ -344,15 +391,45 @@ def show_join_page():
         4. Click Join Quiz
         """)
 
+# Session status, rerun on its own timer without touching the rest of the page
+@st.fragment(run_every=STATUS_REFRESH_SECONDS)
+def show_session_status():
+    now = time.monotonic()
+    if now < st.session_state.get('next_status_check', 0.0):
+        st.caption(f"Class Code: {st.session_state.class_code}")
+        return
+
+    session, closed = check_session(st.session_state.class_code)
+
+    # Closed (or gone): rerun the whole page once to show the closed message
+    if closed:
+        st.session_state.session_closed = True
+        st.rerun(scope="app")
+    # Not reachable this time: keep the current view and ask again next tick
+    if session is None:
+        st.caption(f"Class Code: {st.session_state.class_code} · reconnecting…")
+        return
+
+    # The teacher moved on: show the next question from the set loaded at join
+    current_question_id = session.get('current_question_id')
+    if current_question_id and current_question_id != st.session_state.current_question_id:
+        st.session_state.current_question_id = current_question_id
+        st.session_state.answered = False
+        st.session_state.selected_answers = []
+        st.session_state.start_time = time.time()
+        st.rerun(scope="app")
+
+    hint_ms = session.get('next_poll_ms') or STATUS_REFRESH_SECONDS * 1000
+    # A tick early is still on time: the timer only fires every STATUS_REFRESH_SECONDS
+    st.session_state.next_status_check = now + hint_ms / 1000 - STATUS_REFRESH_SECONDS / 2
+    st.caption(f"Class Code: {st.session_state.class_code}")
+
 # Quiz Page
 def show_quiz_page():
     st.title("🎓 Quiz Time!")
 
-    # Check session status on every render
-    session = get_session_by_code(st.session_state.class_code)
-
     # If session doesn't exist or is closed, show message and exit
-    if not session or session.get('status') != 'active':
+    if st.session_state.session_closed:
         st.warning("⚠️ This quiz session has been closed by your teacher.")
         st.info("Thank you for participating!")
 
@@ -361,20 +438,32 @@ def show_quiz_page():
             st.rerun()
         return
 
-    # Get quiz details
-    quiz_details = get_quiz_details(session['quiz_id'])
+    # Quiz details never change during a session: fetch them once
+    quiz_details = st.session_state.quiz_details
+    if quiz_details is None:
+        quiz_details = get_quiz_details(st.session_state.quiz_id)
 
-    if not quiz_details or not quiz_details['question']:
-        st.error("Quiz not found!")
-        return
+        if not quiz_details or not quiz_details['question']:
+            st.error("Quiz not found!")
+            return
+        st.session_state.quiz_details = quiz_details
 
     quiz = quiz_details['quiz']
-    question = quiz_details['question']
-    answers = quiz_details['answers']
+    questions = quiz_details.get('questions') or [dict(quiz_details['question'],
+                                                       answers=quiz_details['answers'],
+                                                       correct_count=quiz['correct_count'],
+                                                       allow_multiple=quiz['allow_multiple'])]
+    # The question the teacher has open; the first until the status check says otherwise
+    position = next((i for i, q in enumerate(questions)
+                     if q['question_id'] == st.session_state.current_question_id), 0)
+    question = questions[position]
+    answers = question['answers']
+    # The quiz-wide flag only speaks for single-question quizzes
+    allow_multiple = question['allow_multiple'] or (len(questions) == 1 and quiz['allow_multiple'])
 
     # Header
     st.subheader(f"👤 {st.session_state.student_name}")
-    st.caption(f"Class Code: {st.session_state.class_code}")
+    show_session_status()
 
     # ✅ NEW: Show difficulty badge
     difficulty = quiz.get('quiz_difficulty', 'easy').upper()
@@ -396,7 +485,10 @@ def show_quiz_page():
         st.success("✅ Answer submitted!")
         st.balloons()
 
-        st.info("**Thank you for participating!**\n\nYour teacher will review the results.")
+        if position + 1 < len(questions):
+            st.info("**Answer received!**\n\nThe next question appears here when your teacher moves on.")
+        else:
+            st.info("**Thank you for participating!**\n\nYour teacher will review the results.")
 
         if st.button("Leave Quiz"):
             st.session_state.clear()
@@ -404,6 +496,8 @@ def show_quiz_page():
 
     else:
         # Show question
+        if len(questions) > 1:
+            st.caption(f"Question {position + 1} of {len(questions)}")
         st.markdown(f"### {question['question_text']}")
         st.divider()
 
@@ -412,9 +506,9 @@ def show_quiz_page():
             st.session_state.selected_answers = []
 
         # Answer options
-        if quiz['allow_multiple']:
+        if allow_multiple:
             # Multiple selection with limit
-            correct_count = quiz.get('correct_count', 2)
+            correct_count = question.get('correct_count', 2)
             selected_count = len(st.session_state.selected_answers)
 
             st.info(f"ℹ️ **Select exactly {correct_count} answer{'s' if correct_count != 1 else ''}** ({selected_count}/{correct_count} selected)")
@@ -444,9 +538,10 @@ def show_quiz_page():
             # Submit button
             if st.button("Submit Answers", type="primary", use_container_width=True):
                 # Double-check session is still active before submission
-                session_check = get_session_by_code(st.session_state.class_code)
-                if not session_check or session_check.get('status') != 'active':
+                _, closed = check_session(st.session_state.class_code)
+                if closed:
                     st.error("⚠️ The session has been closed. Your answer cannot be submitted.")
+                    st.session_state.session_closed = True
                     st.rerun()
                     return
 
@@ -481,7 +576,7 @@ def show_quiz_page():
 
         else:
             # Single selection
-            with st.form("single_answer_form"):
+            with st.form(f"single_answer_form_{question['question_id']}"):
                 options = {f"{chr(65 + ans['answer_order'])}. {ans['answer_text']}": ans['answer_id']
                           for ans in answers}
 
@@ -495,9 +590,10 @@ def show_quiz_page():
 
                 if submit:
                     # Double-check session is still active before submission
-                    session_check = get_session_by_code(st.session_state.class_code)
-                    if not session_check or session_check.get('status') != 'active':
+                    _, closed = check_session(st.session_state.class_code)
+                    if closed:
                         st.error("⚠️ The session has been closed. Your answer cannot be submitted.")
+                        st.session_state.session_closed = True
                         st.rerun()
                         return
 
@@ -522,9 +618,6 @@ def show_quiz_page():
 
 # Main
 def main():
-    # Auto-refresh every 5 seconds to check session status
-    st_autorefresh(interval=5000, key="student_refresh")
-
     if not st.session_state.student_joined:
         show_join_page()
     else:
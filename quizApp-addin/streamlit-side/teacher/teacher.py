@@ -2,32 +2,25 @@
 # Streamlit app for teachers - Complete Fixed Version
 
 import streamlit as st
-import requests
 import hashlib
+import json
 import os
-import random
-import string
 import pandas as pd
 import plotly.express as px
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
 import time
-from streamlit_autorefresh import st_autorefresh
 import sys
-sys.path.insert(0, r'C:\Users\pc\Desktop\ClassPointQuiz')
+
+try:
+    from classpoint_client import ApiClient, ApiError
+except ImportError:
+    # Not installed: use the package from the repository checkout
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "client"))
+    from classpoint_client import ApiClient, ApiError
 
 # Backend API URL
-API_URL = "http://localhost:8000"
-
-# Import database functions
-from backend.database import (
-    get_session_by_code,
-    get_quiz_details,
-    get_session_results,
-    close_session,
-    get_teacher_quizzes,
-    create_quiz_session,
-    get_db_connection
-)
+API_URL = os.getenv("CLASSPOINT_API_URL", "http://localhost:8000")
 
 # Page config - MUST be first Streamlit command
 st.set_page_config(
@@ -37,6 +30,21 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+@st.cache_resource(show_spinner=False)
+def get_api():
+    """One pooled API client shared by every session of this app"""
+    return ApiClient(API_URL)
+
+api = get_api()
+
+def api_call(func, *args, default=None, **kwargs):
+    """Call the API, showing an error instead of crashing when it fails"""
+    try:
+        return func(*args, **kwargs)
+    except ApiError as e:
+        st.error(f"Backend error: {e.detail}")
+        return default
+
 # Custom CSS - [Keep your existing CSS - it's good]
 st.markdown("""
 <style>
@@ -683,18 +691,12 @@ def hash_password(password):
 def login_teacher(email, password):
     """Authenticate teacher"""
     try:
-        response = requests.post(
-            f"{API_URL}/api/auth/login",
-            json={"email": email, "password": password}
-        )
-        if response.status_code == 200:
-            data = response.json()
+        data = api.login(email, password)
+        if data:
             save_login_file(data['teacher_id'], data['username'], data['email'])
-            return data
-        else:
-            return None
-    except Exception as e:
-        st.error(f"Connection error: {e}")
+        return data
+    except ApiError as e:
+        st.error(f"Connection error: {e.detail}")
         return None
 
 def save_login_file(teacher_id, username, email):
@@ -715,20 +717,10 @@ def save_login_file(teacher_id, username, email):
 def register_teacher(username, email, password):
     """Register new teacher"""
     try:
-        response = requests.post(
-            f"{API_URL}/api/auth/register",
-            json={
-                "username": username,
-                "email": email,
-                "password": password
-            }
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except Exception as e:
-        st.error(f"Connection error: {e}")
+        return api.register_teacher(username, email, password)
+    except ApiError as e:
+        if e.status_code is None:
+            st.error(f"Connection error: {e.detail}")
         return None
 
 # Initialize session state
@@ -744,10 +736,6 @@ if 'page' not in st.session_state:
     st.session_state.page = 'login'
 
 # Helper functions
-def generate_class_code():
-    """Generate random class code"""
-    return "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
-
 def logout():
     """Logout function"""
     try:
@@ -777,17 +765,21 @@ def show_dashboard():
 
     st.divider()
 
-    # Stats
-    quizzes = get_teacher_quizzes(st.session_state.teacher_id)
+    # Stats (precomputed counters, independent of quiz history size)
+    summary = api_call(api.get_teacher_summary, st.session_state.teacher_id) or {}
+    quizzes = summary.get('recent_quizzes', [])
 
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
-        st.metric("Total Quizzes", len(quizzes))
+        st.metric("Total Quizzes", summary.get('quiz_count', 0))
     with col2:
-        total_sessions = sum(q.get('session_count', 0) for q in quizzes)
-        st.metric("Total Sessions", total_sessions)
+        st.metric("Total Sessions", summary.get('session_count', 0))
     with col3:
-        st.metric("Teacher ID", st.session_state.teacher_id)
+        st.metric("Students Reached", summary.get('students_reached', 0))
+    with col4:
+        st.metric("Answers Collected", summary.get('answers_collected', 0))
+    with col5:
+        st.metric("Average Accuracy", f"{summary.get('average_accuracy', 0.0):.1f}%")
 
     st.divider()
 
@@ -816,7 +808,7 @@ def show_dashboard():
         st.divider()
         st.subheader("Recent Quizzes")
 
-        for quiz in quizzes[:5]:
+        for quiz in quizzes:
             with st.expander(f"{quiz['title']}"):
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
@@ -916,32 +908,26 @@ def show_create_quiz():
                 allow_multiple = len(correct_answers) >= 2
 
                 # ✅ FIXED: Send request with correct field names
-                response = requests.post(
-                    f"{API_URL}/api/quiz/create",
-                    params={
-                        'teacher_id': st.session_state.teacher_id,
-                        'title': title,
-                        'question_text': question_text,
-                        'num_choices': num_choices,
-                        'allow_multiple': allow_multiple,
-                        'has_correct': has_correct,
-                        'quiz_mode': quiz_mode.lower(),  # "easy", "medium", or "hard"
-                        'start_with_slide': True,  # Default
-                        'minimize_window': False,  # Default
-                        'auto_close_minutes': close_after
-                    },
-                    json={'answers': answers_list}
+                result = api.create_quiz(
+                    st.session_state.teacher_id,
+                    title,
+                    question_text,
+                    answers_list,
+                    num_choices=num_choices,
+                    allow_multiple=allow_multiple,
+                    has_correct=has_correct,
+                    quiz_mode=quiz_mode.lower(),  # "easy", "medium", or "hard"
+                    start_with_slide=True,  # Default
+                    minimize_window=False,  # Default
+                    auto_close_minutes=close_after
                 )
-
-                if response.status_code == 200:
-                    result = response.json()
-                    st.success(f"✅ Quiz created successfully! (ID: {result['quiz_id']})")
-                    st.balloons()
-                    time.sleep(2)
-                    st.session_state.page = 'dashboard'
-                    st.rerun()
-                else:
-                    st.error(f"❌ Error creating quiz: {response.text}")
+                st.success(f"✅ Quiz created successfully! (ID: {result['quiz_id']})")
+                st.balloons()
+                time.sleep(2)
+                st.session_state.page = 'dashboard'
+                st.rerun()
+            except ApiError as e:
+                st.error(f"❌ Error creating quiz: {e.detail}")
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
 
@@ -955,7 +941,7 @@ def show_view_quizzes():
 
     st.divider()
 
-    quizzes = get_teacher_quizzes(st.session_state.teacher_id)
+    quizzes = api_call(api.get_teacher_quizzes, st.session_state.teacher_id, default=[])
 
     if not quizzes:
         st.info("You haven't created any quizzes yet. Click 'Create New Quiz' to get started!")
@@ -998,7 +984,7 @@ def show_run_quiz():
     st.divider()
 
     # Select quiz
-    quizzes = get_teacher_quizzes(st.session_state.teacher_id)
+    quizzes = api_call(api.get_teacher_quizzes, st.session_state.teacher_id, default=[])
 
     if not quizzes:
         st.warning("You need to create a quiz first!")
@@ -1018,26 +1004,259 @@ def show_run_quiz():
     quiz_id = quiz_options[selected]
 
     if st.button("Start Quiz Session", type="primary", use_container_width=True):
-        # Generate class code
-        class_code = generate_class_code()
-
-        # Create session
-        session_id, error = create_quiz_session(quiz_id, class_code)
-
-        if session_id:
-            st.session_state.active_session_id = session_id
-            st.session_state.class_code = class_code
+        # Create session; the backend picks the class code
+        try:
+            started = api.start_session(quiz_id)
+        except ApiError as e:
+            st.error(f"Failed to start session: {e.detail}")
+        else:
+            st.session_state.active_session_id = started['session_id']
+            st.session_state.active_quiz_id = quiz_id
+            st.session_state.class_code = started['class_code']
             st.session_state.page = 'live_session'
             st.rerun()
+
+# Live session fragments rerun on this timer; the page itself does not. The
+# backend is only asked once the server's next_poll_ms hint has passed.
+LIVE_REFRESH_SECONDS = 3
+
+# Show refresh cost and fetch timing panels on live pages
+DEBUG_PANELS = os.getenv("CLASSPOINT_DEBUG") == "1"
+
+# Wall-clock budget for one round of concurrent fetches
+LIVE_FETCH_BUDGET_SECONDS = 2.0
+
+@st.cache_resource(show_spinner=False)
+def get_fetch_pool():
+    """Threads shared by every session for concurrent API calls"""
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="live-fetch")
+
+def timed_call(func, *args):
+    """Run one API call off the script thread: (value, error, elapsed_ms)"""
+    started = time.perf_counter()
+    try:
+        value, error = func(*args), None
+    except ApiError as e:
+        value, error = None, e.detail
+    return value, error, (time.perf_counter() - started) * 1000
+
+def fetch_concurrently(calls, budget=LIVE_FETCH_BUDGET_SECONDS):
+    """Run independent API calls at once and wait at most `budget` seconds
+
+    Args:
+        calls: Dict of name -> (func, *args)
+
+    Returns:
+        Dict of name -> value; None for calls that failed or missed the budget
+    """
+    pool = get_fetch_pool()
+    futures = {name: pool.submit(timed_call, *call) for name, call in calls.items()}
+    wait(futures.values(), timeout=budget)
+
+    values = {}
+    timings = st.session_state.setdefault('fetch_timings', {})
+    for name, future in futures.items():
+        if not future.done():
+            # Left running; its result is dropped and the last value kept
+            values[name] = None
+            timings[name] = (budget * 1000, "over budget")
+            continue
+        value, error, elapsed_ms = future.result()
+        if error:
+            st.error(f"Backend error: {error}")
+        values[name] = value
+        timings[name] = (elapsed_ms, "error" if error else "ok")
+    return values
+
+def parse_utc(value):
+    """API timestamp as a naive UTC datetime, or None"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def get_live_view(session_id):
+    """Latest results and statistics, refetched only when the results version changes"""
+    view = st.session_state.get('live_view')
+    if view is None or view['session_id'] != session_id:
+        view = {'session_id': session_id, 'version': None, 'status': None, 'next_check': 0.0}
+        st.session_state.live_view = view
+
+    # Every fragment calls this on the same tick, and the server says how long
+    # to wait between polls; a tick early is still on time
+    now = time.monotonic()
+    if now < view['next_check']:
+        return view
+    view['next_check'] = now + LIVE_REFRESH_SECONDS / 2
+
+    # One consistent read; a 304 from the client's ETag cache while nothing changed
+    snapshot = fetch_concurrently({
+        'snapshot': (api.get_session_snapshot, session_id, ['results', 'stats'])
+    })['snapshot']
+    if not snapshot:
+        return view
+    hint_ms = snapshot.get('next_poll_ms') or LIVE_REFRESH_SECONDS * 1000
+    view['next_check'] = now + hint_ms / 1000 - LIVE_REFRESH_SECONDS / 2
+    session = snapshot['session']
+    view['status'] = session['status']
+    if session['results_version'] == view['version'] and 'results' in view:
+        return view
+
+    results_data = snapshot['results']
+    view.update(
+        version=session['results_version'],
+        started_at=parse_utc(session['started_at']),
+        closed_at=parse_utc(session['closed_at']),
+        results=results_data['results'],
+        participant_count=results_data['participant_count'],
+        stats=snapshot['stats'] or {},
+        figure=None
+    )
+    return view
+
+def build_results_figure(results):
+    """Bar chart of the response distribution"""
+    chart_data = []
+    for r in results:
+        choice_label = chr(65 + r['answer_order'])
+        chart_data.append({
+            'Choice': f"{choice_label}. {r['answer_text'][:30]}...",
+            'Responses': r['count'],
+            'Is Correct': 'Correct' if r['is_correct'] else 'Incorrect'
+        })
+
+    df = pd.DataFrame(chart_data)
+
+    # Create bar chart with blue theme
+    fig = px.bar(
+        df,
+        x='Choice',
+        y='Responses',
+        color='Is Correct',
+        color_discrete_map={'Correct': '#22c55e', 'Incorrect': '#3b82f6'},
+        text='Responses',
+        title='Student Response Distribution'
+    )
+
+    fig.update_traces(textposition='outside')
+    fig.update_layout(
+        height=500,
+        xaxis_title="Answer Choices",
+        yaxis_title="Number of Students",
+        showlegend=True,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Inter, sans-serif", color="#1d4ed8")
+    )
+    return fig
+
+def record_refresh(part, cpu_started, sent_bytes=0, rebuilt=False):
+    """Add one fragment run to the refresh cost meter"""
+    meter = st.session_state.setdefault('refresh_meter', {'started': time.monotonic(), 'parts': {}})
+    totals = meter['parts'].setdefault(part, {'runs': 0, 'cpu': 0.0, 'bytes': 0, 'rebuilds': 0})
+    totals['runs'] += 1
+    totals['cpu'] += time.process_time() - cpu_started
+    totals['bytes'] += sent_bytes
+    totals['rebuilds'] += int(rebuilt)
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def show_debug_panels():
+    """Latest fetch timings, and CPU and bytes sent per minute by each live fragment"""
+    timings = st.session_state.get('fetch_timings')
+    if timings:
+        with st.expander("Fetch timings", expanded=False):
+            st.dataframe(pd.DataFrame([
+                {'Call': name, 'ms': round(elapsed_ms, 1), 'Outcome': outcome}
+                for name, (elapsed_ms, outcome) in timings.items()
+            ]), hide_index=True, use_container_width=True)
+            st.caption(f"Calls in one round run concurrently within a "
+                       f"{LIVE_FETCH_BUDGET_SECONDS:g}s budget")
+
+    meter = st.session_state.get('refresh_meter')
+    if not meter:
+        return
+    minutes = max((time.monotonic() - meter['started']) / 60, 1 / 60)
+    rows = [{
+        'Fragment': part,
+        'Runs/min': round(totals['runs'] / minutes, 1),
+        'CPU ms/min': round(totals['cpu'] * 1000 / minutes, 1),
+        'KB sent/min': round(totals['bytes'] / 1024 / minutes, 1),
+        'Figure rebuilds/min': round(totals['rebuilds'] / minutes, 1)
+    } for part, totals in meter['parts'].items()]
+    with st.expander("Refresh cost", expanded=False):
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        st.caption("CPU is process time spent in each fragment; bytes are the encoded "
+                   "payloads the fragment emits (figure JSON for the chart)")
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def show_live_counts(session_id, is_closed):
+    """Participant and response counters, updated in place"""
+    cpu_started = time.process_time()
+    view = get_live_view(session_id)
+
+    # Session closed elsewhere (add-in, timer): redraw the header once
+    if view['status'] == 'closed' and not is_closed:
+        st.rerun(scope="app")
+
+    if 'results' not in view:
+        st.error("Unable to fetch results!")
+        return
+
+    stats = view['stats']
+    # Timestamps are naive UTC
+    ended = view['closed_at'] or datetime.now(timezone.utc).replace(tzinfo=None)
+    elapsed = max(0, (ended - view['started_at']).total_seconds())
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+
+    with col1:
+        st.metric("Students Joined", view['participant_count'])
+
+    with col2:
+        st.metric("Students Responded", stats.get('responded_count', 0))
+
+    with col3:
+        st.metric("Response Rate", f"{stats.get('response_rate', 0.0):.1f}%")
+
+    with col4:
+        if stats.get('accuracy') is not None:
+            st.metric("Accuracy", f"{stats['accuracy']:.1f}%")
         else:
-            st.error(f"Failed to start session: {error}")
+            st.metric("Grading", "Disabled")
+
+    with col5:
+        st.metric("Time Elapsed", f"{int(elapsed / 60)} min")
+
+    if DEBUG_PANELS:
+        record_refresh("counts", cpu_started, len(json.dumps(stats)) + 64)
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def show_live_chart(session_id):
+    """Response distribution; the figure is rebuilt only when the results change"""
+    cpu_started = time.process_time()
+    view = get_live_view(session_id)
+    results = view.get('results')
+
+    if not results or all(r['count'] == 0 for r in results):
+        st.info("Waiting for student responses...")
+        st.markdown("Students can join using the class code above.")
+        return
+
+    rebuilt = view['figure'] is None
+    if rebuilt:
+        view['figure'] = build_results_figure(results)
+        view['figure_bytes'] = len(view['figure'].to_json()) if DEBUG_PANELS else 0
+
+    st.plotly_chart(view['figure'], use_container_width=True, key="live_chart")
+
+    if DEBUG_PANELS:
+        record_refresh("chart", cpu_started, view['figure_bytes'], rebuilt)
 
 # ✅ COMPLETELY FIXED: Live Session Page with correct statistics
 def show_live_session():
-    """Live session page with real-time results"""
-
-    # Auto-refresh every 3 seconds
-    st_autorefresh(interval=3000, key="live_refresh")
+    """Live session page; counters and chart refresh in their own fragments"""
 
     # Validate session_state
     session_id = st.session_state.get('active_session_id')
@@ -1049,29 +1268,36 @@ def show_live_session():
             st.rerun()
         return
 
-    # Get session data
-    session = get_session_by_code(class_code)
+    # Session and quiz are independent once the quiz id is known: fetch both at once
+    quiz_details = st.session_state.get('live_quiz_details')
+    quiz_id = st.session_state.get('active_quiz_id') or (quiz_details and quiz_details['quiz']['quiz_id'])
+    calls = {'session': (api.get_session_by_code, class_code)}
+    need_quiz = not quiz_details or quiz_details['quiz']['quiz_id'] != quiz_id
+    if quiz_id and need_quiz:
+        calls['quiz'] = (api.get_quiz, quiz_id)
+    fetched = fetch_concurrently(calls)
+
+    session = fetched['session']
     if not session:
         st.error("Session not found!")
         return
 
-    # Ensure started_at is a datetime
-    start_time = session.get('started_at')
-    if isinstance(start_time, str):
-        try:
-            start_time = datetime.fromisoformat(start_time)
-        except Exception:
-            start_time = datetime.now()
-    session['started_at'] = start_time
-
-    # Get quiz details
-    quiz_details = get_quiz_details(session['quiz_id'])
+    # Quiz details never change during a session: fetch them once
+    if 'quiz' in calls:
+        quiz_details = fetched['quiz']
+    elif need_quiz or quiz_details['quiz']['quiz_id'] != session['quiz_id']:
+        # Session started outside this page (no known quiz id)
+        quiz_details = api_call(api.get_quiz, session['quiz_id'])
     if not quiz_details:
         st.error("Quiz details not found!")
         return
+    st.session_state.live_quiz_details = quiz_details
 
-    quiz = quiz_details['quiz']
-    question = quiz_details['question']
+    # The open question; students answer only this one
+    questions = quiz_details.get('questions') or [quiz_details['question']]
+    position = next((i for i, q in enumerate(questions)
+                     if q['question_id'] == session.get('current_question_id')), 0)
+    question = questions[position]
 
     # Header with class code
     col1, col2, col3 = st.columns([2, 2, 1])
@@ -1102,7 +1328,7 @@ def show_live_session():
                 st.rerun()
         else:
             if st.button("Close Session"):
-                close_session(session_id)
+                api_call(api.close_session, session_id)
                 st.success("Session closed!")
                 time.sleep(1)
                 st.session_state.page = 'dashboard'
@@ -1110,148 +1336,30 @@ def show_live_session():
 
     st.divider()
 
-    # Get live results
-    results_data = get_session_results(session_id)
-
-    if not results_data:
-        st.error("Unable to fetch results!")
-        return
-
-    results = results_data['results']
-    participant_count = results_data['participant_count']
-
     # Question display
-    col1, col2 = st.columns([3, 1])
-
-    with col1:
+    if len(questions) > 1:
+        st.subheader(f"Question {position + 1} of {len(questions)}")
+    else:
         st.subheader("Question")
-        st.markdown(f"**{question['question_text']}**")
+    st.markdown(f"**{question['question_text']}**")
 
-    with col2:
-        st.metric("Students Joined", participant_count)
+    # Teacher-paced: students see the next question on their next status check
+    if not is_closed and position + 1 < len(questions):
+        if st.button("Next Question ➡️", type="primary"):
+            if api_call(api.advance_question, session_id):
+                st.session_state.pop('live_view', None)
+                st.rerun()
+
+    show_live_counts(session_id, is_closed)
 
     st.divider()
 
     # Bar Chart
     st.subheader("Live Results")
+    show_live_chart(session_id)
 
-    if not results or all(r['count'] == 0 for r in results):
-        st.info("Waiting for student responses...")
-        st.markdown("Students can join using the class code above.")
-    else:
-        # Prepare data for chart
-        chart_data = []
-        for r in results:
-            choice_label = chr(65 + r['answer_order'])
-            chart_data.append({
-                'Choice': f"{choice_label}. {r['answer_text'][:30]}...",
-                'Responses': r['count'],
-                'Is Correct': 'Correct' if r['is_correct'] else 'Incorrect'
-            })
-
-        df = pd.DataFrame(chart_data)
-
-        # Create bar chart with blue theme
-        fig = px.bar(
-            df,
-            x='Choice',
-            y='Responses',
-            color='Is Correct',
-            color_discrete_map={'Correct': '#22c55e', 'Incorrect': '#3b82f6'},
-            text='Responses',
-            title='Student Response Distribution'
-        )
-
-        fig.update_traces(textposition='outside')
-        fig.update_layout(
-            height=500,
-            xaxis_title="Answer Choices",
-            yaxis_title="Number of Students",
-            showlegend=True,
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            font=dict(family="Inter, sans-serif", color="#1d4ed8")
-        )
-
-        st.plotly_chart(fig, use_container_width=True)
-
-        # ✅ COMPLETELY FIXED: Statistics with correct calculations
-        st.divider()
-        st.subheader("Statistics")
-
-        try:
-            conn = get_db_connection()
-            cur = conn.cursor()
-            
-            # ✅ FIX 1: Count unique students who submitted at least one answer
-            cur.execute("""
-                SELECT COUNT(DISTINCT sa.student_id) as responded_count
-                FROM student_answers sa
-                WHERE sa.session_id = %s
-            """, (session_id,))
-            
-            result = cur.fetchone()
-            students_responded = result['responded_count'] if result and result['responded_count'] else 0
-            
-            # ✅ FIX 2: Get correct student count with proper logic
-            correct_students = 0
-            
-            if quiz.get('has_correct'):
-                # Get student answers grouped by student
-                cur.execute("""
-                    SELECT 
-                        sa.student_id,
-                        sa.is_correct
-                    FROM student_answers sa
-                    WHERE sa.session_id = %s
-                    ORDER BY sa.student_id
-                """, (session_id,))
-                
-                student_answers = cur.fetchall()
-                
-                # Group by student and check if ALL their answers are correct
-                from collections import defaultdict
-                student_correctness = defaultdict(list)
-                
-                for row in student_answers:
-                    student_correctness[row['student_id']].append(row['is_correct'])
-                
-                # Count students where all answers are correct
-                for student_id, correctness_list in student_correctness.items():
-                    if all(correctness_list):  # All answers must be correct
-                        correct_students += 1
-            
-            cur.close()
-            conn.close()
-            
-        except Exception as e:
-            print(f"Error calculating statistics: {e}")
-            import traceback
-            traceback.print_exc()
-            students_responded = 0
-            correct_students = 0
-
-        # Display metrics
-        col1, col2, col3, col4 = st.columns(4)
-
-        with col1:
-            st.metric("Students Responded", students_responded)
-
-        with col2:
-            response_rate = (students_responded / participant_count * 100) if participant_count > 0 else 0
-            st.metric("Response Rate", f"{response_rate:.1f}%")
-
-        with col3:
-            if quiz.get('has_correct'):
-                accuracy = (correct_students / students_responded * 100) if students_responded > 0 else 0
-                st.metric("Accuracy", f"{accuracy:.1f}%")
-            else:
-                st.metric("Grading", "Disabled")
-
-        with col4:
-            elapsed = datetime.now() - start_time
-            minutes = int(elapsed.total_seconds() / 60)
-            st.metric("Time Elapsed", f"{minutes} min")
+    if DEBUG_PANELS:
+        show_debug_panels()
 
     # Bottom controls
     st.divider()
@@ -1259,14 +1367,16 @@ def show_live_session():
 
     with col1:
         if st.button("Refresh Now", use_container_width=True):
+            st.session_state.pop('live_view', None)
             st.rerun()
 
     with col2:
         if not is_closed:
             if st.button("Close Submission", use_container_width=True):
-                success = close_session(session_id)
+                success = api_call(api.close_session, session_id)
                 if success:
                     st.success("Session closed!")
+                    st.session_state.pop('live_view', None)
                     time.sleep(1)
                     st.rerun()
 
@@ -1287,7 +1397,7 @@ def show_view_results():
     quiz_id = st.session_state.selected_quiz_id
 
     # Get quiz details
-    quiz_details = get_quiz_details(quiz_id)
+    quiz_details = api_call(api.get_quiz, quiz_id)
     if not quiz_details:
         st.error("Quiz not found!")
         return
@@ -1301,21 +1411,7 @@ def show_view_results():
     st.divider()
 
     # Get all sessions for this quiz
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT session_id, class_code, started_at, closed_at, status
-            FROM quiz_sessions
-            WHERE quiz_id = %s
-            ORDER BY started_at DESC
-        """, (quiz_id,))
-        sessions = cur.fetchall()
-        cur.close()
-        conn.close()
-    except Exception as e:
-        st.error(f"Error fetching sessions: {e}")
-        return
+    sessions = api_call(api.get_quiz_sessions, quiz_id, default=[])
 
     if not sessions:
         st.info("No sessions found for this quiz yet.")
@@ -1325,9 +1421,10 @@ def show_view_results():
     for session in sessions:
         session_id = session['session_id']
 
-        with st.expander(f"Session: {session['class_code']} - {session['started_at'].strftime('%Y-%m-%d %H:%M')}"):
+        started_at = datetime.fromisoformat(session['started_at'])
+        with st.expander(f"Session: {session['class_code']} - {started_at.strftime('%Y-%m-%d %H:%M')}"):
             # Get results for this session
-            results_data = get_session_results(session_id)
+            results_data = api_call(api.get_session_results, session_id)
 
             if not results_data:
                 st.warning("No results available")
@@ -1340,19 +1437,11 @@ def show_view_results():
             with col1:
                 st.metric("Participants", participant_count)
             with col2:
-                # ✅ FIXED: Count unique students who responded
-                try:
-                    conn = get_db_connection()
-                    cur = conn.cursor()
-                    cur.execute("""
-                        SELECT COUNT(DISTINCT student_id) as count
-                        FROM student_answers
-                        WHERE session_id = %s
-                    """, (session_id,))
-                    total_responses = cur.fetchone()['count']
-                    cur.close()
-                    conn.close()
-                except:
+                # Count unique students who responded
+                stats = api_call(api.get_session_stats, session_id)
+                if stats:
+                    total_responses = stats['responded_count']
+                else:
                     total_responses = sum(r['count'] for r in results)
                 
                 st.metric("Responses", total_responses)
@@ -1362,19 +1451,9 @@ def show_view_results():
 
             # Get student details
             try:
-                conn = get_db_connection()
-                cur = conn.cursor()
-                cur.execute("""
-                    SELECT s.name, a.answer_text, a.is_correct
-                    FROM students s
-                    LEFT JOIN student_answers sa ON s.student_id = sa.student_id
-                    LEFT JOIN answers a ON sa.answer_id = a.answer_id
-                    WHERE s.session_id = %s
-                    ORDER BY s.name
-                """, (session_id,))
-                student_data = cur.fetchall()
-                cur.close()
-                conn.close()
+                responses_data = api.get_student_responses(session_id)
+                student_data = sorted(responses_data['students'] if responses_data else [],
+                                      key=lambda row: row['student_name'])
 
                 if student_data:
                     st.subheader("Student Answers")
@@ -1383,8 +1462,9 @@ def show_view_results():
                     from collections import defaultdict
                     student_responses = defaultdict(list)
                     for row in student_data:
-                        student_responses[row['name']].append({
-                            'answer': row['answer_text'] or 'No answer',
+                        submitted = row['answer_text'] != 'Not submitted'
+                        student_responses[row['student_name']].append({
+                            'answer': row['answer_text'] if submitted else 'No answer',
                             'correct': row['is_correct']
                         })
 